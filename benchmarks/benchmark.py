@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""Benchmarks of the search engines on standard workloads.
+
+Each workload is run with each of its variants, i.e. combinations of
+node and search tree mixins, for a number of repetitions, each with a
+freshly built AI. Reported are:
+
+* wall time of a repetition (minimum and median)
+* throughput in nodes per second, based on the median wall time
+* latency percentiles of the workload's steps (expansion steps, sweeps
+  or moves) over all repetitions
+* peak memory, as traced by tracemalloc in a separate run, and peak
+  bytes per node
+
+Random moves are seeded, so repeated runs do the same work. Results can
+be saved as JSON, and compared to a saved baseline:
+
+    PYTHONPATH=. python benchmarks/benchmark.py --output baseline.json
+    (make changes)
+    PYTHONPATH=. python benchmarks/benchmark.py --compare baseline.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from bobbot.statistics import percentile
+from bobbot.search_tree import BaseAI
+from bobbot.search_tree import OneStepSearchMixin
+from bobbot.search_tree import ForwardSweepingMixin
+from bobbot.search_tree import ParallelSweepingMixin
+from bobbot.search_tree import TranspositionTableMixin
+from bobbot.search_tree import ArrayNodeStoreMixin
+from bobbot.search_tree import IndexedNodeStoreMixin
+from bobbot.search_tree import BatchedBackpropagationMixin
+from bobbot.search_tree import SymmetryMixin
+from bobbot.search_tree import NaivePruningMixin
+from bobbot.search_tree import IncrementalPruningMixin
+from bobbot.search_tree import WeakrefPruningMixin
+from bobbot.search_tree import AlphaBetaSearchMixin
+from bobbot.search_tree import PrincipalVariationSearchMixin
+from bobbot.search_tree import IterativeDeepeningMixin
+from bobbot.search_tree import MonteCarloTreeSearchMixin
+from bobbot.search_tree import ProofNumberSearchMixin
+from bobbot.search_node import ZobristKeyMixin
+from bobbot.search_node import StateIndexKeyMixin
+from bobbot.search_node import CanonicalStatesMixin
+from bobbot.search_node import DeferredBackpropagationMixin
+from bobbot.search_node import WeakPredecessorsMixin
+from bobbot.search_node import MinMaxScoringMixin
+from bobbot.search_node import ChooseRandomMoveFromBestMixin
+from bobbot.search_node import MonteCarloStatisticsMixin
+from bobbot.search_node import ChooseMostVisitedMoveMixin
+from bobbot.search_node import ProofNumberMixin
+from bobbot.search_node import ChooseMostProvenMoveMixin
+from bobbot.games.nim import NimAdapter
+from bobbot.games.tictactoe import TicTacToeAdapter
+from bobbot.games.connectfour import ConnectFourAdapter
+
+
+# Workloads
+#
+# A workload runs on a freshly built AI, and returns the number of
+# nodes it has processed, and the latencies of its steps in seconds.
+
+
+def solve(ai):
+    """Expand the whole game tree, one OneStepSearchMixin step at a
+    time.
+    """
+    latencies = []
+    has_expanded = True
+    while has_expanded:
+        start_time = time.perf_counter()
+        has_expanded = ai.step_search_tree_expansion()
+        latencies.append(time.perf_counter() - start_time)
+    return len(ai.search_tree), latencies
+
+
+def sweep(ai):
+    """One ForwardSweepingMixin sweep from the starting state."""
+    start_time = time.perf_counter()
+    ai.expand_search_tree()
+    latencies = [time.perf_counter() - start_time]
+    return len(ai.search_tree), latencies
+
+
+def self_play(ai):
+    """Play a game against itself, searching before and, with a pruning
+    mixin, pruning after each move. The nodes processed are the sizes
+    of the trees that the moves were chosen in.
+    """
+    nodes = 0
+    latencies = []
+    while not ai.current_state._is_finished():
+        start_time = time.perf_counter()
+        move = ai.choose_move()
+        nodes += len(ai.search_tree)
+        ai.make_move(move)
+        latencies.append(time.perf_counter() - start_time)
+    return nodes, latencies
+
+
+class CountNodesVisitedMixin:
+    """Sums AlphaBetaSearchMixin's .nodes_visited over all searches,
+    i.e. over the depths of an iterative deepening search, and the
+    searches for equally good moves when choosing one, as
+    .nodes_searched.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.nodes_searched = 0
+        self.nodes_counted = 0  # Of .nodes_visited
+
+    def choose_move(self):
+        self.nodes_counted = 0
+        try:
+            return super().choose_move()
+        finally:
+            self.nodes_searched += self.nodes_visited - self.nodes_counted
+
+    def alpha_beta_search(self, *args, **kwargs):
+        try:
+            return super().alpha_beta_search(*args, **kwargs)
+        finally:
+            self.nodes_searched += self.nodes_visited
+            self.nodes_counted = self.nodes_visited
+
+
+def depth_first_self_play(ai):
+    """Play a game against itself with a depth-first search, which keeps
+    no search tree. The nodes processed are those that the searches
+    have visited; requires CountNodesVisitedMixin.
+    """
+    latencies = []
+    while not ai.current_state._is_finished():
+        start_time = time.perf_counter()
+        ai.make_move(ai.choose_move())
+        latencies.append(time.perf_counter() - start_time)
+    return ai.nodes_searched, latencies
+
+
+# Variants: (game mixins, AI mixins, AI keyword arguments)
+
+SOLVE_VARIANTS = {
+    'dict': ((), (), {}),
+    'zobrist': ((ZobristKeyMixin, ), (), {}),
+    'transposition_table': ((ZobristKeyMixin, ),
+                            (TranspositionTableMixin, ),
+                            {}),
+    'batched_backpropagation': ((DeferredBackpropagationMixin, ),
+                                (BatchedBackpropagationMixin, ),
+                                {}),
+    'array_store': ((ZobristKeyMixin, ),
+                    (BatchedBackpropagationMixin, ArrayNodeStoreMixin),
+                    {}),
+    'indexed_store': ((StateIndexKeyMixin, ),
+                      (BatchedBackpropagationMixin, IndexedNodeStoreMixin),
+                      {}),
+    'symmetry': ((CanonicalStatesMixin, ), (SymmetryMixin, ), {}),
+}
+
+SWEEP_VARIANTS = {
+    'serial': ((), (), {}),
+    'parallel': ((), (ParallelSweepingMixin, ), {'workers': 2}),
+}
+
+PRUNE_VARIANTS = {
+    'naive': ((), (NaivePruningMixin, ), {}),
+    'incremental': ((), (IncrementalPruningMixin, ), {}),
+    'weakref': ((WeakPredecessorsMixin, ), (WeakrefPruningMixin, ), {}),
+}
+
+ALPHA_BETA_VARIANTS = {
+    'alpha_beta': ((), (), {}),
+    'principal_variation': ((), (PrincipalVariationSearchMixin, ), {}),
+}
+
+TREE_SEARCH_VARIANTS = {
+    'unpruned': ((), (), {}),
+    'naive_pruning': ((), (NaivePruningMixin, ), {}),
+}
+
+# Node mixins of the games, by the kind of search that they are used for
+MINMAX = (MinMaxScoringMixin, ChooseRandomMoveFromBestMixin)
+MONTE_CARLO = (MonteCarloStatisticsMixin, ChooseMostVisitedMoveMixin)
+PROOF_NUMBER = (ProofNumberMixin, ChooseMostProvenMoveMixin)
+
+# {name: (game mixins, workload, AI mixins, AI keyword arguments,
+#         variants)}, with the game's mixins ending in its GameAdapter
+WORKLOADS = {
+    'nim_solve': (MINMAX + (NimAdapter, ), solve, (OneStepSearchMixin, ), {},
+                  SOLVE_VARIANTS),
+    'tictactoe_solve': (MINMAX + (TicTacToeAdapter, ), solve,
+                        (OneStepSearchMixin, ), {}, SOLVE_VARIANTS),
+    'tictactoe_sweep': (MINMAX + (TicTacToeAdapter, ), sweep,
+                        (ForwardSweepingMixin, ), {'search_depth': 5},
+                        SWEEP_VARIANTS),
+    'tictactoe_prune_cycles': (MINMAX + (TicTacToeAdapter, ), self_play,
+                               (ForwardSweepingMixin, ),
+                               {'search_depth': 3}, PRUNE_VARIANTS),
+    'tictactoe_proof_number': (PROOF_NUMBER + (TicTacToeAdapter, ),
+                               self_play, (ProofNumberSearchMixin, ), {},
+                               TREE_SEARCH_VARIANTS),
+    'connectfour_sweep': (MINMAX + (ConnectFourAdapter, ), sweep,
+                          (ForwardSweepingMixin, ), {'search_depth': 6},
+                          SWEEP_VARIANTS),
+    'connectfour_prune_cycles': (MINMAX + (ConnectFourAdapter, ), self_play,
+                                 (ForwardSweepingMixin, ),
+                                 {'search_depth': 3}, PRUNE_VARIANTS),
+    'connectfour_alpha_beta': ((ConnectFourAdapter, ), depth_first_self_play,
+                               (CountNodesVisitedMixin,
+                                AlphaBetaSearchMixin),
+                               {'search_depth': 6}, ALPHA_BETA_VARIANTS),
+    # The time per move is generous, so that the depth limit applies.
+    'connectfour_deepening': ((ConnectFourAdapter, ), depth_first_self_play,
+                              (CountNodesVisitedMixin,
+                               IterativeDeepeningMixin,
+                               AlphaBetaSearchMixin),
+                              {'max_depth': 6, 'move_time': 60},
+                              ALPHA_BETA_VARIANTS),
+    'connectfour_mcts': (MONTE_CARLO + (ConnectFourAdapter, ), self_play,
+                         (MonteCarloTreeSearchMixin, ),
+                         {'playout_limit': 200}, TREE_SEARCH_VARIANTS),
+}
+
+
+def build_ai(workload_name, variant_name):
+    game, workload, ai_mixins, ai_kwargs, variants = WORKLOADS[workload_name]
+    game_mixins, variant_ai_mixins, variant_kwargs = variants[variant_name]
+    Game = type('Game', game_mixins + game, {})
+    AI = type('AI', variant_ai_mixins + ai_mixins + (BaseAI, ), {})
+    return AI(Game(), **dict(ai_kwargs, **variant_kwargs))
+
+
+def run_once(workload_name, variant_name):
+    random.seed(0)
+    ai = build_ai(workload_name, variant_name)
+    workload = WORKLOADS[workload_name][1]
+    try:
+        start_time = time.perf_counter()
+        nodes, latencies = workload(ai)
+        wall_time = time.perf_counter() - start_time
+    finally:
+        if hasattr(ai, 'shutdown'):
+            ai.shutdown()
+    return nodes, wall_time, latencies
+
+
+def benchmark(workload_name, variant_name, repeats):
+    wall_times = []
+    latencies = []
+    for _ in range(repeats):
+        nodes, wall_time, run_latencies = run_once(workload_name,
+                                                   variant_name)
+        wall_times.append(wall_time)
+        latencies.extend(run_latencies)
+
+    # Tracing slows everything down, so memory is measured separately.
+    tracemalloc.start()
+    try:
+        run_once(workload_name, variant_name)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    median_wall_time = percentile(wall_times, 0.5)
+    return {
+        'workload': workload_name,
+        'variant': variant_name,
+        'repeats': repeats,
+        'nodes': nodes,
+        'wall_time_min': min(wall_times),
+        'wall_time_median': median_wall_time,
+        'nodes_per_second': nodes / median_wall_time,
+        'latency_p50': percentile(latencies, 0.5),
+        'latency_p90': percentile(latencies, 0.9),
+        'latency_p99': percentile(latencies, 0.99),
+        'latency_max': max(latencies),
+        'peak_memory': peak_memory,
+        'peak_bytes_per_node': peak_memory / max(nodes, 1),
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'],
+                                capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'python': sys.version,
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'commit': commit,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def print_results(results, baseline=None):
+    baseline_results = {}
+    if baseline is not None:
+        baseline_results = {(r['workload'], r['variant']): r
+                            for r in baseline['results']}
+    header = ("{:<24} {:<24} {:>8} {:>10} {:>11} {:>9} {:>9} {:>10}"
+              .format("workload", "variant", "nodes", "median s",
+                      "nodes/s", "p50 ms", "p99 ms", "peak KiB"))
+    if baseline_results:
+        header += " {:>8} {:>8}".format("time", "memory")
+    print(header)
+    for result in results:
+        line = ("{workload:<24} {variant:<24} {nodes:>8} "
+                "{wall_time_median:>10.4f} {nodes_per_second:>11.0f} "
+                "{p50:>9.3f} {p99:>9.3f} {peak:>10.0f}"
+                .format(p50=result['latency_p50'] * 1000,
+                        p99=result['latency_p99'] * 1000,
+                        peak=result['peak_memory'] / 1024,
+                        **result))
+        old = baseline_results.get((result['workload'], result['variant']))
+        if old is not None:
+            line += " {:>+7.1%} {:>+7.1%}".format(
+                result['wall_time_median'] / old['wall_time_median'] - 1,
+                result['peak_memory'] / old['peak_memory'] - 1)
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workload', action='append',
+                        choices=sorted(WORKLOADS),
+                        help="Run only this workload; may be repeated.")
+    parser.add_argument('--variant', action='append',
+                        help="Run only this variant; may be repeated.")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--output', help="Save the results as JSON.")
+    parser.add_argument('--compare',
+                        help="JSON results to report relative changes to.")
+    args = parser.parse_args(argv)
+
+    results = []
+    for workload_name in args.workload or WORKLOADS:
+        for variant_name in WORKLOADS[workload_name][4]:
+            if args.variant and variant_name not in args.variant:
+                continue
+            results.append(benchmark(workload_name, variant_name,
+                                     args.repeats))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'results': results},
+                      f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
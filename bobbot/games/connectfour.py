@@ -0,0 +1,313 @@
+from collections import namedtuple
+from functools import lru_cache
+
+from bobbot.search_node import GameAdapter
+
+
+# Types, constants and helpers
+#
+# Connect Four is played on a board of width columns and height rows,
+# by dropping stones into columns, where they fall onto the lowest free
+# field. The first player to get four stones in a row, column or
+# diagonal wins.
+#
+# Each player's stones are stored as one integer bitboard. Every column
+# takes height + 1 bits, from the bottom up, with field (x, y) being bit
+# x * (height + 1) + y; the topmost bit of each column stays empty, so
+# that lines can't wrap around from one column into the next when the
+# bitboards are shifted. For each column, the bit of its lowest free
+# field is kept as well.
+
+
+GameState = namedtuple('GameState',
+                       ['geometry', 'boards', 'free_fields', 'active_player',
+                        'winner'])
+
+Geometry = namedtuple('Geometry',
+                      ['width', 'height',
+                       'full_board',    # Mask of all fields
+                       'column_tops',   # Bit above the topmost field, per column
+                       'bottom_fields',  # Bit of the lowest field, per column
+                       'column_order',  # Columns, from the center outwards
+                       'line_shifts',   # Bit distances along the four directions
+                       ])
+
+PLAYER_X = 1
+PLAYER_O = 2
+
+
+def other_player(player):
+    if player == PLAYER_X:
+        return PLAYER_O
+    else:
+        return PLAYER_X
+
+
+def player_symbol(state):
+    return {PLAYER_X: "X",
+            PLAYER_O: "O",
+            None: " "}[state]
+
+
+@lru_cache(maxsize=None)
+def geometry(width, height):
+    """Precomputed masks for a board size; shared by all its states."""
+    assert width >= 1 and height >= 1
+    column_bits = height + 1
+    bottom_fields = tuple(1 << (x * column_bits) for x in range(width))
+    column_tops = tuple(bottom << height for bottom in bottom_fields)
+    full_board = sum(((1 << height) - 1) << (x * column_bits)
+                     for x in range(width))
+    center = (width - 1) / 2
+    column_order = tuple(sorted(range(width),
+                                key=lambda x: (abs(x - center), x)))
+    return Geometry(width=width,
+                    height=height,
+                    full_board=full_board,
+                    column_tops=column_tops,
+                    bottom_fields=bottom_fields,
+                    column_order=column_order,
+                    # Vertical, horizontal, and both diagonals
+                    line_shifts=(1, column_bits, column_bits + 1,
+                                 column_bits - 1))
+
+
+def has_four_in_a_row(board, line_shifts):
+    for shift in line_shifts:
+        pairs = board & (board >> shift)
+        if pairs & (pairs >> (2 * shift)):
+            return True
+    return False
+
+
+def player_board(game_state, player):
+    return game_state.boards[player - PLAYER_X]
+
+
+def field(game_state, coord):
+    """The player occupying the field, or None. y counts from the
+    bottom row up.
+    """
+    x, y = coord
+    field_bit = 1 << (x * (game_state.geometry.height + 1) + y)
+    for player in (PLAYER_X, PLAYER_O):
+        if player_board(game_state, player) & field_bit:
+            return player
+    return None
+
+
+def textual_repr(game_state):
+    g = game_state.geometry
+    rows = ["|" + "|".join(player_symbol(field(game_state, (x, y)))
+                           for x in range(g.width)) + "|"
+            for y in reversed(range(g.height))]
+    rows.append(" " + " ".join(str(x % 10) for x in range(g.width)))
+    if not is_finished(game_state):
+        m = "Move: {}".format(player_symbol(game_state.active_player))
+    else:
+        m = "Winner: {}".format(player_symbol(winner(game_state)))
+    return "\n".join(rows) + "\n" + m
+
+
+# Functional implementation of game rules
+
+
+def starting_state(width=7, height=6):
+    g = geometry(width, height)
+    return GameState(geometry=g,
+                     boards=(0, 0),
+                     free_fields=g.bottom_fields,
+                     active_player=PLAYER_X,
+                     winner=None)
+
+
+def is_winner(game_state, player):
+    return game_state.winner == player
+
+
+def is_finished(game_state):
+    return game_state.active_player is None
+
+
+def winner(game_state):
+    if not is_finished(game_state):
+        raise ValueError
+    return game_state.winner
+
+
+def is_legal_move(game_state, column):
+    g = game_state.geometry
+    assert 0 <= column < g.width, "Value out of range"
+    return (not is_finished(game_state) and
+            game_state.free_fields[column] != g.column_tops[column])
+
+
+def make_move(game_state, column):
+    if not is_legal_move(game_state, column):
+        raise ValueError("Illegal move")
+
+    g = game_state.geometry
+    field_bit = game_state.free_fields[column]
+    free_fields = list(game_state.free_fields)
+    free_fields[column] = field_bit << 1
+    player = game_state.active_player
+    boards = list(game_state.boards)
+    board = boards[player - PLAYER_X] | field_bit
+    boards[player - PLAYER_X] = board
+    if has_four_in_a_row(board, g.line_shifts):
+        return GameState(geometry=g, boards=tuple(boards),
+                         free_fields=tuple(free_fields),
+                         active_player=None, winner=player)
+    elif boards[0] | boards[1] == g.full_board:
+        return GameState(geometry=g, boards=tuple(boards),
+                         free_fields=tuple(free_fields),
+                         active_player=None, winner=None)
+    else:
+        return GameState(geometry=g, boards=tuple(boards),
+                         free_fields=tuple(free_fields),
+                         active_player=other_player(player), winner=None)
+
+
+def all_legal_moves(game_state):
+    """Columns that aren't full, from the center outwards, as central
+    moves tend to be the better ones.
+    """
+    if is_finished(game_state):
+        return []
+    g = game_state.geometry
+    free_fields = game_state.free_fields
+    column_tops = g.column_tops
+    return [column for column in g.column_order
+            if free_fields[column] != column_tops[column]]
+
+
+def evaluate(game_state):
+    if not is_finished(game_state):
+        return {PLAYER_X: 0,
+                PLAYER_O: 0}
+    elif game_state.winner == PLAYER_X:
+        return {PLAYER_X: 1,
+                PLAYER_O: -1}
+    elif game_state.winner == PLAYER_O:
+        return {PLAYER_X: -1,
+                PLAYER_O: 1}
+    else:
+        return {PLAYER_X: -0.5,
+                PLAYER_O: -0.5}
+
+
+def node_key(game_state):
+    """Both bitboards in one integer. Like in TicTacToe, the active
+    player can be derived from the board.
+    """
+    g = game_state.geometry
+    return game_state.boards[0] | (game_state.boards[1] <<
+                                   (g.width * (g.height + 1)))
+
+
+def update_node_key(game_state, column, game_state_key):
+    """node_key() of make_move(game_state, column), given the key of
+    game_state.
+    """
+    field_bit = game_state.free_fields[column]
+    if game_state.active_player == PLAYER_O:
+        g = game_state.geometry
+        field_bit <<= g.width * (g.height + 1)
+    return game_state_key | field_bit
+
+
+def expand_state(game_state):
+    """All successors of game_state at once, as (move, successor state,
+    node key, is terminal, evaluation) tuples, with keys derived from
+    the key of game_state.
+    """
+    if is_finished(game_state):
+        return []
+    g = game_state.geometry
+    player = game_state.active_player
+    next_player = other_player(player)
+    board_index = player - PLAYER_X
+    board = game_state.boards[board_index]
+    other_board = game_state.boards[1 - board_index]
+    key = node_key(game_state)
+    key_shift = 0 if player == PLAYER_X else g.width * (g.height + 1)
+    expansion = []
+    for column in all_legal_moves(game_state):
+        field_bit = game_state.free_fields[column]
+        free_fields = list(game_state.free_fields)
+        free_fields[column] = field_bit << 1
+        successor_board = board | field_bit
+        if board_index == 0:
+            boards = (successor_board, other_board)
+        else:
+            boards = (other_board, successor_board)
+        if has_four_in_a_row(successor_board, g.line_shifts):
+            successor = GameState(geometry=g, boards=boards,
+                                  free_fields=tuple(free_fields),
+                                  active_player=None, winner=player)
+            is_terminal = True
+            evaluation = {player: 1, next_player: -1}
+        elif boards[0] | boards[1] == g.full_board:
+            successor = GameState(geometry=g, boards=boards,
+                                  free_fields=tuple(free_fields),
+                                  active_player=None, winner=None)
+            is_terminal = True
+            evaluation = {PLAYER_X: -0.5, PLAYER_O: -0.5}
+        else:
+            successor = GameState(geometry=g, boards=boards,
+                                  free_fields=tuple(free_fields),
+                                  active_player=next_player, winner=None)
+            is_terminal = False
+            evaluation = {PLAYER_X: 0, PLAYER_O: 0}
+        expansion.append((column, successor,
+                          key | (field_bit << key_shift),
+                          is_terminal, evaluation))
+    return expansion
+
+
+class ConnectFourAdapter(GameAdapter):
+    """Adapter for Connect Four. Moves are column numbers. Set the board
+    size by overriding .width and .height in a subclass; by default, it
+    is the standard one of 7 columns and 6 rows.
+    """
+    width = 7
+    height = 6
+
+    def starting_state(self):
+        return starting_state(self.width, self.height)
+
+    def evaluate(self, game_state):
+        return evaluate(game_state)
+
+    def active_player(self, game_state):
+        return game_state.active_player
+
+    def is_finished(self, game_state):
+        return is_finished(game_state)
+
+    def all_legal_moves(self, game_state):
+        return all_legal_moves(game_state)
+
+    def make_move(self, game_state, move):
+        return make_move(game_state, move)
+
+    def winner(self, game_state):
+        return winner(game_state)
+
+    def node_key(self, game_state):
+        return node_key(game_state)
+
+    def successor_key(self, game_state, move, successor_state, node_key):
+        return update_node_key(game_state, move, node_key)
+
+    def node_hash(self, game_state):
+        return node_key(game_state)
+
+    def update_node_hash(self, game_state, move, node_hash):
+        return update_node_key(game_state, move, node_hash)
+
+    def expand_state(self, game_state):
+        return expand_state(game_state)
+
+    def __repr__(self):
+        return textual_repr(self.state)
@@ -0,0 +1,245 @@
+from collections import namedtuple
+from functools import lru_cache
+
+from bobbot.search_node import GameAdapter
+
+
+# Types, constants and helpers
+#
+# An m,n,k-game is played on a board of width m and height n, and won by
+# the first player to get k stones in a row, column or diagonal. 3,3,3
+# is TicTacToe.
+#
+# Each player's stones are stored as one integer bitboard, with field
+# (x, y) being bit y * width + x.
+
+
+GameState = namedtuple('GameState',
+                       ['geometry', 'boards', 'active_player', 'winner'])
+
+Geometry = namedtuple('Geometry',
+                      ['width', 'height', 'k',
+                       'full_board',     # Mask of all fields
+                       'coords',         # {bit: (x, y)}
+                       'lines_through',  # {bit: win line masks through it}
+                       ])
+
+PLAYER_X = 1
+PLAYER_O = 2
+
+
+def other_player(player):
+    if player == PLAYER_X:
+        return PLAYER_O
+    else:
+        return PLAYER_X
+
+
+def player_symbol(state):
+    return {PLAYER_X: "X",
+            PLAYER_O: "O",
+            None: " "}[state]
+
+
+@lru_cache(maxsize=None)
+def geometry(width, height, k):
+    """Precomputed masks for a board size; shared by all its states."""
+    assert k <= max(width, height)
+
+    def bit(x, y):
+        return 1 << (y * width + x)
+
+    lines = []
+    for dx, dy in [(1, 0), (0, 1), (1, 1), (1, -1)]:
+        for x in range(width):
+            for y in range(height):
+                end_x = x + dx * (k - 1)
+                end_y = y + dy * (k - 1)
+                if 0 <= end_x < width and 0 <= end_y < height:
+                    lines.append(sum(bit(x + dx * i, y + dy * i)
+                                     for i in range(k)))
+    coords = {bit(x, y): (x, y) for x in range(width) for y in range(height)}
+    lines_through = {field: tuple(line for line in lines if line & field)
+                     for field in coords}
+    return Geometry(width=width,
+                    height=height,
+                    k=k,
+                    full_board=(1 << (width * height)) - 1,
+                    coords=coords,
+                    lines_through=lines_through)
+
+
+def player_board(game_state, player):
+    return game_state.boards[player - PLAYER_X]
+
+
+def field(game_state, coord):
+    """The player occupying the field, or None."""
+    x, y = coord
+    field_bit = 1 << (y * game_state.geometry.width + x)
+    for player in (PLAYER_X, PLAYER_O):
+        if player_board(game_state, player) & field_bit:
+            return player
+    return None
+
+
+def textual_repr(game_state):
+    width = game_state.geometry.width
+    rows = [" " + " | ".join(player_symbol(field(game_state, (x, y)))
+                             for x in range(width))
+            for y in range(game_state.geometry.height)]
+    separator = "\n" + "+".join(["---"] * width) + "\n"
+    if not is_finished(game_state):
+        m = "Move: {}".format(player_symbol(game_state.active_player))
+    else:
+        m = "Winner: {}".format(player_symbol(winner(game_state)))
+    return separator.join(rows) + "\n" + m
+
+
+# Functional implementation of game rules
+
+
+def starting_state(width=3, height=3, k=3):
+    return GameState(geometry=geometry(width, height, k),
+                     boards=(0, 0),
+                     active_player=PLAYER_X,
+                     winner=None)
+
+
+def is_winner(game_state, player):
+    return game_state.winner == player
+
+
+def is_finished(game_state):
+    return game_state.active_player is None
+
+
+def winner(game_state):
+    if not is_finished(game_state):
+        raise ValueError
+    return game_state.winner
+
+
+def is_legal_move(game_state, coord):
+    x, y = coord
+    g = game_state.geometry
+    assert (0 <= x < g.width) and (0 <= y < g.height), "Value out of range"
+    occupied = game_state.boards[0] | game_state.boards[1]
+    return (not is_finished(game_state) and
+            not occupied & (1 << (y * g.width + x)))
+
+
+def make_move(game_state, coord):
+    if not is_legal_move(game_state, coord):
+        raise ValueError("Illegal move")
+
+    g = game_state.geometry
+    field_bit = 1 << (coord[1] * g.width + coord[0])
+    player = game_state.active_player
+    boards = list(game_state.boards)
+    board = boards[player - PLAYER_X] | field_bit
+    boards[player - PLAYER_X] = board
+    # Only lines through the new stone can have been completed.
+    if any(board & line == line for line in g.lines_through[field_bit]):
+        return GameState(geometry=g, boards=tuple(boards),
+                         active_player=None, winner=player)
+    elif boards[0] | boards[1] == g.full_board:
+        return GameState(geometry=g, boards=tuple(boards),
+                         active_player=None, winner=None)
+    else:
+        return GameState(geometry=g, boards=tuple(boards),
+                         active_player=other_player(player), winner=None)
+
+
+def all_legal_moves(game_state):
+    if is_finished(game_state):
+        return []
+    coords = game_state.geometry.coords
+    empty = game_state.geometry.full_board & ~(game_state.boards[0] |
+                                               game_state.boards[1])
+    moves = []
+    while empty:
+        field_bit = empty & -empty
+        moves.append(coords[field_bit])
+        empty ^= field_bit
+    return moves
+
+
+def evaluate(game_state):
+    if not is_finished(game_state):
+        return {PLAYER_X: 0,
+                PLAYER_O: 0}
+    elif game_state.winner == PLAYER_X:
+        return {PLAYER_X: 1,
+                PLAYER_O: -1}
+    elif game_state.winner == PLAYER_O:
+        return {PLAYER_X: -1,
+                PLAYER_O: 1}
+    else:
+        return {PLAYER_X: -0.5,
+                PLAYER_O: -0.5}
+
+
+def node_key(game_state):
+    """Both bitboards in one integer. Like in TicTacToe, the active
+    player can be derived from the board.
+    """
+    num_fields = game_state.geometry.width * game_state.geometry.height
+    return game_state.boards[0] | (game_state.boards[1] << num_fields)
+
+
+def update_node_key(game_state, coord, game_state_key):
+    """node_key() of make_move(game_state, coord), given the key of
+    game_state.
+    """
+    g = game_state.geometry
+    shift = coord[1] * g.width + coord[0]
+    if game_state.active_player == PLAYER_O:
+        shift += g.width * g.height
+    return game_state_key | (1 << shift)
+
+
+class MNKAdapter(GameAdapter):
+    """Adapter for m,n,k-games. Set the board size and row length to
+    win by overriding .width, .height and .k in a subclass; by default,
+    this is TicTacToe.
+    """
+    width = 3
+    height = 3
+    k = 3
+
+    def starting_state(self):
+        return starting_state(self.width, self.height, self.k)
+
+    def evaluate(self, game_state):
+        return evaluate(game_state)
+
+    def active_player(self, game_state):
+        return game_state.active_player
+
+    def is_finished(self, game_state):
+        return is_finished(game_state)
+
+    def all_legal_moves(self, game_state):
+        return all_legal_moves(game_state)
+
+    def make_move(self, game_state, move):
+        return make_move(game_state, move)
+
+    def winner(self, game_state):
+        return winner(game_state)
+
+    def node_key(self, game_state):
+        return node_key(game_state)
+
+    def successor_key(self, game_state, move, successor_state, node_key):
+        return update_node_key(game_state, move, node_key)
+
+    def node_hash(self, game_state):
+        return node_key(game_state)
+
+    def update_node_hash(self, game_state, move, node_hash):
+        return update_node_key(game_state, move, node_hash)
+
+    def __repr__(self):
+        return textual_repr(self.state)
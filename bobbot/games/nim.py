@@ -1,3 +1,5 @@
+import math
+import random
 from collections import namedtuple
 
 from bobbot.search_node import GameAdapter
@@ -12,6 +14,25 @@ PLAYER_A = 1
 PLAYER_B = 2
 
 
+HEAP_SIZES = (3, 5, 7)
+
+
+# Random bitstrings for Zobrist hashing; seeded so that hashes are the
+# same in every process.
+_zobrist_random = random.Random(0)
+# Heaps may be reordered (see canonical_form()), so each heap can be of
+# any size.
+ZOBRIST_HEAPS = [[_zobrist_random.getrandbits(64)
+                  for _ in range(max(HEAP_SIZES) + 1)]
+                 for _ in HEAP_SIZES]
+ZOBRIST_PLAYERS = {PLAYER_A: _zobrist_random.getrandbits(64),
+                   PLAYER_B: _zobrist_random.getrandbits(64)}
+
+# Number of indices of state_index(): Each heap can be of any size up
+# to its starting one, and either player can be to move or the winner.
+NUM_STATE_INDICES = 2 * math.prod(heapsize + 1 for heapsize in HEAP_SIZES)
+
+
 def other_player(player):
     if player==PLAYER_A:
         return PLAYER_B
@@ -40,7 +61,7 @@ def textual_repr(game_state):
 
 
 def starting_state():
-    return GameState(board=(3, 5, 7), active_player=PLAYER_A, winner=None)
+    return GameState(board=HEAP_SIZES, active_player=PLAYER_A, winner=None)
 
 
 def is_winner(game_state, player):
@@ -51,6 +72,10 @@ def is_finished(game_state):
     return game_state.board == (0, 0, 0)
 
 
+def winner(game_state):
+    return game_state.winner
+
+
 def is_legal_move(game_state, take):
     return 0 <= take[0] <= 2 and take[1] <= game_state.board[take[0]]
 
@@ -85,6 +110,131 @@ def node_key(game_state):
     return board_repr + player_repr
 
 
+def node_hash(game_state):
+    """Zobrist hash of the state, distinguishing the same states that
+    node_key() does.
+    """
+    result = 0
+    for heap, heapsize in enumerate(game_state.board):
+        result ^= ZOBRIST_HEAPS[heap][heapsize]
+    if game_state.active_player is not None:
+        result ^= ZOBRIST_PLAYERS[game_state.active_player]
+    else:
+        result ^= ZOBRIST_PLAYERS[game_state.winner]
+    return result
+
+
+def update_node_hash(game_state, take, game_state_hash):
+    """Zobrist hash of make_move(game_state, take), given the hash of
+    game_state.
+    """
+    heap, amount = take
+    heapsize = game_state.board[heap]
+    result = (game_state_hash
+              ^ ZOBRIST_HEAPS[heap][heapsize]
+              ^ ZOBRIST_HEAPS[heap][heapsize - amount])
+    if sum(game_state.board) != amount:
+        # The game continues, so the other player is to move; else,
+        # the moving player becomes the winner.
+        result ^= (ZOBRIST_PLAYERS[game_state.active_player]
+                   ^ ZOBRIST_PLAYERS[other_player(game_state.active_player)])
+    return result
+
+
+def state_index(game_state):
+    """Number of the state in 0 .. NUM_STATE_INDICES - 1, distinguishing
+    the same states that node_key() does. The heap sizes are the digits
+    of a number with mixed radices, and the player to move, or the
+    winner, is the lowest digit.
+    """
+    index = 0
+    for heapsize, starting_heapsize in zip(game_state.board, HEAP_SIZES):
+        index = index * (starting_heapsize + 1) + heapsize
+    if game_state.active_player is not None:
+        player = game_state.active_player
+    else:
+        player = game_state.winner
+    return index * 2 + player - PLAYER_A
+
+
+def state_from_index(index):
+    """The state that state_index() numbers index."""
+    index, player = divmod(index, 2)
+    player += PLAYER_A
+    board = []
+    for starting_heapsize in reversed(HEAP_SIZES):
+        index, heapsize = divmod(index, starting_heapsize + 1)
+        board.append(heapsize)
+    board = tuple(reversed(board))
+    if all(heapsize == 0 for heapsize in board):
+        return GameState(board=board, active_player=None, winner=player)
+    return GameState(board=board, active_player=player, winner=None)
+
+
+def expand_state(game_state):
+    """All successors of game_state at once, as (move, successor state,
+    node key, is terminal, evaluation) tuples, evaluated by
+    evaluate_by_nim_sum(). The successors' Nim sums are derived from
+    that of game_state.
+    """
+    if is_finished(game_state):
+        return []
+    board = game_state.board
+    player = game_state.active_player
+    next_player = other_player(player)
+    items = sum(board)
+    nim_sum = board[0] ^ board[1] ^ board[2]
+    expansion = []
+    for heap, heapsize in enumerate(board):
+        for take in range(1, heapsize + 1):
+            successor_board = list(board)
+            successor_board[heap] = heapsize - take
+            successor_board = tuple(successor_board)
+            board_repr = ''.join([str(size) for size in successor_board])
+            if take == items:
+                successor = GameState(board=successor_board,
+                                      active_player=None, winner=player)
+                evaluation = evaluate_if_end_state(successor)
+                successor_key = board_repr + player_symbol(player)
+            else:
+                successor = GameState(board=successor_board,
+                                      active_player=next_player, winner=None)
+                # The successor's player to move wins if its Nim sum
+                # isn't zero.
+                if nim_sum ^ heapsize ^ (heapsize - take):
+                    evaluation = {next_player: 1, player: -1}
+                else:
+                    evaluation = {next_player: -1, player: 1}
+                successor_key = board_repr + player_symbol(next_player)
+            expansion.append(((heap, take), successor, successor_key,
+                              take == items, evaluation))
+    return expansion
+
+
+def canonical_form(game_state):
+    """Heaps are interchangeable, so the canonical state has them sorted
+    by size. The transform is the permutation of heaps that sorts
+    them: The canonical state's heap i is game_state's heap
+    transform[i].
+    """
+    transform = tuple(sorted(range(len(game_state.board)),
+                             key=lambda heap: game_state.board[heap]))
+    board = tuple(game_state.board[heap] for heap in transform)
+    return game_state._replace(board=board), transform
+
+
+def transform_take(take, transform):
+    heap, amount = take
+    return (transform.index(heap), amount)
+
+
+def inverse_transform(transform):
+    return tuple(transform.index(heap) for heap in range(len(transform)))
+
+
+def compose_transforms(first, second):
+    return tuple(first[heap] for heap in second)
+
 
 def evaluate_if_end_state(game_state):
     if game_state.winner == PLAYER_A:
@@ -138,5 +288,35 @@ class NimAdapter(GameAdapter):
     def node_key(self, game_state):
         return node_key(game_state)
 
+    def node_hash(self, game_state):
+        return node_hash(game_state)
+
+    def update_node_hash(self, game_state, move, node_hash):
+        return update_node_hash(game_state, move, node_hash)
+
+    def expand_state(self, game_state):
+        return expand_state(game_state)
+
+    def state_index(self, game_state):
+        return state_index(game_state)
+
+    def state_from_index(self, index):
+        return state_from_index(index)
+
+    def num_state_indices(self):
+        return NUM_STATE_INDICES
+
+    def canonical_form(self, game_state):
+        return canonical_form(game_state)
+
+    def transform_move(self, move, transform):
+        return transform_take(move, transform)
+
+    def inverse_transform(self, transform):
+        return inverse_transform(transform)
+
+    def compose_transforms(self, first, second):
+        return compose_transforms(first, second)
+
     def __repr__(self):
         return textual_repr(self.state)  # FIXME: Eeew, it's touching guts!
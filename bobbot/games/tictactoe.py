@@ -1,3 +1,4 @@
+import random
 from collections import namedtuple
 
 from bobbot.search_node import GameAdapter
@@ -11,6 +12,54 @@ GameState = namedtuple('GameState', ['board', 'active_player'])
 PLAYER_X = 1
 PLAYER_O = 2
 
+# Random bitstrings for Zobrist hashing; seeded so that hashes are the
+# same in every process.
+_zobrist_random = random.Random(0)
+ZOBRIST_FIELDS = {(x, y): {PLAYER_X: _zobrist_random.getrandbits(64),
+                           PLAYER_O: _zobrist_random.getrandbits(64)}
+                  for x in range(3) for y in range(3)}
+
+
+COORDS = [(x, y) for x in range(3) for y in range(3)]  # In node_key() order
+
+# Number of indices of state_index(): Each field is empty, X or O.
+NUM_STATE_INDICES = 3 ** len(COORDS)
+
+# Rows, columns and diagonals, as lists of coords
+LINES = ([[(x, y) for x in range(3)] for y in range(3)] +
+         [[(x, y) for y in range(3)] for x in range(3)] +
+         [[(b, b) for b in range(3)],
+          [(b, 2 - b) for b in range(3)]])
+
+# {coord: [lines of coords through it]}
+LINES_THROUGH = {coord: [line for line in LINES if coord in line]
+                 for coord in COORDS}
+
+# The symmetries of the board: Its rotations and reflections, as maps of
+# coordinates. Transforms are indices into this list; 0 is the identity.
+SYMMETRIES = [lambda x, y: (x, y),
+              lambda x, y: (2 - y, x),
+              lambda x, y: (2 - x, 2 - y),
+              lambda x, y: (y, 2 - x),
+              lambda x, y: (2 - x, y),
+              lambda x, y: (x, 2 - y),
+              lambda x, y: (y, x),
+              lambda x, y: (2 - y, 2 - x)]
+
+
+def _symmetry_index(coord_map):
+    coords = [(x, y) for x in range(3) for y in range(3)]
+    return next(transform for transform, symmetry in enumerate(SYMMETRIES)
+                if all(symmetry(*c) == coord_map(*c) for c in coords))
+
+
+# COMPOSITIONS[first][second] applies first, then second.
+COMPOSITIONS = [[_symmetry_index(lambda x, y: second(*first(x, y)))
+                 for second in SYMMETRIES]
+                for first in SYMMETRIES]
+INVERSES = [compositions.index(0) for compositions in COMPOSITIONS]
+
+
 def player_symbol(state):
     return {PLAYER_X: "X",
             PLAYER_O: "O",
@@ -129,6 +178,114 @@ def node_key(game_state):
                     for y in range(3)])
 
 
+def node_hash(game_state):
+    """Zobrist hash of the board; like node_key(), it doesn't include
+    the active player, as that can be derived from the board.
+    """
+    result = 0
+    for coord, field in game_state.board.items():
+        if field is not None:
+            result ^= ZOBRIST_FIELDS[coord][field]
+    return result
+
+
+def update_node_hash(game_state, coord, game_state_hash):
+    """Zobrist hash of make_move(game_state, coord), given the hash of
+    game_state.
+    """
+    return game_state_hash ^ ZOBRIST_FIELDS[coord][game_state.active_player]
+
+
+def state_index(game_state):
+    """Number of the state in 0 .. NUM_STATE_INDICES - 1: The fields,
+    in node_key() order, are the digits of a base 3 number, with 0 for
+    empty fields. Like node_key(), it doesn't include the active
+    player, as that can be derived from the board.
+    """
+    index = 0
+    for coord in COORDS:
+        index = index * 3 + (game_state.board[coord] or 0)
+    return index
+
+
+def state_from_index(index):
+    """The state that state_index() numbers index."""
+    fields = []
+    for _ in COORDS:
+        index, field = divmod(index, 3)
+        fields.append(field or None)
+    board = dict(zip(COORDS, reversed(fields)))
+    has_line = any(board[a] is not None and board[a] == board[b] == board[c]
+                   for a, b, c in LINES)
+    if has_line or None not in fields:
+        active_player = None
+    elif fields.count(PLAYER_X) == fields.count(PLAYER_O):
+        active_player = PLAYER_X
+    else:
+        active_player = PLAYER_O
+    return GameState(board=board, active_player=active_player)
+
+
+def expand_state(game_state):
+    """All successors of game_state at once, as (move, successor state,
+    node key, is terminal, evaluation) tuples. Only the lines through
+    the new mark are checked for a win, and keys are derived from the
+    key of game_state.
+    """
+    if is_finished(game_state):
+        return []
+    board = game_state.board
+    player = game_state.active_player
+    if player == PLAYER_X:
+        next_player = PLAYER_O
+    else:
+        next_player = PLAYER_X
+    empty_fields = [coord for coord in COORDS if board[coord] is None]
+    is_last_move = len(empty_fields) == 1
+    key = node_key(game_state)
+    symbol = player_symbol(player)
+    expansion = []
+    for coord in empty_fields:
+        successor_board = dict(board)
+        successor_board[coord] = player
+        has_won = any(all(successor_board[c] == player for c in line)
+                      for line in LINES_THROUGH[coord])
+        if has_won:
+            successor = GameState(board=successor_board, active_player=None)
+            evaluation = {player: 1, next_player: -1}
+        elif is_last_move:
+            successor = GameState(board=successor_board, active_player=None)
+            evaluation = {PLAYER_X: -0.5, PLAYER_O: -0.5}
+        else:
+            successor = GameState(board=successor_board,
+                                  active_player=next_player)
+            evaluation = {PLAYER_X: 0, PLAYER_O: 0}
+        index = coord[0] * 3 + coord[1]
+        successor_key = key[:index] + symbol + key[index + 1:]
+        expansion.append((coord, successor, successor_key,
+                          has_won or is_last_move, evaluation))
+    return expansion
+
+
+def transform_coord(coord, transform):
+    return SYMMETRIES[transform](*coord)
+
+
+def canonical_form(game_state):
+    """The symmetric state with the smallest node_key(), and the index
+    of the symmetry that maps game_state onto it.
+    """
+    candidates = []
+    for transform in range(len(SYMMETRIES)):
+        board = {transform_coord(coord, transform): field
+                 for coord, field in game_state.board.items()}
+        candidate = GameState(board=board,
+                              active_player=game_state.active_player)
+        candidates.append((node_key(candidate), transform, candidate))
+    _, transform, canonical_state = min(candidates)
+    return canonical_state, transform
+
+
 # TODO: GameAdapter needs to pass the state in the first place.
 class TicTacToeAdapter(GameAdapter):
     def starting_state(self):
@@ -155,5 +312,35 @@ class TicTacToeAdapter(GameAdapter):
     def node_key(self, game_state):
         return node_key(game_state)
 
+    def node_hash(self, game_state):
+        return node_hash(game_state)
+
+    def update_node_hash(self, game_state, move, node_hash):
+        return update_node_hash(game_state, move, node_hash)
+
+    def expand_state(self, game_state):
+        return expand_state(game_state)
+
+    def state_index(self, game_state):
+        return state_index(game_state)
+
+    def state_from_index(self, index):
+        return state_from_index(index)
+
+    def num_state_indices(self):
+        return NUM_STATE_INDICES
+
+    def canonical_form(self, game_state):
+        return canonical_form(game_state)
+
+    def transform_move(self, move, transform):
+        return transform_coord(move, transform)
+
+    def inverse_transform(self, transform):
+        return INVERSES[transform]
+
+    def compose_transforms(self, first, second):
+        return COMPOSITIONS[first][second]
+
     def __repr__(self):
         return textual_repr(self.state)
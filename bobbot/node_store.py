@@ -0,0 +1,334 @@
+from array import array
+from collections.abc import Mapping, MutableMapping, Sequence
+
+
+class NodeStore(Mapping):
+    """Keeps the nodes of a search tree in struct-of-arrays form instead
+    of as one SearchNode object per node. Nodes are identified by
+    integer ids, which index these arrays:
+
+    * .node_keys and .node_states: node key and game state
+    * .expanded: a flag for whether the node has been expanded
+    * .scores: {player: scores}, if the nodes have scores
+    * .successor_start, .successor_count: the node's range in the
+      edge arrays. Since a node's successors are all added at once,
+      these form a compressed sparse row (CSR) adjacency list.
+
+    Edges are stored in .edge_sources, .edge_targets and .edge_moves.
+    Predecessor edges of a node form a linked list through
+    .predecessor_head and .edge_next_predecessor, as nodes can be
+    found as successors of more nodes at any time.
+
+    As a mapping, this maps node keys to thin views onto the nodes (see
+    NodeViewMixin), so it can be used as a BaseAI's search tree. Views
+    are created on access and not kept, so the memory used per node is
+    that of its state, its key, and a few array entries.
+    """
+
+    def __init__(self):
+        self.view_class = None
+        self.evaluate = None
+        self.ids = {}
+        self.node_keys = []
+        self.node_states = []
+        self.expanded = bytearray()
+        self.scores = {}
+        self.successor_start = array('q')
+        self.successor_count = array('i')
+        self.predecessor_head = array('q')
+        self.edge_sources = array('q')
+        self.edge_targets = array('q')
+        self.edge_next_predecessor = array('q')
+        self.edge_moves = []
+
+    def add(self, key, state, score=None):
+        """Add a node, and return its id. If score is None, it is taken
+        from the evaluation function of the node class.
+        """
+        node_id = len(self.node_keys)
+        self.ids[key] = node_id
+        self.node_keys.append(key)
+        self.node_states.append(state)
+        self.expanded.append(0)
+        if self.scores:
+            if score is None:
+                score = self.evaluate(state)
+            for player, player_scores in self.scores.items():
+                player_scores.append(score[player])
+        self.successor_start.append(0)
+        self.successor_count.append(0)
+        self.predecessor_head.append(-1)
+        return node_id
+
+    def node_id(self, key):
+        """The id of the node with the key, or None if there is none."""
+        return self.ids.get(key)
+
+    def add_node(self, node):
+        """Add a SearchNode's data, and return its id. The first node
+        added determines the class of views and the players scores are
+        kept for.
+        """
+        if self.view_class is None:
+            self.view_class = type(node.__class__.__name__ + 'View',
+                                   (NodeViewMixin, node.__class__),
+                                   {})
+            self.evaluate = node.evaluate
+            if hasattr(node, 'score'):
+                self.scores = self.create_score_arrays(node.score)
+        return self.add(node._node_key(), node.state,
+                        getattr(node, 'score', None))
+
+    def create_score_arrays(self, players):
+        return {player: array('d') for player in players}
+
+    def add_successors(self, node_id, moves, successor_ids):
+        """Add the edges to all successors of a node, and mark it as
+        expanded.
+        """
+        assert not self.expanded[node_id]
+        self.successor_start[node_id] = len(self.edge_targets)
+        self.successor_count[node_id] = len(successor_ids)
+        for move, successor_id in zip(moves, successor_ids):
+            edge = len(self.edge_targets)
+            self.edge_sources.append(node_id)
+            self.edge_targets.append(successor_id)
+            self.edge_moves.append(move)
+            self.edge_next_predecessor.append(self.predecessor_head[successor_id])
+            self.predecessor_head[successor_id] = edge
+        self.expanded[node_id] = 1
+
+    def successor_edges(self, node_id):
+        start = self.successor_start[node_id]
+        return range(start, start + self.successor_count[node_id])
+
+    def successor_ids(self, node_id):
+        return [self.edge_targets[edge]
+                for edge in self.successor_edges(node_id)]
+
+    def predecessor_ids(self, node_id):
+        """Ids of the node's predecessors that haven't been deleted."""
+        predecessors = []
+        edge = self.predecessor_head[node_id]
+        while edge != -1:
+            source = self.edge_sources[edge]
+            if self.node_states[source] is not None:
+                predecessors.append(source)
+            edge = self.edge_next_predecessor[edge]
+        return predecessors
+
+    def view(self, node_id):
+        return self.view_class(self, node_id)
+
+    def __getitem__(self, key):
+        return self.view(self.ids[key])
+
+    def __contains__(self, key):
+        return key in self.ids
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __delitem__(self, key):
+        """Forget a node. Its id and array entries are not reused, only
+        its state is released.
+        """
+        node_id = self.ids.pop(key)
+        self.node_states[node_id] = None
+
+
+class IndexedNodeStore(NodeStore):
+    """A NodeStore for games that number their states (see
+    search_node.StateIndexKeyMixin), with the state indices as node
+    keys and as node ids. The per-node arrays are allocated for all
+    num_states states up front, so nodes are looked up by indexing
+    instead of through a dict, and neither their keys nor their states
+    are stored: States are recreated by state_from_index on access.
+    This leaves a few bytes per state, plus the edges of expanded
+    nodes.
+    """
+
+    def __init__(self, num_states, state_from_index):
+        super().__init__()
+        self.num_states = num_states
+        self.state_from_index = state_from_index
+        self.size = 0
+        self.present = bytearray(num_states)
+        self.node_keys = range(num_states)
+        self.node_states = IndexedStates(self)
+        self.expanded = bytearray(num_states)
+        self.successor_start = array('q', [0]) * num_states
+        self.successor_count = array('i', [0]) * num_states
+        self.predecessor_head = array('q', [-1]) * num_states
+
+    def add(self, key, state, score=None):
+        node_id = key
+        assert not self.present[node_id]
+        self.present[node_id] = 1
+        self.size += 1
+        # The node may have been deleted before; its edges are gone.
+        self.expanded[node_id] = 0
+        self.successor_count[node_id] = 0
+        if self.scores:
+            if score is None:
+                score = self.evaluate(state)
+            for player, player_scores in self.scores.items():
+                player_scores[node_id] = score[player]
+        return node_id
+
+    def create_score_arrays(self, players):
+        return {player: array('d', [0.0]) * self.num_states
+                for player in players}
+
+    def node_id(self, key):
+        if self.present[key]:
+            return key
+        return None
+
+    def predecessor_ids(self, node_id):
+        """Ids of the node's predecessors that haven't been deleted
+        since they were expanded.
+        """
+        predecessors = []
+        edge = self.predecessor_head[node_id]
+        while edge != -1:
+            source = self.edge_sources[edge]
+            if (self.present[source] and
+                    edge in self.successor_edges(source)):
+                predecessors.append(source)
+            edge = self.edge_next_predecessor[edge]
+        return predecessors
+
+    def __getitem__(self, key):
+        if not (0 <= key < self.num_states and self.present[key]):
+            raise KeyError(key)
+        return self.view(key)
+
+    def __contains__(self, key):
+        return 0 <= key < self.num_states and bool(self.present[key])
+
+    def __iter__(self):
+        return (key for key in range(self.num_states) if self.present[key])
+
+    def __len__(self):
+        return self.size
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.present[key] = 0
+        self.size -= 1
+
+
+class IndexedStates(Sequence):
+    """The states of an IndexedNodeStore, by node id; None for states
+    that aren't in it.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, node_id):
+        if not self.store.present[node_id]:
+            return None
+        return self.store.state_from_index(node_id)
+
+    def __len__(self):
+        return self.store.num_states
+
+
+class ScoreView(MutableMapping):
+    """{player: score} of a node in a NodeStore."""
+
+    def __init__(self, store, node_id):
+        self.store = store
+        self.node_id = node_id
+
+    def __getitem__(self, player):
+        return self.store.scores[player][self.node_id]
+
+    def __setitem__(self, player, score):
+        self.store.scores[player][self.node_id] = score
+
+    def __delitem__(self, player):
+        raise TypeError("Scores of stored nodes can't be deleted")
+
+    def __iter__(self):
+        return iter(self.store.scores)
+
+    def __len__(self):
+        return len(self.store.scores)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class NodeViewMixin:
+    """Turns a SearchNode class into one of views onto nodes in a
+    NodeStore. The node's data attributes are read from and written to
+    the store's arrays, while the game rules, scoring and move choosing
+    methods of the class are used as they are. Views of the same node
+    are equal.
+
+    Views are expanded only through the store, as ArrayNodeStoreMixin
+    does, since their successors have to be added to it; don't call
+    .expand() on them. Score updates are deferred (see
+    DeferredBackpropagationMixin), so ArrayNodeStoreMixin requires
+    BatchedBackpropagationMixin for nodes with scores.
+    """
+    backpropagate_immediately = False
+
+    def __init__(self, store, node_id):
+        self.store = store
+        self.node_id = node_id
+
+    def __eq__(self, other):
+        return (isinstance(other, NodeViewMixin) and
+                self.store is other.store and
+                self.node_id == other.node_id)
+
+    def __hash__(self):
+        return self.node_id
+
+    @property
+    def state(self):
+        return self.store.node_states[self.node_id]
+
+    @property
+    def key(self):
+        return self.store.node_keys[self.node_id]
+
+    @property
+    def is_expanded(self):
+        return bool(self.store.expanded[self.node_id])
+
+    @property
+    def score(self):
+        return ScoreView(self.store, self.node_id)
+
+    @property
+    def successors(self):
+        store = self.store
+        return {store.node_keys[successor_id]: store.view(successor_id)
+                for successor_id in store.successor_ids(self.node_id)}
+
+    @property
+    def moves(self):
+        store = self.store
+        return {store.edge_moves[edge]: store.node_keys[store.edge_targets[edge]]
+                for edge in store.successor_edges(self.node_id)}
+
+    @property
+    def known_predecessors(self):
+        return {self.store.view(predecessor_id)
+                for predecessor_id in self.store.predecessor_ids(self.node_id)}
+
+    def get_successor(self, move):
+        store = self.store
+        for edge in store.successor_edges(self.node_id):
+            if store.edge_moves[edge] == move:
+                return store.view(store.edge_targets[edge])
+        raise KeyError(move)
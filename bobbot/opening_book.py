@@ -0,0 +1,51 @@
+import pickle
+
+from .search_tree import BaseAI, AlphaBetaSearchMixin
+
+
+BookAI = type('BookAI', (AlphaBetaSearchMixin, BaseAI), {})
+
+
+def build_opening_book(game, plies, search_depth=None,
+                       transposition_table=None):
+    """Search every state within the given number of plies from the
+    game's starting state with AlphaBetaSearchMixin. This is meant to
+    be run offline, so search_depth can be deep; by default, it is
+    unlimited.
+
+    Args:
+        game (GameAdapter): The game to build the book for. Its class
+            is used to create nodes for the book's states.
+        plies (int): Number of plies covered by the book.
+        search_depth (int): Depth of the search for each state.
+        transposition_table (TranspositionTable): Shared by all
+            searches, which speeds up searching related states.
+
+    Returns:
+        dict: {node_key: (best move, its value for the active player)}
+    """
+    book = {}
+    layer = {game._node_key(): game}
+    for _ in range(plies):
+        next_layer = {}
+        for node_key, node in layer.items():
+            if node._is_finished():
+                continue
+            ai = BookAI(node,
+                        search_depth=search_depth,
+                        transposition_table=transposition_table)
+            book[node_key] = ai.alpha_beta_search()
+            for successor in node.expand():
+                next_layer.setdefault(successor._node_key(), successor)
+        layer = next_layer
+    return book
+
+
+def save_opening_book(book, path):
+    with open(path, 'wb') as f:
+        pickle.dump(book, f)
+
+
+def load_opening_book(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
@@ -1,3 +1,106 @@
+import weakref
+from functools import lru_cache
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def expand_state(node, game_state, node_key, evaluate=True):
+    """Compute all successors of a game state with a node's game rules.
+    The node's own state is not used, so this can run for any state,
+    i.e. in a worker process that got sent a node once, and states
+    to expand afterwards.
+
+    If the game provides the .expand_state() hook (see GameAdapter),
+    the successors are taken from that. Its evaluations are only used
+    if .evaluate() hasn't been overridden since; otherwise, successors
+    are evaluated by .evaluate().
+
+    Returns:
+        list: (move, successor state, successor key, evaluation)
+            tuples; evaluation is None unless evaluate is True.
+    """
+    expand_game_state = getattr(node, 'expand_state', None)
+    if expand_game_state is not None:
+        keys_are_node_keys = node.expand_state_keys_are_node_keys
+        evaluations_are_own = _expand_state_evaluates(type(node))
+        expansion = []
+        for (move, successor_state, successor_key, _,
+             evaluation) in expand_game_state(game_state):
+            if not keys_are_node_keys:
+                successor_key = node.successor_key(game_state, move,
+                                                   successor_state, node_key)
+            if not evaluate:
+                evaluation = None
+            elif not evaluations_are_own:
+                evaluation = node.evaluate(successor_state)
+            expansion.append((move, successor_state, successor_key,
+                              evaluation))
+        return expansion
+
+    # This computes each move twice; games can avoid that by providing
+    # .expand_state().
+    expansion = []
+    for move in node.all_legal_moves(game_state):
+        successor_state = node.make_move(game_state, move)
+        successor_key = node.successor_key(game_state, move,
+                                           successor_state, node_key)
+        if evaluate:
+            evaluation = node.evaluate(successor_state)
+        else:
+            evaluation = None
+        expansion.append((move, successor_state, successor_key, evaluation))
+    return expansion
+
+
+@lru_cache(maxsize=None)
+def _expand_state_evaluates(node_class):
+    """Whether the evaluations of node_class's .expand_state() are
+    those of its .evaluate(), i.e. .evaluate() isn't overridden by a
+    class that comes before the one providing .expand_state().
+    """
+    mro = node_class.__mro__
+    owners = {}
+    for name in ('expand_state', 'evaluate'):
+        owners[name] = next(index for index, cls in enumerate(mro)
+                            if name in vars(cls))
+    return owners['evaluate'] >= owners['expand_state']
+
+
+def evaluate_states(node, game_states):
+    """Evaluate game states with a node's game rules. If NumPy is
+    available and the game provides .encode_state() and
+    .evaluate_batch() (see GameAdapter), the unfinished states are
+    encoded into one feature matrix, and evaluated by one call;
+    finished ones are always evaluated by .evaluate().
+
+    Returns:
+        list: {player: score} for each state
+    """
+    if numpy is None or not hasattr(node, 'evaluate_batch'):
+        return [node.evaluate(game_state) for game_state in game_states]
+    evaluations = [None] * len(game_states)
+    unfinished = []
+    for index, game_state in enumerate(game_states):
+        if node.is_finished(game_state):
+            evaluations[index] = node.evaluate(game_state)
+        else:
+            unfinished.append(index)
+    if unfinished:
+        features = numpy.array([node.encode_state(game_states[index])
+                                for index in unfinished],
+                               dtype=float)
+        scores = {player: player_scores.tolist()
+                  for player, player_scores
+                  in node.evaluate_batch(features).items()}
+        for row, index in enumerate(unfinished):
+            evaluations[index] = {player: player_scores[row]
+                                  for player, player_scores in scores.items()}
+    return evaluations
+
+
 class SearchNode:
     """Implements expansion of new nodes, and merging of instances of
     nodes, which may be required after the same state has been
@@ -6,10 +109,11 @@ class SearchNode:
     Public methods: .expand(), .post_expansio_insertion()
     """
 
-    def __init__(self, state=None, known_predecessors=None):
+    def __init__(self, state=None, known_predecessors=None, key=None):
         if state is None:
             state = self._starting_state()
         self.state = state
+        self.key = key # Cached node key, computed on first use if None
 
         if known_predecessors is None:
             known_predecessors = set()
@@ -20,7 +124,7 @@ class SearchNode:
         self.successors = {} # {key: state} to keep a ref to the successor
         self.moves = {} # {move: key}
 
-    def expand(self):
+    def expand(self, expansion=None):
         """Return all successor states for this state. This doesn't
         store them in this state object; .post_expansion_insertion()
         has to be used for that. The reason for this is that any state
@@ -29,24 +133,66 @@ class SearchNode:
         responsibility to detecht such duplications, and indicate them
         when calling .post_expansion_insertion().
 
+        Args:
+            expansion (list): Optional, already computed successors as
+                (move, successor state, successor key, evaluation)
+                tuples, i.e. by expand_state() in another process.
+                evaluation may be None.
+
         Returns: SearchNode objects.
-        Requires: ._make_move(), ._all_legal_moves(), ._node_key()
+        Requires: ._make_move(), ._all_legal_moves(), ._node_key(),
+            ._successor_key()
         """
 
-        # TODO: This computes each move twice. Optimize!
+        if expansion is None:
+            expansion = expand_state(self, self.state, self._node_key(),
+                                     evaluate=hasattr(self, 'score'))
+        successors = self.create_successors(expansion)
+        self.is_expanded = True
+        return successors
+
+    def expand_move(self, move):
+        """Like .expand(), but only return the successor for move. The
+        node stays unexpanded, but partially so: .moves only holds the
+        moves expanded this way, and .successors the corresponding
+        nodes once they have been inserted.
+        """
+        successor_state = self._make_move(move)
+        successor_key = self._successor_key(move, successor_state)
+        successor, = self.create_successors(
+            [(move, successor_state, successor_key, None)])
+        return successor
+
+    @property
+    def is_partially_expanded(self):
+        return not self.is_expanded and bool(self.moves)
+
+    def create_successors(self, expansion):
+        """Create the successor nodes for (move, successor state,
+        successor key, evaluation) tuples, and add their moves to
+        .moves.
+        """
         # TODO: Can I be sure that there aren't any more kwargs?
-        move_to_successor = {move: self.__class__(state=self._make_move(move),
-                                                  known_predecessors={self})
-                             for move in self._all_legal_moves()}
+        move_to_successor = {}
+        for move, successor_state, successor_key, evaluation in expansion:
+            if evaluation is None:
+                successor = self.__class__(state=successor_state,
+                                           known_predecessors={self},
+                                           key=successor_key)
+            else:
+                successor = self.__class__(state=successor_state,
+                                           known_predecessors={self},
+                                           key=successor_key,
+                                           score=evaluation)
+            move_to_successor[move] = successor
         # moves are {move: successor_node_key}, so unlike the actual
         # successor state instance (which might be a spurious
         # duplicate that will be removed during merge), these can
         # safely be stored here; the node_key of both instances has
         # to be the same to be valid.
-        self.moves = {move: state._node_key()
-                      for move, state in move_to_successor.items()}
-        self.is_expanded = True
-        return move_to_successor.values()
+        self.moves.update({move: state._node_key()
+                           for move, state in move_to_successor.items()})
+        return list(move_to_successor.values())
 
     def post_expansion_insertion(self, old, new):
         """Gets called after this node has been expanded and its new
@@ -68,6 +214,7 @@ class SearchNode:
 
         if not self.is_expanded and other_instance.is_expanded:
             self.successors = other_instance.successors
+            self.moves = other_instance.moves
             self.is_expanded = True
         self.known_predecessors.add(*other_instance.known_predecessors)
 
@@ -102,7 +249,32 @@ class SearchNode:
 class GameAdapter(SearchNode):
     """Helper class to create and test integrations with game rule
     implementations more easily.
+
+    Games can optionally provide .expand_state(game_state), returning
+    (move, successor state, successor key, is terminal, evaluation)
+    tuples for all legal moves at once, which is then used instead of
+    calling .all_legal_moves(), .make_move(), .node_key() and
+    .evaluate() for each move. The keys have to be those of
+    .node_key(); mixins that change node keys set
+    .expand_state_keys_are_node_keys to False, so that keys are
+    computed with .successor_key() instead. Likewise, the evaluations
+    have to be those of .evaluate(); subclasses and mixins overriding
+    that get their successors evaluated by it.
+
+    Games can also optionally provide .encode_state(game_state),
+    returning a state's features as a sequence of numbers, and
+    .evaluate_batch(features), which takes the features of several
+    unfinished states as the rows of a NumPy matrix, and returns
+    {player: array of scores}, so that they can be evaluated in one
+    vectorized call. See evaluate_states().
+
+    Games with small state spaces can optionally number their states,
+    by providing .state_index(game_state), its inverse
+    .state_from_index(index), and .num_state_indices(). Indices have to
+    be in range(.num_state_indices()), and distinguish the same states
+    that .node_key() does. See StateIndexKeyMixin.
     """
+    expand_state_keys_are_node_keys = True
 
     def _starting_state(self):
         return self.starting_state()
@@ -141,11 +313,67 @@ class GameAdapter(SearchNode):
         raise NotImplementedError("Game does not implement .winner()")
 
     def _node_key(self):
-        return self.node_key(self.state)
+        if self.key is None:
+            self.key = self.node_key(self.state)
+        return self.key
 
     def node_key(self, game_state):
         raise NotImplementedError("Game does not implement .node_key()")
 
+    def _successor_key(self, move, successor_state):
+        return self.successor_key(self.state, move, successor_state,
+                                  self._node_key())
+
+    def successor_key(self, game_state, move, successor_state, node_key):
+        """Return the node key of successor_state, which is reached by
+        making move in game_state, which has the key node_key. Games
+        with incrementally updatable keys can override this.
+        """
+        return self.node_key(successor_state)
+
+    def _node_hash(self):
+        return self.node_hash(self.state)
+
+    def node_hash(self, game_state):
+        raise NotImplementedError("Game does not implement .node_hash()")
+
+    def update_node_hash(self, game_state, move, node_hash):
+        raise NotImplementedError("Game does not implement "
+                                  ".update_node_hash()")
+
+    def state_index(self, game_state):
+        raise NotImplementedError("Game does not implement .state_index()")
+
+    def state_from_index(self, index):
+        raise NotImplementedError("Game does not implement "
+                                  ".state_from_index()")
+
+    def num_state_indices(self):
+        raise NotImplementedError("Game does not implement "
+                                  ".num_state_indices()")
+
+    def canonical_form(self, game_state):
+        """Return (canonical state, transform): The representative of
+        all states that are equivalent to game_state under the game's
+        symmetries, and the transform that maps game_state onto it.
+        Games with symmetries can override this and the other transform
+        methods; by default, each state is its own canonical form.
+        """
+        return game_state, None
+
+    def transform_move(self, move, transform):
+        """Return the move that corresponds to move in the state that
+        transform maps the move's state onto.
+        """
+        return move
+
+    def inverse_transform(self, transform):
+        return transform
+
+    def compose_transforms(self, first, second):
+        """Return the transform that applies first, then second."""
+        return None
+
     def _evaluate(self):
         return self.evaluate(self.state)
 
@@ -153,7 +381,90 @@ class GameAdapter(SearchNode):
         raise NotImplementedError("Game does not implement .evaluate()")
 
     def __repr__(self):
-        return self._node_key()
+        return str(self._node_key())
+
+
+# Node keys
+
+
+class ZobristKeyMixin:
+    """Uses the game's integer hash (usually a Zobrist hash) as node
+    key instead of .node_key(). The hash of a successor is derived
+    from its predecessor's one by .update_node_hash(), so it never has
+    to be computed from scratch during expansion.
+
+    Requires: .node_hash(), .update_node_hash()
+    """
+    expand_state_keys_are_node_keys = False
+
+    def node_key(self, game_state):
+        return self.node_hash(game_state)
+
+    def successor_key(self, game_state, move, successor_state, node_key):
+        return self.update_node_hash(game_state, move, node_key)
+
+
+class StateIndexKeyMixin:
+    """Uses the game's state index as node key instead of .node_key(),
+    so that nodes can be kept in arrays indexed by their keys. See
+    node_store.IndexedNodeStore.
+
+    Requires: .state_index(), .state_from_index(), .num_state_indices()
+    """
+    expand_state_keys_are_node_keys = False
+
+    def node_key(self, game_state):
+        return self.state_index(game_state)
+
+    def successor_key(self, game_state, move, successor_state, node_key):
+        return self.state_index(successor_state)
+
+
+class CanonicalStatesMixin:
+    """Replaces the successors found during expansion by their
+    canonical forms, so that all successors that are equivalent under
+    the game's symmetries get the same node key, and are merged by the
+    search tree. Moves stay those of this node's state; for each move,
+    .move_transforms holds the transform from the state that the move
+    actually leads to onto the successor's state. See
+    search_tree.SymmetryMixin.
+
+    Requires: .canonical_form()
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.move_transforms = {}
+
+    def create_successors(self, expansion):
+        canonical_expansion = []
+        for move, successor_state, successor_key, evaluation in expansion:
+            canonical_state, transform = self.canonical_form(successor_state)
+            self.move_transforms[move] = transform
+            # Incrementally updated keys are those of the actual
+            # successor, so the canonical one has to be computed anew.
+            canonical_expansion.append((move, canonical_state, None,
+                                        evaluation))
+        return super().create_successors(canonical_expansion)
+
+    def merge(self, other_instance):
+        if not self.is_expanded and other_instance.is_expanded:
+            self.move_transforms = other_instance.move_transforms
+        super().merge(other_instance)
+
+    def get_successor_transform(self, move):
+        return self.move_transforms[move]
+
+
+# Predecessor references
+
+
+class WeakPredecessorsMixin:
+    """Keeps only weak references to predecessors, so that successors
+    don't keep them alive. See search_tree.WeakrefPruningMixin.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.known_predecessors = weakref.WeakSet(self.known_predecessors)
 
 
 # Score management
@@ -163,10 +474,17 @@ class GameAdapter(SearchNode):
 #   pretty much every time that a score has been updated. There have
 #   to be approaches where each node has to update only once even
 #   without traversing the whole tree in the beginning.
+#   DeferredBackpropagationMixin together with the search tree's
+#   BatchedBackpropagationMixin is one.
 class BackpropagationScoringMixin:
-    def __init__(self, *args, **kwargs):
+    # Whether score changes are immediately propagated to predecessors.
+    backpropagate_immediately = True
+
+    def __init__(self, *args, score=None, **kwargs):
         super().__init__(*args, **kwargs)
-        self.score = self._evaluate()
+        if score is None:
+            score = self._evaluate()
+        self.score = score
 
     def backpropagate_score(self):
         for node in self.known_predecessors:
@@ -174,15 +492,25 @@ class BackpropagationScoringMixin:
 
     def post_expansion_insertion(self, old, new):
         super().post_expansion_insertion(old, new)
-        if old or new:
+        if (old or new) and self.is_expanded and self.backpropagate_immediately:
             self.update_score()
 
     def merge(self, other_instance):
         super().merge(other_instance)
-        if self.successors:
+        if (self.is_expanded and self.successors and
+                self.backpropagate_immediately):
             self.update_score()
 
     def update_score(self):
+        """Recalculate the score from the successors' ones. Nodes that
+        aren't fully expanded keep their evaluation, as the successors
+        that are known may not include the best moves.
+
+        Returns:
+            bool: Whether the score has changed.
+        """
+        if not self.is_expanded or not self.successors:
+            return False
         has_been_updated = False
         for player in self.score:
             successor_scores = [successor.score[player]
@@ -191,8 +519,52 @@ class BackpropagationScoringMixin:
             if new_score != self.score[player]:
                 self.score[player] = new_score
                 has_been_updated = True
-        if has_been_updated:
+        if has_been_updated and self.backpropagate_immediately:
             self.backpropagate_score()
+        return has_been_updated
+
+
+class DeferredBackpropagationMixin:
+    """Keeps BackpropagationScoringMixin from updating scores whenever
+    they may have changed. Instead, the search tree has to call
+    .update_score() on the affected nodes, as BatchedBackpropagationMixin
+    does once per expansion step.
+    """
+    backpropagate_immediately = False
+
+
+class ScoreStatisticsMixin:
+    """Reports score updates to the statistics of
+    search_tree.StatisticsMixin, which hands them to the nodes as it
+    adds them: Each update as one of score_updates, those that changed
+    the score as score_changes, and each update that isn't part of
+    another one's backpropagation as one of backpropagation_cascades,
+    with the number of updates made in it as its length. Put this
+    before the scoring mixin.
+    """
+    statistics = None
+
+    def update_score(self):
+        statistics = self.statistics
+        if statistics is None:
+            return super().update_score()
+        statistics.count('score_updates')
+        if statistics.cascade_length:
+            statistics.cascade_length += 1
+            has_been_updated = super().update_score()
+        else:
+            statistics.count('backpropagation_cascades')
+            statistics.cascade_length = 1
+            try:
+                with statistics.phase('score'):
+                    has_been_updated = super().update_score()
+                statistics.maximum('backpropagation_cascade_length',
+                                   statistics.cascade_length)
+            finally:
+                statistics.cascade_length = 0
+        if has_been_updated:
+            statistics.count('score_changes')
+        return has_been_updated
 
 
 class MinMaxScoringMixin(BackpropagationScoringMixin):
@@ -204,6 +576,30 @@ class MinMaxScoringMixin(BackpropagationScoringMixin):
         return new_score
 
 
+class MonteCarloStatisticsMixin:
+    """Playout statistics for Monte Carlo tree search: How often the
+    node has been visited, and the sum of the rewards of those visits
+    for the player who moved into it.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.visits = 0
+        self.reward_sum = 0.0
+
+
+class ProofNumberMixin:
+    """Proof and disproof numbers for proof-number search: the number
+    of nodes that would at least have to be proven to prove (or
+    disprove) that the node is a win for the searching player. They
+    are set by the search tree's ProofNumberSearchMixin.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.proof = 1
+        self.disproof = 1
+        self.proof_search = None  # The search that the numbers are for
+
+
 # Move choosers
 #
 # These SearchNodes implement .find_best_move() and usually require
@@ -232,3 +628,67 @@ class ChooseRandomMoveFromBestMixin:
         best_moves = [move for move in possible_moves
                       if possible_moves[move] == best_score]
         return random.choice(best_moves)
+
+
+class ChooseMoveFromTablebaseMixin:
+    """Chooses moves by looking up the successor states in a tablebase
+    written by bobbot.tablebase.solve_retrograde(), without any search.
+    Wins are preferred over draws over losses, faster wins over slower
+    ones, and slower losses over faster ones.
+
+    Set .tablebase to a bobbot.tablebase.Tablebase, i.e. as class
+    attribute of the game's SearchNode class. As the node doesn't have
+    to be expanded, use it with search_tree.NoExpansionMixin.
+
+    Requires: .node_hash()
+    """
+    tablebase = None
+
+    def find_best_move(self):
+        player = self._active_player()
+        possible_moves = {}
+        for move in self._all_legal_moves():
+            winner, distance = self.tablebase.lookup(
+                self.node_hash(self._make_move(move)))
+            if winner == player:
+                possible_moves[move] = (1, -distance)
+            elif winner == 0:
+                possible_moves[move] = (0, 0)
+            else:
+                possible_moves[move] = (-1, distance)
+        best_score = max(possible_moves.values())
+        best_moves = [move for move in possible_moves
+                      if possible_moves[move] == best_score]
+        return random.choice(best_moves)
+
+
+class ChooseMostVisitedMoveMixin:
+    """Chooses the move that Monte Carlo tree search has visited most,
+    which is more robust than the one with the highest mean reward.
+
+    Requires: MonteCarloStatisticsMixin
+    """
+    def find_best_move(self):
+        assert self.is_expanded
+        possible_moves = {move: self.successors[key].visits
+                          for move, key in self.moves.items()}
+        most_visits = max(possible_moves.values())
+        best_moves = [move for move in possible_moves
+                      if possible_moves[move] == most_visits]
+        return random.choice(best_moves)
+
+
+class ChooseMostProvenMoveMixin:
+    """Chooses a move that proof-number search has proven to win, or
+    else the one that is closest to being proven.
+
+    Requires: ProofNumberMixin
+    """
+    def find_best_move(self):
+        assert self.is_expanded
+        possible_moves = {move: self.successors[key].proof
+                          for move, key in self.moves.items()}
+        best_proof = min(possible_moves.values())
+        best_moves = [move for move in possible_moves
+                      if possible_moves[move] == best_proof]
+        return random.choice(best_moves)
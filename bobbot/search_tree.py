@@ -1,6 +1,19 @@
-from datetime import datetime
+import math
+import random
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
 
-from .search_node import SearchNode
+from .search_node import SearchNode, expand_state, evaluate_states
+from .search_node import ScoreStatisticsMixin
+from .node_store import NodeStore, IndexedNodeStore
+from .transposition_table import TranspositionTable, DEPTH_PREFERRED
+from .transposition_table import SearchResult
+from .transposition_table import EXACT, LOWER_BOUND, UPPER_BOUND
+from .statistics import SearchStatistics
+from .workers import process_pool
 
 
 # Basic functionality
@@ -8,10 +21,30 @@ from .search_node import SearchNode
 class BaseAI:
     def __init__(self, current_state, debug=False):
         self.debug = debug
-        self.search_tree = dict()
+        self.search_tree = self.create_search_tree()
+        self.frontier = self.create_frontier()
         self.current_state = current_state
+        self.expansion_deadline = None
         self.add_node(current_state)
 
+    def create_search_tree(self):
+        """Returns the mapping of node keys to nodes that is used as
+        search tree.
+        """
+        return dict()
+
+    def create_frontier(self):
+        """Returns the mapping of node keys to the unexpanded nodes of
+        the search tree. It is kept up to date as nodes are added,
+        expanded and pruned, so that finding the nodes to expand next
+        doesn't take a scan of the whole search tree.
+        """
+        return dict()
+
+    def unexpanded_nodes(self):
+        """The unexpanded nodes of the search tree."""
+        return list(self.frontier.values())
+
     # FIXME: Move into a diagnostics class
     def num_states(self):
         return len(self.search_tree)
@@ -26,11 +59,10 @@ class BaseAI:
         return chosen_move
 
     def make_move(self, move):
-        if not self.current_state.is_expanded:
-            # FIXME: This should only add the successor for the
-            # requested move.
-            self.expand_single_node(self.current_state)
-        self.current_state = self.current_state.get_successor(move)
+        node = self.current_state
+        if not node.is_expanded and move not in node.moves:
+            self.expand_single_move(node, move)
+        self.current_state = node.get_successor(move)
 
     def play(self):
         """Play automatically, making moves until the game is finished.
@@ -61,31 +93,68 @@ class BaseAI:
         """
         raise NotImplementedError
 
-    def expand_single_node(self, node):
+    def is_past_deadline(self):
+        """Whether .expansion_deadline, a time.monotonic() value set by
+        i.e. BoundedExpansionMixin, has passed. Loops that expand nodes
+        check this between nodes, and stop once it is True.
+        """
+        return (self.expansion_deadline is not None and
+                time.monotonic() >= self.expansion_deadline)
+
+    def expand_single_node(self, node, expansion=None):
+        """Expand the node and insert its successors into the search
+        tree. expansion is passed on to node.expand().
+        """
         assert isinstance(node, SearchNode)
         # TODO: Does it really even make sense to distinguish between these
         #   after adding/merging them to/with the search tree?
         old = {}
         new = {}
-        for successor in node.expand():
+        for successor in node.expand(expansion):
             is_new = self.add_node(successor)
             # FIXME: Ugly copypaste.
             if is_new:
                 new[successor._node_key()] = successor
             else:
-                old[successor._node_key()] = self.search_tree[successor._node_key()]
+                old[successor._node_key()] = self.present_node(successor._node_key())
+        if node.is_expanded:
+            self.frontier.pop(node._node_key(), None)
         node.post_expansion_insertion(old, new)
         return (len(old) + len(new) > 0)
 
+    def expand_single_move(self, node, move):
+        """Insert only the successor of the node for move into the search
+        tree, leaving the node partially expanded.
+        """
+        successor = node.expand_move(move)
+        successor_key = successor._node_key()
+        if self.add_node(successor):
+            node.post_expansion_insertion({}, {successor_key: successor})
+        else:
+            node.post_expansion_insertion(
+                {successor_key: self.present_node(successor_key)}, {})
+
+    def present_node(self, node_key):
+        """The instance of the node that add_node() has merged other
+        instances with.
+        """
+        return self.search_tree[node_key]
+
     def add_node(self, node):
         """Adds the node to the search tree if it isn't present already, or
         causes a merge with the already present instance of it otherwise.
         """
-        if node._node_key() not in self.search_tree:
-            self.search_tree[node._node_key()] = node
+        node_key = node._node_key()
+        if node_key not in self.search_tree:
+            self.search_tree[node_key] = node
+            if not node.is_expanded:
+                self.frontier[node_key] = node
             return True
         else:
-            self.search_tree[node._node_key()].merge(node)
+            present_node = self.search_tree[node_key]
+            present_node.merge(node)
+            if present_node.is_expanded:
+                self.frontier.pop(node_key, None)
             return False
 
     def find_best_move(self):
@@ -106,9 +175,249 @@ class PlayerInterface:
         return self.current_state._winner()
 
 
+class StatisticsMixin:
+    """Collects counters and phase timings in a SearchStatistics object,
+    .statistics, which can be passed in to use sinks. Each
+    .make_move() ends a move of the statistics. Put this first among
+    the mixins, so that it sees all calls.
+
+    Counters: expansions, partial_expansions, expansion_steps,
+    nodes_added, merges, pruned_nodes. Nodes that use
+    search_node.ScoreStatisticsMixin add score_updates, score_changes
+    and backpropagation_cascades, and TranspositionTables used as
+    search tree or by AlphaBetaSearchMixin add transposition_hits and
+    transposition_misses.
+
+    Maxima: search_tree_size (before pruning), and
+    backpropagation_cascade_length with ScoreStatisticsMixin.
+
+    Phases: choose (.choose_move()), expand, insert (.add_node()),
+    score (with ScoreStatisticsMixin), prune (.make_move()). With
+    PonderingMixin, expansions made while pondering are counted as
+    well, mostly towards the move that is made next.
+
+    Without this mixin, no statistics are collected at all.
+    """
+    def __init__(self, *args, statistics=None, **kwargs):
+        if statistics is None:
+            statistics = SearchStatistics()
+        self.statistics = statistics
+        super().__init__(*args, **kwargs)
+        for table in (self.search_tree,
+                      getattr(self, 'transposition_table', None)):
+            if isinstance(table, TranspositionTable):
+                table.statistics = statistics
+
+    def choose_move(self):
+        with self.statistics.phase('choose'):
+            return super().choose_move()
+
+    def make_move(self, move):
+        statistics = self.statistics
+        pre_move_size = len(self.search_tree)
+        pre_move_added = statistics.counters['nodes_added']
+        with statistics.phase('prune'):
+            super().make_move(move)
+        post_move_size = (pre_move_size +
+                          statistics.counters['nodes_added'] - pre_move_added)
+        statistics.maximum('search_tree_size', post_move_size)
+        statistics.count('pruned_nodes',
+                         post_move_size - len(self.search_tree))
+        statistics.end_move()
+
+    def step_search_tree_expansion(self):
+        self.statistics.count('expansion_steps')
+        return super().step_search_tree_expansion()
+
+    def expand_single_node(self, node, expansion=None):
+        self.statistics.count('expansions')
+        with self.statistics.phase('expand'):
+            return super().expand_single_node(node, expansion)
+
+    def expand_single_move(self, node, move):
+        self.statistics.count('partial_expansions')
+        with self.statistics.phase('expand'):
+            super().expand_single_move(node, move)
+
+    def add_node(self, node):
+        statistics = self.statistics
+        with statistics.phase('insert'):
+            is_new = super().add_node(node)
+        if is_new:
+            statistics.count('nodes_added')
+            statistics.maximum('search_tree_size', len(self.search_tree))
+            if isinstance(node, ScoreStatisticsMixin):
+                node.statistics = statistics
+        else:
+            statistics.count('merges')
+        return is_new
+
+
+class SymmetryMixin:
+    """For nodes with search_node.CanonicalStatesMixin, whose states are
+    canonical forms instead of the states actually played. Keeps track
+    of .current_transform, which maps the actual game state onto the
+    current node's state, and translates moves between the two, so
+    that .choose_move() and .make_move() use the moves of the actual
+    game.
+
+    This has to come first among the mixins overriding .make_move().
+    """
+    def __init__(self, current_state, *args, **kwargs):
+        canonical_state, self.current_transform = \
+            current_state.canonical_form(current_state.state)
+        current_state = current_state.__class__(state=canonical_state)
+        super().__init__(current_state, *args, **kwargs)
+
+    def choose_move(self):
+        node = self.current_state
+        return node.transform_move(
+            super().choose_move(),
+            node.inverse_transform(self.current_transform))
+
+    def make_move(self, move):
+        node = self.current_state
+        canonical_move = node.transform_move(move, self.current_transform)
+        super().make_move(canonical_move)
+        self.current_transform = node.compose_transforms(
+            self.current_transform,
+            node.get_successor_transform(canonical_move))
+
+
+class TranspositionTableMixin:
+    """Uses a TranspositionTable with a fixed number of slots as search
+    tree, so that the number of expanded nodes that transpositions are
+    looked up among is bounded. With the DEPTH_PREFERRED replacement
+    policy, expanded nodes are preferred over unexpanded ones.
+
+    Nodes that don't fit into the table, or get displaced from it, stay
+    reachable through their predecessors, and unexpanded ones stay in
+    the frontier until they are expanded, so no leaves are lost. What
+    the bound costs is that new instances of displaced expanded nodes
+    aren't merged with them anymore, so their subtrees get expanded
+    (and kept) once more. Memory is thus only bounded as long as
+    pruning keeps the tree small.
+
+    This works best with integer node keys (see ZobristKeyMixin).
+    """
+    def __init__(self, *args, table_size=2**16, replacement=DEPTH_PREFERRED,
+                 **kwargs):
+        self.table_size = table_size
+        self.replacement = replacement
+        super().__init__(*args, **kwargs)
+
+    def create_search_tree(self):
+        return TranspositionTable(self.table_size, self.replacement)
+
+    def add_node(self, node):
+        node_key = node._node_key()
+        present_node = self.search_tree.get(node_key)
+        if present_node is None:
+            # Unexpanded nodes that aren't in the table are still found
+            # in the frontier.
+            present_node = self.frontier.get(node_key)
+        if present_node is None:
+            self.search_tree.store(node_key, node, int(node.is_expanded))
+            if not node.is_expanded:
+                self.frontier[node_key] = node
+            return True
+        else:
+            present_node.merge(node)
+            if present_node.is_expanded:
+                self.frontier.pop(node_key, None)
+            return False
+
+    def present_node(self, node_key):
+        if node_key in self.search_tree:
+            return self.search_tree[node_key]
+        return self.frontier[node_key]
+
+    def expand_single_node(self, node, expansion=None):
+        has_expanded = super().expand_single_node(node, expansion)
+        self.search_tree.store(node._node_key(), node, 1)
+        return has_expanded
+
+
+class ArrayNodeStoreMixin:
+    """Keeps the search tree in a NodeStore, so that nodes are stored in
+    arrays instead of as SearchNode objects, and only materialized as
+    thin views when accessed. Nodes are expanded directly in the store.
+
+    Scores are not backpropagated on their own, so if the nodes use a
+    scoring mixin, BatchedBackpropagationMixin has to be used as well.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.current_state = self.search_tree[self.current_state._node_key()]
+        if hasattr(self.current_state, 'score'):
+            assert isinstance(self, BatchedBackpropagationMixin), \
+                "Stored nodes' scores require BatchedBackpropagationMixin"
+
+    def create_search_tree(self):
+        return NodeStore()
+
+    def add_node(self, node):
+        node_key = node._node_key()
+        if node_key in self.search_tree:
+            return False
+        self.search_tree.add_node(node)
+        if not node.is_expanded:
+            self.frontier[node_key] = self.search_tree[node_key]
+        return True
+
+    def expand_single_node(self, node, expansion=None):
+        store = self.search_tree
+        if expansion is None:
+            expansion = expand_state(node, node.state, node.key,
+                                     evaluate=False)
+        moves = []
+        successor_ids = []
+        for move, successor_state, successor_key, evaluation in expansion:
+            successor_id = store.node_id(successor_key)
+            if successor_id is None:
+                successor_id = store.add(successor_key, successor_state,
+                                         evaluation)
+                self.frontier[successor_key] = store.view(successor_id)
+            moves.append(move)
+            successor_ids.append(successor_id)
+        store.add_successors(node.node_id, moves, successor_ids)
+        self.frontier.pop(node.key, None)
+        return len(successor_ids) > 0
+
+    def expand_single_move(self, node, move):
+        # A node's successors are added to the store all at once.
+        self.expand_single_node(node)
+
+
+class IndexedNodeStoreMixin(ArrayNodeStoreMixin):
+    """Like ArrayNodeStoreMixin, but with an IndexedNodeStore, so that
+    nodes are kept in arrays indexed by the numbers of their states,
+    which are allocated for the whole state space up front.
+
+    Requires the nodes to use StateIndexKeyMixin.
+    """
+    def __init__(self, current_state, *args, **kwargs):
+        self.state_space = current_state
+        super().__init__(current_state, *args, **kwargs)
+
+    def create_search_tree(self):
+        return IndexedNodeStore(self.state_space.num_state_indices(),
+                                self.state_space.state_from_index)
+
+
 # Expansion
 
 
+class NoExpansionMixin:
+    """
+    Doesn't expand the search tree at all, for nodes that choose their
+    moves without searching, like search_node.ChooseMoveFromTablebaseMixin.
+    Making a move still adds its successor to the search tree.
+    """
+    def step_search_tree_expansion(self):
+        return False
+
+
 class CurrentStateExpansionMixin:
     """
     Expands only the current state.
@@ -127,9 +436,9 @@ class OneStepSearchMixin:
     """
     def step_search_tree_expansion(self):
         has_expanded = False
-        unexpanded_nodes = [node for node in self.search_tree.values()
-                            if not node.is_expanded]
-        for node in unexpanded_nodes:
+        for node in self.unexpanded_nodes():
+            if self.is_past_deadline():
+                break
             has_expanded = self.expand_single_node(node) or has_expanded
         return has_expanded
 
@@ -145,41 +454,50 @@ class FullExpansionMixin:
     """
     def expand_search_tree(self):
         expansion_happened = False
-        while any(not node.is_expanded for node in self.search_tree.values()):
+        while self.unexpanded_nodes() and not self.is_past_deadline():
             expansion_happened = self.step_search_tree_expansion() or expansion_happened
 
 
 class BoundedExpansionMixin:
     """Runs another mixin's expand_search until that has pushed the number of
-    nodes in the search tree beyond the given limit, or until this loop has
-    taken longer than the given limit, or the expansion yields no new nodes,
+    nodes in the search tree beyond the given limit, or until the given time
+    limit for the move has passed, or the expansion yields no new nodes,
     possibly because the search tree already is fully expanded.
-    
-    Note that these limits are checked only after each expansion step, so they
-    will not apply exactly when the limit is hit, only thereafter, and that it
-    is up to the other mixin to terminate its expansions every now and then.
+
+    The time limit is a deadline for the whole expand_search_tree(), so this
+    should be the first of the expansion mixins. The expansion loops check it
+    between nodes, so a move overshoots it by at most one node's expansion.
+
+    The node limit, however, is checked only after each expansion step, so it
+    will not apply exactly when the limit is hit, only thereafter, and it is
+    up to the other mixin to terminate its expansions every now and then.
     For example, putting the FullExpansionMixin between this and the actual
-    mixin doing the expansion would nullify this mixin's functionality
-    completely.
-    
+    mixin doing the expansion would nullify the node limit completely.
+
     Also note that when using a node limit, a pruning mixin should be used,
     otherwise further expansions are guaranteed to only run for one cycle
-    each.
+    each. MemoryBudgetMixin frees nodes even within a move.
     """
     def __init__(self, *args, time_limit=0, node_limit=0, **kwargs):
         super().__init__(*args, **kwargs)
         self.time_limit = time_limit
         self.node_limit = node_limit
 
+    def expand_search_tree(self):
+        if self.time_limit:
+            self.expansion_deadline = time.monotonic() + self.time_limit
+        try:
+            return super().expand_search_tree()
+        finally:
+            self.expansion_deadline = None
+
     def step_search_tree_expansion(self):
-        start_time = datetime.now()
         expansion_happened = super().step_search_tree_expansion()
-        elapsed_time = (datetime.now() - start_time).total_seconds()
 
         limit_exceeded = False
         if self.node_limit and len(self.search_tree) >= self.node_limit:
             limit_exceeded = True
-        if self.time_limit and elapsed_time >= self.time_limit:
+        if self.is_past_deadline():
             limit_exceeded = True
 
         return expansion_happened and not limit_exceeded
@@ -211,11 +529,11 @@ class ForwardSweepingMixin:
             abort = not self.step_search_tree_expansion()
             current_layer += 1
             self.current_layer_nodes = self.next_layer
-        if self.debug:
-            print("{} plies expanded.".format(current_layer))
 
     def step_search_tree_expansion(self):
         for node in self.current_layer_nodes:
+            if self.is_past_deadline():
+                return False
             if not node.is_expanded:
                 self.expand_single_node(node)
             successors = node.get_successor_nodes()
@@ -225,6 +543,902 @@ class ForwardSweepingMixin:
         return len(self.next_layer) > 0
 
 
+# Parallel expansion
+
+
+# The node whose game rules a worker process uses; set once per process.
+_worker_node = None
+
+
+def _init_expansion_worker(node):
+    global _worker_node
+    _worker_node = node
+
+
+def _expand_states(states, evaluate):
+    """Run expand_state() for [(game_state, node_key)] in a worker."""
+    return [expand_state(_worker_node, game_state, node_key, evaluate)
+            for game_state, node_key in states]
+
+
+class ParallelSweepingMixin:
+    """Makes ForwardSweepingMixin expand the nodes of each layer in a
+    pool of worker processes. Chunks of the layer's unexpanded states
+    are sent to the workers, which generate (and evaluate, if the nodes
+    have scores) their successors; these are then inserted into the
+    search tree in this process, which also merges transpositions.
+    Layers with no more than chunk_size unexpanded nodes are expanded
+    in this process.
+
+    Only expand_state() runs in the workers; creating the successor
+    nodes, inserting them and backpropagating scores stays in this
+    process, and states are pickled both ways. So this only pays off
+    with several CPUs and moves that are expensive to generate or
+    evaluate. On a single CPU, benchmarks/benchmark.py's connectfour_sweep
+    takes about twice as long as with ForwardSweepingMixin alone.
+
+    The workers are started by workers.process_pool(). Call .shutdown()
+    to stop them.
+    """
+    def __init__(self, *args, workers=None, chunk_size=256, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.executor = None
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def step_search_tree_expansion(self):
+        unexpanded_nodes = [node for node in self.current_layer_nodes
+                            if not node.is_expanded]
+        if len(unexpanded_nodes) > self.chunk_size:
+            self.expand_nodes_in_parallel(unexpanded_nodes)
+        return super().step_search_tree_expansion()
+
+    def expand_nodes_in_parallel(self, nodes):
+        if self.executor is None:
+            self.executor = process_pool(
+                max_workers=self.workers,
+                initializer=_init_expansion_worker,
+                initargs=(self.current_state, ),
+            )
+        evaluate = hasattr(self.current_state, 'score')
+        chunks = [nodes[start:start + self.chunk_size]
+                  for start in range(0, len(nodes), self.chunk_size)]
+        results = self.executor.map(
+            _expand_states,
+            [[(node.state, node._node_key()) for node in chunk]
+             for chunk in chunks],
+            [evaluate] * len(chunks),
+        )
+        for chunk, expansions in zip(chunks, results):
+            if self.is_past_deadline():
+                break
+            for node, expansion in zip(chunk, expansions):
+                self.expand_single_node(node, expansion)
+
+
+# Pondering
+
+
+class PonderingMixin:
+    """Keeps expanding the search tree in a background thread between
+    moves, so that the time that the opponent takes to think isn't
+    wasted. Pondering starts after each move, and stops before the
+    next one is chosen or made; then, the expanded subtree of the move
+    that has been made stays in the search tree, while the rest can be
+    discarded by a pruning mixin like NaivePruningMixin.
+
+    The search tree is expanded breadth-first from the current state,
+    until it is fully expanded, or has grown to ponder_node_limit nodes.
+    As the search tree is only changed by one thread at a time, no
+    locking is needed.
+    """
+    def __init__(self, *args, ponder_node_limit=0, **kwargs):
+        self.ponder_thread = None
+        self.stop_pondering_event = threading.Event()
+        super().__init__(*args, **kwargs)
+        self.ponder_node_limit = ponder_node_limit
+
+    def choose_move(self):
+        self.stop_pondering()
+        return super().choose_move()
+
+    def make_move(self, move):
+        self.stop_pondering()
+        super().make_move(move)
+        self.start_pondering()
+
+    def start_pondering(self):
+        self.stop_pondering()
+        if self.current_state._is_finished():
+            return
+        self.stop_pondering_event.clear()
+        self.ponder_thread = threading.Thread(target=self.ponder, daemon=True)
+        self.ponder_thread.start()
+
+    def stop_pondering(self):
+        """Stops pondering after the node expansion that is currently
+        running, and waits for that.
+        """
+        if self.ponder_thread is not None:
+            self.stop_pondering_event.set()
+            self.ponder_thread.join()
+            self.ponder_thread = None
+
+    def ponder(self):
+        known_nodes = {self.current_state._node_key()}
+        frontier = deque([self.current_state])
+        while frontier and not self.stop_pondering_event.is_set():
+            if (self.ponder_node_limit and
+                    len(self.search_tree) >= self.ponder_node_limit):
+                break
+            node = frontier.popleft()
+            if not node.is_expanded:
+                self.expand_single_node(node)
+            for node_key, successor in node.get_successors().items():
+                if node_key not in known_nodes:
+                    known_nodes.add(node_key)
+                    frontier.append(successor)
+
+
+# Monte Carlo tree search
+
+
+class MonteCarloTreeSearchMixin:
+    """Expands the search tree by Monte Carlo tree search with UCT. Each
+    expansion step is one playout: Starting at the current state,
+    successors are selected by their upper confidence bound until a
+    node with unvisited successors is reached, which is expanded if it
+    hasn't been yet. One of those successors is then played out by
+    a rollout that makes moves on raw game states, without creating
+    nodes. Finally, the evaluation of the rollout's final state is
+    added to the statistics of the nodes on the selected path.
+
+    Rollouts choose random moves; override .rollout_policy() for
+    heuristic ones. With a rollout_depth, they are cut off after that
+    many moves and evaluated where they are.
+
+    The search runs until playout_limit playouts have been made, or
+    search_time seconds have passed; as a playout is short, this is
+    a tight bound. For a node budget, combine this with
+    BoundedExpansionMixin's node_limit. One of playout_limit and
+    search_time has to be given, though, as a node_limit alone may never
+    be reached: Once the reachable tree is expanded, playouts keep
+    revisiting it without adding nodes.
+
+    Requires the nodes to use MonteCarloStatisticsMixin, and usually
+    ChooseMostVisitedMoveMixin.
+    """
+    def __init__(self, *args, playout_limit=1000, search_time=0,
+                 exploration=math.sqrt(2), rollout_depth=0, **kwargs):
+        assert playout_limit > 0 or search_time > 0
+        super().__init__(*args, **kwargs)
+        self.playout_limit = playout_limit
+        self.search_time = search_time
+        self.exploration = exploration
+        self.rollout_depth = rollout_depth
+        self.playouts = 0
+
+    def expand_search_tree(self):
+        self.playouts = 0
+        if self.search_time:
+            self.search_deadline = time.monotonic() + self.search_time
+        else:
+            self.search_deadline = None
+        while self.step_search_tree_expansion():
+            pass
+
+    def step_search_tree_expansion(self):
+        if self.current_state._is_finished():
+            return False
+        self.run_playout()
+        self.playouts += 1
+        if self.playout_limit and self.playouts >= self.playout_limit:
+            return False
+        if (self.search_deadline is not None and
+                time.monotonic() >= self.search_deadline):
+            return False
+        return True
+
+    def run_playout(self):
+        node = self.current_state
+        path = [node]
+        while not node._is_finished():
+            if not node.is_expanded:
+                self.expand_single_node(node)
+            successors = list(node.get_successor_nodes())
+            unvisited = [successor for successor in successors
+                         if successor.visits == 0]
+            if unvisited:
+                node = random.choice(unvisited)
+                path.append(node)
+                break
+            node = self.select_successor(node, successors)
+            path.append(node)
+        self.backpropagate_playout(path, self.rollout(node.state))
+
+    def select_successor(self, node, successors):
+        """The successor with the highest upper confidence bound."""
+        log_visits = math.log(node.visits)
+
+        def upper_confidence_bound(successor):
+            return (successor.reward_sum / successor.visits +
+                    self.exploration * math.sqrt(log_visits / successor.visits))
+        return max(successors, key=upper_confidence_bound)
+
+    def rollout(self, game_state):
+        """Play the game out from game_state, and return the final
+        state's evaluation.
+        """
+        game = self.current_state
+        depth = 0
+        while not game.is_finished(game_state):
+            if self.rollout_depth and depth >= self.rollout_depth:
+                break
+            game_state = game.make_move(game_state,
+                                        self.rollout_policy(game_state))
+            depth += 1
+        return game.evaluate(game_state)
+
+    def rollout_policy(self, game_state):
+        return random.choice(self.current_state.all_legal_moves(game_state))
+
+    def backpropagate_playout(self, path, reward):
+        path[0].visits += 1
+        for predecessor, node in zip(path, path[1:]):
+            node.visits += 1
+            node.reward_sum += reward[predecessor._active_player()]
+
+
+# Proof-number search
+
+
+class ProofNumberSearchMixin:
+    """Expands the search tree by proof-number search, to find out
+    whether the current state is a forced win for the player to move
+    (the attacker). Each expansion step expands the most-proving node,
+    found by following the successors with the lowest proof numbers
+    on the attacker's turns, and the lowest disproof numbers on the
+    other turns, and then updates the numbers of its ancestors. The
+    search stops as soon as the current state is proven or disproven
+    (draws count as disproven), or search_time seconds have passed.
+    For a node budget, combine this with BoundedExpansionMixin.
+
+    Requires the nodes to use ProofNumberMixin, and usually
+    ChooseMostProvenMoveMixin.
+    """
+    def __init__(self, *args, search_time=0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.search_time = search_time
+        self.proof_search = 0
+
+    def prove(self):
+        """Search the current state.
+
+        Returns:
+            bool: True if it is a forced win for the player to move,
+                False if it isn't, None if the search ran out of
+                budget before finding out.
+        """
+        self.expand_search_tree()
+        if self.current_state.proof == 0:
+            return True
+        elif self.current_state.disproof == 0:
+            return False
+        return None
+
+    def expand_search_tree(self):
+        self.proof_search += 1
+        self.attacker = self.current_state._active_player()
+        if self.search_time:
+            self.search_deadline = time.monotonic() + self.search_time
+        else:
+            self.search_deadline = None
+        self.initialize_proof_numbers(self.current_state)
+        while self.step_search_tree_expansion():
+            pass
+
+    def step_search_tree_expansion(self):
+        root = self.current_state
+        if root.proof == 0 or root.disproof == 0:
+            return False
+        node = self.select_most_proving_node()
+        self.expand_single_node(node)
+        for successor in node.get_successor_nodes():
+            if successor.proof_search != self.proof_search:
+                self.initialize_proof_numbers(successor)
+        self.update_proof_numbers(node)
+        if (self.search_deadline is not None and
+                time.monotonic() >= self.search_deadline):
+            return False
+        return root.proof != 0 and root.disproof != 0
+
+    def select_most_proving_node(self):
+        node = self.current_state
+        while node.is_expanded and node.successors:
+            if node._active_player() == self.attacker:
+                node = min(node.get_successor_nodes(),
+                           key=lambda successor: successor.proof)
+            else:
+                node = min(node.get_successor_nodes(),
+                           key=lambda successor: successor.disproof)
+        return node
+
+    def set_proof_numbers(self, node):
+        """Set the node's numbers from its successors' ones."""
+        node.proof_search = self.proof_search
+        if not node.is_expanded or not node.successors:
+            if not node._is_finished():
+                node.proof, node.disproof = 1, 1
+            elif node._winner() == self.attacker:
+                node.proof, node.disproof = 0, math.inf
+            else:
+                node.proof, node.disproof = math.inf, 0
+        elif node._active_player() == self.attacker:
+            successors = node.get_successor_nodes()
+            node.proof = min(successor.proof for successor in successors)
+            node.disproof = sum(successor.disproof for successor in successors)
+        else:
+            successors = node.get_successor_nodes()
+            node.proof = sum(successor.proof for successor in successors)
+            node.disproof = min(successor.disproof for successor in successors)
+
+    def initialize_proof_numbers(self, start_node):
+        """Set the numbers of the (expanded part of the) subtree of
+        start_node for the current search, successors first.
+        """
+        visited = {start_node}
+        stack = [(start_node, False)]
+        while stack:
+            node, successors_done = stack.pop()
+            if successors_done:
+                self.set_proof_numbers(node)
+                continue
+            stack.append((node, True))
+            for successor in node.get_successor_nodes():
+                if (successor not in visited and
+                        successor.proof_search != self.proof_search):
+                    visited.add(successor)
+                    stack.append((successor, False))
+
+    def update_proof_numbers(self, node):
+        """Update the numbers of an expanded node and, as long as they
+        change, those of its ancestors.
+        """
+        worklist = [node]
+        while worklist:
+            ancestor = worklist.pop()
+            old_numbers = (ancestor.proof, ancestor.disproof)
+            self.set_proof_numbers(ancestor)
+            if (ancestor is node or
+                    (ancestor.proof, ancestor.disproof) != old_numbers):
+                worklist.extend(ancestor.known_predecessors)
+
+
+# Depth-first search
+
+
+class SearchTimeout(Exception):
+    """Raised inside a search when its deadline has passed."""
+
+
+class AlphaBetaSearchMixin:
+    """Chooses moves by a depth-limited negamax search with alpha-beta
+    pruning. The search runs directly on the game's rule functions
+    (.make_move(), .all_legal_moves(), .evaluate(), ...) of the current
+    state's GameAdapter, so the states that it visits are never added
+    to the search tree, and only one path of them is kept in memory at
+    any time.
+
+    Values are those of .evaluate() for the player to move at the root,
+    negated on plies where the other player is to move. With a
+    search_depth of None, the search runs until the end of the game.
+
+    Note that unlike ChooseRandomMoveFromBestMixin, this will always
+    choose the first of several equally good moves, as alpha-beta
+    pruning only yields bounds for the values of the other ones.
+
+    If a TranspositionTable is given, results for the visited states
+    are stored in it under their node keys, and are reused when a
+    state is reached again, be it by a transposition of moves or in a
+    later search. Their best moves are also searched first.
+
+    After a search, .principal_variation holds the line of moves that
+    it expects to be played, and .root_move_values the values of the
+    current state's moves that were searched. As alpha-beta pruning only
+    proves that the other moves aren't better than the best one, their
+    values can be upper bounds.
+    """
+    def __init__(self, *args, search_depth=None, transposition_table=None,
+                 **kwargs):
+        super().__init__(*args, **kwargs)
+        self.search_depth = search_depth
+        self.transposition_table = transposition_table
+        self.search_deadline = None
+        self.nodes_visited = 0
+        self.principal_variation = []
+        self.root_move_values = {}
+        self._root_move_values = {}
+
+    def choose_move(self):
+        chosen_move, value = self.alpha_beta_search()
+        return self.choose_from_best(chosen_move, value, self.search_depth)
+
+    def choose_from_best(self, best_move, value, depth):
+        """The move to make, given the best move and its value that a
+        search of the current state to depth found.
+        """
+        return best_move
+
+    def alpha_beta_search(self, depth=None, expected_line=()):
+        """Search the current state.
+
+        Args:
+            depth (int): Plies to search; defaults to .search_depth.
+            expected_line (list): Moves to search first along the line,
+                i.e. the principal variation of a shallower search.
+
+        Returns:
+            tuple: (best move, its value for the active player)
+
+        Raises:
+            SearchTimeout: If .search_deadline (a time.monotonic()
+                value) has passed before the search finished.
+        """
+        if depth is None:
+            depth = self.search_depth
+        if depth is None:
+            depth = math.inf
+        self.search_player = self.current_state._active_player()
+        self.nodes_visited = 0
+        self.search_hit_depth_limit = False
+        if self.transposition_table is not None:
+            node_key = self.current_state._node_key()
+        else:
+            node_key = None
+        value, line = self._search_root(self.current_state.state, node_key,
+                                        depth, expected_line)
+        self.principal_variation = line
+        # Those of an aborted search would be incomplete.
+        self.root_move_values = dict(self._root_move_values)
+        return (line[0] if line else None), value
+
+    def _search_root(self, game_state, node_key, depth, expected_line):
+        return self._negamax(game_state, node_key, depth,
+                             -math.inf, math.inf, 1, expected_line)
+
+    def _search_successor(self, successor, successor_key, depth, alpha, beta,
+                          color, mover, expected_line, is_first_move):
+        """Search a successor that the mover moved to, with the window
+        (alpha, beta) seen from the mover.
+
+        Returns:
+            tuple: (value for the mover, line of moves)
+        """
+        if self.current_state.active_player(successor) == mover:
+            return self._negamax(successor, successor_key, depth - 1,
+                                 alpha, beta, color, expected_line)
+        value, line = self._negamax(successor, successor_key, depth - 1,
+                                    -beta, -alpha, -color, expected_line)
+        return -value, line
+
+    def _negamax(self, game_state, node_key, depth, alpha, beta, color,
+                 expected_line=()):
+        game = self.current_state
+        table = self.transposition_table
+        self.nodes_visited += 1
+        if (self.search_deadline is not None and
+                time.monotonic() >= self.search_deadline):
+            raise SearchTimeout
+        if game.is_finished(game_state):
+            return color * game.evaluate(game_state)[self.search_player], []
+        if depth <= 0:
+            self.search_hit_depth_limit = True
+            return color * game.evaluate(game_state)[self.search_player], []
+
+        moves = game.all_legal_moves(game_state)
+        original_alpha = alpha
+        if table is not None:
+            # Values are stored as seen by the searching player, so
+            # those of other players' searches can't be reused.
+            entry = table.get(node_key)
+            if entry is not None and entry.player == self.search_player:
+                if entry.depth >= depth:
+                    # The entry's search may have been cut off by its
+                    # depth; there's no telling.
+                    if entry.depth != math.inf:
+                        self.search_hit_depth_limit = True
+                    if entry.bound == EXACT:
+                        return entry.value, [entry.move]
+                    elif entry.bound == LOWER_BOUND:
+                        alpha = max(alpha, entry.value)
+                    else:
+                        beta = min(beta, entry.value)
+                    if alpha >= beta:
+                        return entry.value, [entry.move]
+            if entry is not None and entry.move in moves:
+                moves = [entry.move] + [move for move in moves
+                                        if move != entry.move]
+        if expected_line and expected_line[0] in moves:
+            moves = [expected_line[0]] + [move for move in moves
+                                          if move != expected_line[0]]
+
+        if game_state is game.state:
+            move_values = self._root_move_values
+            move_values.clear()
+        else:
+            move_values = None
+        mover = game.active_player(game_state)
+        best_value = -math.inf
+        best_line = []
+        for index, move in enumerate(moves):
+            successor = game.make_move(game_state, move)
+            if table is not None:
+                successor_key = game.successor_key(game_state, move,
+                                                   successor, node_key)
+            else:
+                successor_key = None
+            if expected_line and move == expected_line[0]:
+                successor_line = expected_line[1:]
+            else:
+                successor_line = ()
+            value, line = self._search_successor(successor, successor_key,
+                                                 depth, alpha, beta, color,
+                                                 mover, successor_line,
+                                                 index == 0)
+            if move_values is not None:
+                move_values[move] = value
+            if value > best_value:
+                best_value = value
+                best_line = [move] + line
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        if table is not None:
+            if best_value <= original_alpha:
+                bound = UPPER_BOUND
+            elif best_value >= beta:
+                bound = LOWER_BOUND
+            else:
+                bound = EXACT
+            table.store(node_key,
+                        SearchResult(best_value, bound, depth,
+                                     best_line[0] if best_line else None,
+                                     self.search_player),
+                        depth)
+        return best_value, best_line
+
+
+class PrincipalVariationSearchMixin:
+    """Turns AlphaBetaSearchMixin's search into principal variation
+    search (NegaScout): At each node, only the first move, which move
+    ordering expects to be the best, is searched with the full window.
+    The other ones are searched with a null window just above alpha,
+    which only proves that they are not better, and are searched again
+    with the full window only if that fails. .re_searches counts these.
+
+    At the root, the search starts with an aspiration window of
+    aspiration_window around the value of the previous search for the
+    same player, and is repeated with an open window on the side where
+    the result fell outside of it.
+
+    Like with ChooseRandomMoveFromBestMixin, choose_move() chooses
+    randomly among equally good moves. As the search only yields upper
+    bounds for the values of the moves other than the best one, those
+    whose bounds allow for a tie are checked for being as good with a
+    null window search at the value of the best one. These searches
+    count towards .nodes_visited, and keep .search_deadline; if it
+    passes, the move is chosen among the ties found so far.
+    """
+    def __init__(self, *args, aspiration_window=0.25, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.aspiration_window = aspiration_window
+        self.aspiration_values = {}  # {player: value of last search}
+        self.re_searches = 0
+        self.aspiration_re_searches = 0
+
+    def _search_successor(self, successor, successor_key, depth, alpha, beta,
+                          color, mover, expected_line, is_first_move):
+        if is_first_move or alpha == -math.inf:
+            return super()._search_successor(
+                successor, successor_key, depth, alpha, beta, color, mover,
+                expected_line, is_first_move)
+        value, line = super()._search_successor(
+            successor, successor_key, depth, alpha,
+            math.nextafter(alpha, math.inf), color, mover, expected_line,
+            is_first_move)
+        if alpha < value < beta:
+            self.re_searches += 1
+            value, line = super()._search_successor(
+                successor, successor_key, depth, alpha, beta, color, mover,
+                expected_line, is_first_move)
+        return value, line
+
+    def _search_root(self, game_state, node_key, depth, expected_line):
+        alpha, beta = -math.inf, math.inf
+        previous_value = self.aspiration_values.get(self.search_player)
+        if (self.aspiration_window is not None and
+                previous_value is not None and
+                math.isfinite(previous_value)):
+            alpha = previous_value - self.aspiration_window
+            beta = previous_value + self.aspiration_window
+        while True:
+            value, line = self._negamax(game_state, node_key, depth,
+                                        alpha, beta, 1, expected_line)
+            if value <= alpha and alpha != -math.inf:
+                alpha = -math.inf
+            elif value >= beta and beta != math.inf:
+                beta = math.inf
+            else:
+                break
+            self.aspiration_re_searches += 1
+        self.aspiration_values[self.search_player] = value
+        return value, line
+
+    def choose_from_best(self, best_move, value, depth):
+        if best_move is None or not math.isfinite(value):
+            return best_move
+        if depth is None:
+            depth = math.inf
+        game = self.current_state
+        game_state = game.state
+        mover = game.active_player(game_state)
+        table = self.transposition_table
+        if table is not None:
+            node_key = game._node_key()
+        lower_value = math.nextafter(value, -math.inf)
+        best_moves = [best_move]
+        for move in game.all_legal_moves(game_state):
+            if (move == best_move or
+                    self.root_move_values.get(move, math.inf) < value):
+                continue
+            successor = game.make_move(game_state, move)
+            if table is not None:
+                successor_key = game.successor_key(game_state, move,
+                                                   successor, node_key)
+            else:
+                successor_key = None
+            try:
+                move_value, _ = self._search_successor(
+                    successor, successor_key, depth, lower_value, value, 1,
+                    mover, (), True)
+            except SearchTimeout:
+                break
+            if move_value >= value:
+                best_moves.append(move)
+        return random.choice(best_moves)
+
+
+class IterativeDeepeningMixin:
+    """Runs AlphaBetaSearchMixin's search with depths of 1, 2, 3, ...
+    plies until move_time seconds have passed, and chooses the best
+    move of the deepest search that has been completed. The deadline is
+    checked at every node that is visited, so a search that runs out of
+    time is aborted right away. The first search always runs to its
+    end, so that there is a move to choose.
+
+    Each search first follows the principal variation of the previous
+    one, which makes for good move ordering. Deepening stops early at
+    max_depth, or when a search hasn't been cut off by its depth, as
+    deeper ones would yield the same result.
+    """
+    def __init__(self, *args, move_time=1.0, max_depth=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.move_time = move_time
+        self.max_depth = max_depth
+        self.completed_depth = 0
+        self.move_deadline = None
+
+    def choose_move(self):
+        chosen_move, value = self.iterative_deepening_search()
+        # Choosing among the best moves may search some more.
+        self.search_deadline = self.move_deadline
+        try:
+            return self.choose_from_best(chosen_move, value,
+                                         self.completed_depth)
+        finally:
+            self.search_deadline = None
+
+    def iterative_deepening_search(self):
+        """Returns:
+            tuple: (best move, its value for the active player) of the
+                deepest completed search.
+        """
+        deadline = time.monotonic() + self.move_time
+        self.move_deadline = deadline
+        self.completed_depth = 0
+        result = None
+        line = []
+        depth = 1
+        while self.max_depth is None or depth <= self.max_depth:
+            # The first search has to finish.
+            self.search_deadline = deadline if result is not None else None
+            try:
+                result = self.alpha_beta_search(depth, line)
+            except SearchTimeout:
+                break
+            finally:
+                self.search_deadline = None
+            self.completed_depth = depth
+            line = self.principal_variation
+            if not self.search_hit_depth_limit:
+                break
+            depth += 1
+        return result
+
+
+# Score management
+
+
+class BatchedBackpropagationMixin:
+    """Updates the scores of all nodes affected by an expansion step in
+    a single pass after it, instead of letting each changed score
+    trigger a backpropagation cascade through its predecessors. The
+    affected nodes are the expanded ones and their ancestors; these
+    are updated in reverse topological order, so that each of them is
+    updated at most once per pass, and only if the score of one of its
+    successors has changed. Since this isn't recursive, it also works
+    for arbitrarily long games.
+
+    Requires the nodes to use DeferredBackpropagationMixin.
+    """
+    def __init__(self, *args, **kwargs):
+        self.dirty_nodes = set()
+        super().__init__(*args, **kwargs)
+        assert not self.current_state.backpropagate_immediately
+
+    def step_search_tree_expansion(self):
+        expansion_happened = super().step_search_tree_expansion()
+        self.backpropagate_scores()
+        return expansion_happened
+
+    def make_move(self, move):
+        super().make_move(move)
+        self.backpropagate_scores()
+
+    def expand_single_node(self, node, expansion=None):
+        has_expanded = super().expand_single_node(node, expansion)
+        if has_expanded:
+            self.dirty_nodes.add(node)
+        return has_expanded
+
+    def add_node(self, node):
+        is_new = super().add_node(node)
+        if not is_new and node.is_expanded:
+            self.dirty_nodes.add(self.search_tree[node._node_key()])
+        return is_new
+
+    def backpropagate_scores(self):
+        """Update the scores of the dirty nodes and their ancestors.
+        """
+        if not self.dirty_nodes:
+            return
+        # Find all ancestors, and how many of their successors have
+        # to be dealt with before them.
+        pending_successors = {node: 0 for node in self.dirty_nodes}
+        frontier = list(self.dirty_nodes)
+        while frontier:
+            node = frontier.pop()
+            for predecessor in node.known_predecessors:
+                if predecessor not in pending_successors:
+                    pending_successors[predecessor] = 0
+                    frontier.append(predecessor)
+                pending_successors[predecessor] += 1
+
+        needs_update = set(self.dirty_nodes)
+        ready = [node for node, pending in pending_successors.items()
+                 if pending == 0]
+        while pending_successors:
+            if not ready:
+                # A cycle of states; break it up anywhere.
+                ready.append(next(iter(pending_successors)))
+            node = ready.pop()
+            if node not in pending_successors:
+                continue
+            del pending_successors[node]
+            score_changed = node in needs_update and node.update_score()
+            for predecessor in node.known_predecessors:
+                if score_changed:
+                    needs_update.add(predecessor)
+                if predecessor in pending_successors:
+                    pending_successors[predecessor] -= 1
+                    if pending_successors[predecessor] == 0:
+                        ready.append(predecessor)
+        self.dirty_nodes = set()
+
+
+class BatchEvaluationMixin:
+    """Evaluates the successors that are created during an expansion
+    step all at once after it, with search_node.evaluate_states(), so
+    that games can score them with a single vectorized call. Until
+    then, new nodes have empty scores.
+
+    Requires the nodes to use DeferredBackpropagationMixin, and
+    BatchedBackpropagationMixin to come before this mixin, so that
+    scores are backpropagated only after they are assigned. Successors
+    that are added by .make_move() are evaluated right away.
+
+    This doesn't work with ArrayNodeStoreMixin and IndexedNodeStoreMixin,
+    as a NodeStore keeps a score for every player of every node, so
+    there are no empty scores to mark the nodes to evaluate.
+    """
+    def __init__(self, *args, **kwargs):
+        self.evaluation_queue = []
+        super().__init__(*args, **kwargs)
+        assert not self.current_state.backpropagate_immediately
+        assert not isinstance(self.search_tree, NodeStore), \
+            "BatchEvaluationMixin can't be used with a NodeStore"
+
+    def step_search_tree_expansion(self):
+        expansion_happened = super().step_search_tree_expansion()
+        self.evaluate_queued_nodes()
+        return expansion_happened
+
+    def make_move(self, move):
+        self.evaluate_queued_nodes()
+        super().make_move(move)
+
+    def expand_single_node(self, node, expansion=None):
+        if expansion is None:
+            expansion = expand_state(node, node.state, node._node_key(),
+                                     evaluate=False)
+        # Empty scores keep the nodes from evaluating themselves.
+        expansion = [(move, successor_state, successor_key,
+                      {} if evaluation is None else evaluation)
+                     for move, successor_state, successor_key, evaluation
+                     in expansion]
+        has_expanded = super().expand_single_node(node, expansion)
+        self.evaluation_queue.extend(successor
+                                     for successor in node.get_successor_nodes()
+                                     if not successor.score)
+        return has_expanded
+
+    def evaluate_queued_nodes(self):
+        nodes = {id(node): node for node in self.evaluation_queue
+                 if not node.score}
+        self.evaluation_queue = []
+        if not nodes:
+            return
+        nodes = list(nodes.values())
+        evaluations = evaluate_states(self.current_state,
+                                      [node.state for node in nodes])
+        for node, evaluation in zip(nodes, evaluations):
+            node.score.update(evaluation)
+
+
+# Opening books
+
+
+class OpeningBookMixin:
+    """Answers choose_move() from an opening book (see
+    bobbot.opening_book) as long as the current state is in it, without
+    expanding the search tree. Outside of the book, the other mixins'
+    choose_move() is used.
+
+    opening_book may be a {node_key: (move, value)} dict, or the path
+    of a file written by bobbot.opening_book.save_opening_book().
+    """
+    def __init__(self, *args, opening_book=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if isinstance(opening_book, str):
+            # Imported here, as opening_book uses this module.
+            from .opening_book import load_opening_book
+            opening_book = load_opening_book(opening_book)
+        self.opening_book = opening_book or {}
+
+    def choose_move(self):
+        entry = self.opening_book.get(self.current_state._node_key())
+        if entry is not None:
+            move, _ = entry
+            return move
+        return super().choose_move()
+
+
 # Pruning
 
 
@@ -235,26 +1449,291 @@ class NaivePruningMixin:
     """
     def make_move(self, move):
         super().make_move(move)
-        post_move_size = len(self.search_tree)
         transitive_hull = set()
-        frontier = set([self.current_state._node_key()])
+        frontier = [self.current_state]
         while frontier:
             expansion = frontier.pop()
-            transitive_hull.add(expansion)
-            frontier.update(node_key
-                            for node_key in self.search_tree[expansion].get_successors()
+            transitive_hull.add(expansion._node_key())
+            frontier.extend(node
+                            for node_key, node in expansion.get_successors().items()
                             if node_key not in transitive_hull)
         nodes_to_delete = set(self.search_tree.keys()) - transitive_hull
         for key in nodes_to_delete:
             del self.search_tree[key]
+            self.frontier.pop(key, None)
         # FIXME: This requires nodes to also know predecessor node key, not just
         # their objects.
         # for node in self.search_tree.values():
         #     node.remove_predecessors(nodes_to_delete)
-        post_prune_size = len(self.search_tree)
-        if self.debug:
-            print("Search tree size: {} (after move) - {} (pruned) = {}".format(
-                post_move_size,
-                post_move_size - post_prune_size,
-                post_prune_size)
-            )
+
+
+class IncrementalPruningMixin:
+    """
+    Prunes the search tree after make_move() like NaivePruningMixin,
+    but without walking the remaining tree. Instead, the previous
+    current state is removed, along with its links to its successors,
+    and so is every node that loses its last predecessor that way.
+    This only visits the discarded nodes and their successors, and
+    leaves no stale predecessor links behind.
+
+    This assumes that states can't repeat; nodes on cycles that have
+    become unreachable are not pruned.
+
+    With ArrayNodeStoreMixin, nodes are views whose predecessors are
+    looked up in the store, which leaves out deleted nodes; removing a
+    node from the store thus unlinks it from its successors.
+    """
+    def make_move(self, move):
+        previous_state = self.current_state
+        super().make_move(move)
+        current_key = self.current_state._node_key()
+        orphans = [previous_state]
+        pruned = set()
+        while orphans:
+            node = orphans.pop()
+            node_key = node._node_key()
+            if node_key in pruned:
+                continue
+            pruned.add(node_key)
+            # Views of the same node are equal, but not identical.
+            if self.search_tree.get(node_key) == node:
+                del self.search_tree[node_key]
+                self.frontier.pop(node_key, None)
+            for successor in node.get_successor_nodes():
+                predecessors = successor.known_predecessors
+                predecessors.discard(node)
+                if (not predecessors and
+                        successor._node_key() != current_key):
+                    orphans.append(successor)
+
+
+class WeakrefPruningMixin:
+    """
+    Uses a WeakValueDictionary as search tree, so that it doesn't keep
+    nodes alive by itself; a node stays in it only as long as it is
+    the current state, or a successor of a node that does. Nodes that
+    become unreachable after make_move() are thus pruned by the garbage
+    collector, without any walk of the tree at all.
+
+    For this to happen immediately, nodes should use
+    WeakPredecessorsMixin; otherwise, the references from successors
+    to predecessors form cycles that only the cyclic GC clears. Also
+    note that any other reference to a node, like from
+    ForwardSweepingMixin's layers, keeps it in the search tree.
+    """
+    def create_search_tree(self):
+        return weakref.WeakValueDictionary()
+
+    def create_frontier(self):
+        return weakref.WeakValueDictionary()
+
+
+# Memory budget
+
+
+def _deep_getsizeof(obj, seen):
+    """Approximate size in bytes of obj and the containers and values
+    it holds, counting objects in seen only once.
+    """
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_getsizeof(key, seen) + _deep_getsizeof(value, seen)
+                    for key, value in obj.items())
+    elif isinstance(obj, (tuple, list, set, frozenset)):
+        size += sum(_deep_getsizeof(item, seen) for item in obj)
+    return size
+
+
+class MemoryBudgetMixin:
+    """Keeps the search tree within a budget of nodes and/or of bytes,
+    by evicting nodes after each expansion that pushed it beyond. Nodes
+    are evicted least recently used first, i.e. the ones that have been
+    added, expanded or made the current state longest ago; override
+    .eviction_candidates() for other orders, like
+    LowestValueEvictionMixin does.
+
+    Never evicted are the current state, its successors and the
+    principal variation, i.e. the line of best successors from it, if
+    the nodes have scores. So if these alone exceed the budget, the
+    budget is exceeded.
+
+    An evicted node is unlinked from its predecessors, which thereby
+    become partially expanded, and from its successors; successors that
+    lose their last predecessor that way are evicted as well. Evicted
+    parts of the tree are re-expanded when the search or a move reaches
+    them again. Partially expanded nodes keep their scores until then.
+
+    Nodes that other mixins prune are dropped from the accounting when
+    the search starts or the budget is enforced next, so pruning mixins
+    can come before or after this one.
+
+    Bytes are estimated with sys.getsizeof() for each node, its
+    attributes, and its state. Don't use this with ArrayNodeStoreMixin.
+    """
+    def __init__(self, *args, node_budget=0, byte_budget=0, **kwargs):
+        assert node_budget or byte_budget
+        self.node_budget = node_budget
+        self.byte_budget = byte_budget
+        self.node_usage = OrderedDict()  # {node_key: size}, LRU first
+        self.tree_bytes = 0
+        self.evictions = 0
+        super().__init__(*args, **kwargs)
+
+    def node_size(self, node):
+        seen = set()
+        return (sys.getsizeof(node) +
+                _deep_getsizeof(vars(node), seen) +
+                _deep_getsizeof(node.state, seen))
+
+    def touch(self, node):
+        """Mark the node as used, and update its size."""
+        node_key = node._node_key()
+        size = self.node_size(node)
+        self.tree_bytes += size - self.node_usage.pop(node_key, 0)
+        self.node_usage[node_key] = size
+
+    def forget(self, node_key):
+        self.tree_bytes -= self.node_usage.pop(node_key, 0)
+
+    def forget_pruned(self):
+        """Drop the nodes that other mixins have pruned. As every node
+        in the search tree is accounted for, there can only be such
+        nodes if more are accounted for than the search tree holds.
+        """
+        if len(self.node_usage) > len(self.search_tree):
+            for node_key in [node_key for node_key in self.node_usage
+                             if node_key not in self.search_tree]:
+                self.forget(node_key)
+
+    def is_over_budget(self):
+        return ((self.node_budget and
+                 len(self.search_tree) > self.node_budget) or
+                (self.byte_budget and self.tree_bytes > self.byte_budget))
+
+    def add_node(self, node):
+        is_new = super().add_node(node)
+        if is_new:
+            self.touch(node)
+        return is_new
+
+    def expand_search_tree(self):
+        self.forget_pruned()
+        return super().expand_search_tree()
+
+    def expand_single_node(self, node, expansion=None):
+        if self.search_tree.get(node._node_key()) is not node:
+            # The node has been evicted since it was found.
+            return False
+        has_expanded = super().expand_single_node(node, expansion)
+        self.touch(node)
+        self.enforce_budget()
+        return has_expanded
+
+    def expand_single_move(self, node, move):
+        super().expand_single_move(node, move)
+        self.touch(node)
+        self.enforce_budget()
+
+    def make_move(self, move):
+        super().make_move(move)
+        self.forget_pruned()
+        self.touch(self.current_state)
+        self.enforce_budget()
+
+    def protected_nodes(self):
+        node = self.current_state
+        protected = {node}
+        protected.update(node.get_successor_nodes())
+        while (node.is_expanded and node.successors and
+               hasattr(node, 'score')):
+            player = node._active_player()
+            node = max(node.get_successor_nodes(),
+                       key=lambda successor: successor.score[player])
+            if node in protected and node.is_expanded:
+                break
+            protected.add(node)
+        return protected
+
+    def eviction_candidates(self):
+        """Nodes in the order in which they should be evicted. This is
+        only consumed until enough of them have been found.
+        """
+        search_tree = self.search_tree
+        return (search_tree[node_key] for node_key in self.node_usage
+                if node_key in search_tree)
+
+    def enforce_budget(self):
+        self.forget_pruned()
+        protected = None
+        while self.is_over_budget():
+            if protected is None:
+                protected = self.protected_nodes()
+            excess_nodes = 0
+            if self.node_budget:
+                excess_nodes = len(self.search_tree) - self.node_budget
+            excess_bytes = 0
+            if self.byte_budget:
+                excess_bytes = self.tree_bytes - self.byte_budget
+            victims = []
+            for node in self.eviction_candidates():
+                if excess_nodes <= 0 and excess_bytes <= 0:
+                    break
+                if node not in protected:
+                    victims.append(node)
+                    excess_nodes -= 1
+                    excess_bytes -= self.node_usage[node._node_key()]
+            if not victims:
+                break
+            for node in victims:
+                self.evict(node, protected)
+
+    def evict(self, node, protected=()):
+        """Remove the node, and successors that only it led to."""
+        orphans = [node]
+        while orphans:
+            node = orphans.pop()
+            node_key = node._node_key()
+            if self.search_tree.get(node_key) is not node:
+                continue
+            del self.search_tree[node_key]
+            self.frontier.pop(node_key, None)
+            self.forget(node_key)
+            self.evictions += 1
+            for predecessor in list(node.known_predecessors):
+                if predecessor.successors.get(node_key) is node:
+                    del predecessor.successors[node_key]
+                    predecessor.moves = {
+                        move: successor_key
+                        for move, successor_key in predecessor.moves.items()
+                        if successor_key != node_key}
+                    predecessor.is_expanded = False
+                    predecessor_key = predecessor._node_key()
+                    if self.search_tree.get(predecessor_key) is predecessor:
+                        self.frontier[predecessor_key] = predecessor
+            for successor in node.get_successor_nodes():
+                successor.known_predecessors.discard(node)
+                if (not successor.known_predecessors and
+                        successor not in protected):
+                    orphans.append(successor)
+            node.known_predecessors.clear()
+            node.successors = {}
+            node.moves = {}
+            node.is_expanded = False
+
+
+class LowestValueEvictionMixin:
+    """Makes MemoryBudgetMixin evict the nodes that are least likely to
+    be played first: Those with the lowest score for the players that
+    could move to them, i.e. those of their predecessors. Nodes without
+    predecessors in the tree go first. Requires scores.
+    """
+    def eviction_candidates(self):
+        def value(node):
+            return max((node.score[predecessor._active_player()]
+                        for predecessor in node.known_predecessors
+                        if not predecessor._is_finished()),
+                       default=-math.inf)
+        return sorted(super().eviction_candidates(), key=value)
@@ -0,0 +1,163 @@
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+
+class SearchStatistics:
+    """Counters and per-phase timings of a search, collected by
+    search_tree.StatisticsMixin and the components it hands this to.
+
+    Counters and timings are collected per move. .end_move() closes
+    the current move's figures, passes a snapshot of them to each sink
+    and adds them to the cumulative ones. Snapshots are dicts:
+
+    * 'move': Number of the move (the first is 1), or of moves
+      made so far for cumulative snapshots.
+    * 'counters': {name: count}
+    * 'maxima': {name: largest value recorded}
+    * 'timings': {phase: seconds spent in it}
+
+    Phase timings are exclusive: Time spent in a nested phase only
+    counts for that one. Time outside of any phase isn't recorded.
+    Each thread has its own stack of phases, so that i.e. the phases of
+    search_tree.PonderingMixin's background thread don't get mixed up
+    with those of the main thread; their timings are added up, though,
+    and so can exceed the wall time.
+
+    Sinks are callables that get called with each move's snapshot,
+    like LoggingSink and JSONLinesSink.
+    """
+
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+        self.moves = 0
+        self.total_counters = Counter()
+        self.total_maxima = {}
+        self.total_timings = Counter()
+        self.counters = Counter()
+        self.maxima = {}
+        self.timings = Counter()
+        self.cascade_length = 0  # Nodes updated in the running cascade
+        self._local = threading.local()
+
+    def __getstate__(self):
+        # Phase stacks belong to threads, so copies start without any.
+        state = dict(self.__dict__)
+        del state['_local']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _phase_stack(self):
+        """The current thread's running phases and the time that the
+        innermost one has last been started or resumed.
+        """
+        local = self._local
+        if not hasattr(local, 'phases'):
+            local.phases = []
+            local.phase_start = None
+        return local
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def maximum(self, name, value):
+        if value > self.maxima.get(name, value - 1):
+            self.maxima[name] = value
+
+    def start_phase(self, name):
+        stack = self._phase_stack()
+        now = time.perf_counter()
+        if stack.phases:
+            self.timings[stack.phases[-1]] += now - stack.phase_start
+        stack.phases.append(name)
+        stack.phase_start = now
+
+    def end_phase(self):
+        stack = self._phase_stack()
+        now = time.perf_counter()
+        self.timings[stack.phases.pop()] += now - stack.phase_start
+        stack.phase_start = now
+
+    @contextmanager
+    def phase(self, name):
+        self.start_phase(name)
+        try:
+            yield
+        finally:
+            self.end_phase()
+
+    def move_snapshot(self):
+        """Figures of the current move so far."""
+        return {'move': self.moves + 1,
+                'counters': dict(self.counters),
+                'maxima': dict(self.maxima),
+                'timings': dict(self.timings)}
+
+    def snapshot(self):
+        """Cumulative figures, including those of the current move."""
+        maxima = dict(self.total_maxima)
+        for name, value in self.maxima.items():
+            maxima[name] = max(value, maxima.get(name, value))
+        return {'move': self.moves,
+                'counters': dict(self.total_counters + self.counters),
+                'maxima': maxima,
+                'timings': dict(self.total_timings + self.timings)}
+
+    def end_move(self):
+        snapshot = self.move_snapshot()
+        for sink in self.sinks:
+            sink(snapshot)
+        self.moves += 1
+        self.total_counters.update(self.counters)
+        self.total_timings.update(self.timings)
+        for name, value in self.maxima.items():
+            self.total_maxima[name] = max(value,
+                                          self.total_maxima.get(name, value))
+        self.counters = Counter()
+        self.maxima = {}
+        self.timings = Counter()
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a non-empty list, i.e. of latencies."""
+    samples = sorted(samples)
+    rank = max(0, min(len(samples) - 1,
+                      int(round(fraction * len(samples))) - 1))
+    return samples[rank]
+
+
+# Sinks
+
+
+class LoggingSink:
+    """Logs each snapshot in one line."""
+
+    def __init__(self, logger=None, level=logging.INFO):
+        if logger is None:
+            logger = logging.getLogger(__name__)
+        self.logger = logger
+        self.level = level
+
+    def __call__(self, snapshot):
+        self.logger.log(self.level, "Move %d: %s, %s, %s",
+                        snapshot['move'],
+                        snapshot['counters'],
+                        snapshot['maxima'],
+                        {phase: round(seconds, 6)
+                         for phase, seconds in snapshot['timings'].items()})
+
+
+class JSONLinesSink:
+    """Writes each snapshot as a line of JSON to a file object."""
+
+    def __init__(self, file):
+        self.file = file
+
+    def __call__(self, snapshot):
+        self.file.write(json.dumps(snapshot) + "\n")
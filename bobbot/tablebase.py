@@ -0,0 +1,193 @@
+import mmap
+import struct
+from array import array
+from collections import deque
+
+
+# Tablebase file format: A header of MAGIC and the number of records,
+# followed by the records, sorted by key. Each record holds a state's
+# integer node hash, the winner under perfect play (or DRAW), and the
+# number of plies until the game ends under perfect play. Node hashes
+# have to fit into the unsigned 64 bits of a record's key.
+
+MAGIC = b'BOBTB\x00\x00\x01'
+HEADER = struct.Struct('<8sQ')
+RECORD = struct.Struct('<QBxH')
+MAX_KEY = 2**64 - 1
+
+DRAW = 0
+
+
+def solve_retrograde(game, path):
+    """Solve a game by retrograde analysis and write the results to a
+    tablebase file at path.
+
+    All states reachable from the game's starting state are enumerated
+    first. Then, starting from the finished states, results are
+    resolved backwards: A state is won for the player to move as soon
+    as one successor is won for them, and lost or drawn once all its
+    successors are known and none of them is a win for them. States
+    that are never resolved that way (because they are part of cycles)
+    are draws.
+
+    Distances assume that winning players win as fast as possible, and
+    that losing players postpone the loss as long as possible; for
+    draws, they are those of the longest line of play.
+
+    States are told apart by their node keys, but stored by their node
+    hashes. States whose hashes collide share a record, which is only
+    correct if their results are the same, so a collision of states
+    with different results is an error.
+
+    Args:
+        game (GameAdapter): Provides the rules; it must also implement
+            .node_key() and .node_hash(), and players have to be integers
+            from 1 to 255.
+        path (str): File to write the tablebase to.
+
+    Returns:
+        int: The number of states solved.
+
+    Raises:
+        ValueError: If states with different results have the same node
+            hash, or a node hash doesn't fit into a record.
+    """
+    # Enumerate states, numbering them in order of discovery.
+    states = [game.starting_state()]
+    index = {game.node_key(states[0]): 0}
+    successor_counts = array('l')
+    predecessors = [[]]
+    frontier = 0
+    while frontier < len(states):
+        game_state = states[frontier]
+        successors = 0
+        if not game.is_finished(game_state):
+            for move in game.all_legal_moves(game_state):
+                successor = game.make_move(game_state, move)
+                successor_key = game.node_key(successor)
+                successor_index = index.get(successor_key)
+                if successor_index is None:
+                    successor_index = len(states)
+                    index[successor_key] = successor_index
+                    states.append(successor)
+                    predecessors.append([])
+                predecessors[successor_index].append(frontier)
+                successors += 1
+        successor_counts.append(successors)
+        frontier += 1
+
+    # Resolve results backwards from the finished states. As states
+    # are queued in order of their distance, a state's first winning
+    # successor is its fastest win, and its last resolved successor is
+    # its longest line of play.
+    num_states = len(states)
+    winners = array('B', [DRAW]) * num_states
+    distances = array('H', [0]) * num_states
+    resolved = bytearray(num_states)
+    can_draw = bytearray(num_states)
+    unresolved_successors = array('l', successor_counts)
+    queue = deque()
+    for state_index, game_state in enumerate(states):
+        if successor_counts[state_index] == 0:
+            winners[state_index] = game.winner(game_state) or DRAW
+            resolved[state_index] = 1
+            queue.append(state_index)
+    while queue:
+        state_index = queue.popleft()
+        winner = winners[state_index]
+        distance = distances[state_index] + 1
+        for predecessor in predecessors[state_index]:
+            if resolved[predecessor]:
+                continue
+            unresolved_successors[predecessor] -= 1
+            if winner == DRAW:
+                can_draw[predecessor] = 1
+            if winner == game.active_player(states[predecessor]):
+                winners[predecessor] = winner
+            elif unresolved_successors[predecessor] == 0:
+                # No successor is a win for the player to move.
+                winners[predecessor] = DRAW if can_draw[predecessor] else winner
+            else:
+                continue
+            distances[predecessor] = distance
+            resolved[predecessor] = 1
+            queue.append(predecessor)
+
+    results = {}
+    for state_index, game_state in enumerate(states):
+        node_hash = game.node_hash(game_state)
+        result = (winners[state_index], distances[state_index])
+        if results.setdefault(node_hash, result) != result:
+            raise ValueError("States with different results have the same "
+                             "node hash: {}".format(node_hash))
+    write_tablebase(path, ((node_hash, winner, distance)
+                           for node_hash, (winner, distance)
+                           in results.items()))
+    return num_states
+
+
+def write_tablebase(path, records):
+    """Write (key, winner, distance) records to a tablebase file.
+
+    Raises:
+        ValueError: If a key is not an integer from 0 to MAX_KEY.
+    """
+    records = sorted(records)
+    for key, _, _ in records:
+        if not 0 <= key <= MAX_KEY:
+            raise ValueError("Tablebase keys are unsigned 64-bit integers, "
+                             "got {}".format(key))
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(records)))
+        for record in records:
+            f.write(RECORD.pack(*record))
+
+
+class Tablebase:
+    """Read-only access to a tablebase file written by
+    solve_retrograde(). The file is memory-mapped, so opening it is
+    instant, only the pages that lookups touch are read, and these are
+    shared with all other processes using the same file.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.num_states = HEADER.unpack_from(self.mmap, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a tablebase file: {}".format(path))
+
+    def close(self):
+        self.mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.num_states
+
+    def lookup(self, key):
+        """Binary search for a state's node hash.
+
+        Returns:
+            tuple: (winner, distance); winner is DRAW for draws.
+
+        Raises:
+            KeyError: If the state is not in the tablebase.
+        """
+        low = 0
+        high = self.num_states
+        while low < high:
+            middle = (low + high) // 2
+            record_key, winner, distance = RECORD.unpack_from(
+                self.mmap, HEADER.size + middle * RECORD.size)
+            if record_key < key:
+                low = middle + 1
+            elif record_key > key:
+                high = middle
+            else:
+                return winner, distance
+        raise KeyError(key)
@@ -0,0 +1,215 @@
+import copy
+import math
+import random
+import time
+from collections import namedtuple
+from itertools import combinations
+
+from .statistics import percentile
+from .workers import process_pool
+
+
+# A player of a tournament: Its game class is created from the mixins
+# in game (ending with a GameAdapter), and its AI class from those in ai
+# (ending with BaseAI), which is instantiated with kwargs. Each AI gets
+# its own copy of kwargs, so that i.e. transposition tables aren't
+# shared.
+PlayerConfig = namedtuple('PlayerConfig', ['name', 'game', 'ai', 'kwargs'])
+
+GameResult = namedtuple('GameResult',
+                        ['players',    # Names, in order of moving first
+                         'winner',     # Index into players, or None
+                         'moves',      # Number of moves made
+                         'latencies',  # [[seconds per move] per player]
+                         ])
+
+
+def create_ai(config):
+    Game = type('Game', tuple(config.game), {})
+    AI = type('AI', tuple(config.ai), {})
+    return AI(Game(), **copy.deepcopy(config.kwargs))
+
+
+def shutdown_ai(ai):
+    if hasattr(ai, 'stop_pondering'):
+        ai.stop_pondering()
+    if hasattr(ai, 'shutdown'):
+        ai.shutdown()
+
+
+def play_game(configs, seed=None, max_moves=None):
+    """Play a game between two players, each with its own AI; the first
+    one moves first. Moves are chosen by the AI of the player to move,
+    and made in both. After max_moves, the game is a draw.
+
+    Returns:
+        GameResult
+    """
+    if seed is not None:
+        random.seed(seed)
+    ais = [create_ai(config) for config in configs]
+    # Players of the game, by index of the config that plays them
+    game_players = [ais[0].current_state._active_player(), None]
+    latencies = [[], []]
+    moves = 0
+    try:
+        while not ais[0].current_state._is_finished():
+            if max_moves is not None and moves >= max_moves:
+                break
+            game_player = ais[0].current_state._active_player()
+            if game_player not in game_players:
+                game_players[1] = game_player
+            side = game_players.index(game_player)
+            start_time = time.perf_counter()
+            move = ais[side].choose_move()
+            latencies[side].append(time.perf_counter() - start_time)
+            for ai in ais:
+                ai.make_move(move)
+            moves += 1
+        if ais[0].current_state._is_finished():
+            winner = ais[0].current_state._winner()
+        else:
+            winner = None
+    finally:
+        for ai in ais:
+            shutdown_ai(ai)
+    if winner is not None and winner not in game_players:
+        # The second player won before ever being to move.
+        game_players[1] = winner
+    return GameResult(players=[config.name for config in configs],
+                      winner=(game_players.index(winner)
+                              if winner is not None else None),
+                      moves=moves,
+                      latencies=latencies)
+
+
+def _play_game(args):
+    return play_game(*args)
+
+
+def run_tournament(configs, games_per_pairing=10, workers=None, seed=0,
+                   max_moves=None):
+    """Play a round robin of self-play games between all pairs of
+    players in a pool of worker processes. Each pairing plays
+    games_per_pairing games, with the players taking turns at moving
+    first. Game i is seeded with seed + i, so tournaments are
+    reproducible as long as the AIs only use the random module for
+    randomness and no time limits.
+
+    Workers are started by workers.process_pool(), so mixins can be
+    classes that can't be pickled.
+
+    Returns:
+        list: GameResult of each game
+    """
+    games = []
+    for first, second in combinations(configs, 2):
+        for game in range(games_per_pairing):
+            if game % 2:
+                pairing = (second, first)
+            else:
+                pairing = (first, second)
+            games.append((pairing, seed + len(games), max_moves))
+    with process_pool(max_workers=workers) as executor:
+        return list(executor.map(_play_game, games))
+
+
+# Evaluation
+
+
+def estimate_elo(results, iterations=1000):
+    """Elo ratings fitted to the results with the Bradley-Terry model,
+    counting draws as half a win for each player. Each pairing gets one
+    extra virtual draw, so that players that won or lost all their
+    games get finite ratings. Ratings average to 0.
+
+    Returns:
+        dict: {player name: rating}
+    """
+    names = sorted({name for result in results for name in result.players})
+    wins = {name: 0.0 for name in names}
+    games = {}  # {(name, name): games between them}
+    for result in results:
+        first, second = result.players
+        pair = tuple(sorted((first, second)))
+        games[pair] = games.get(pair, 0) + 1
+        if result.winner is None:
+            wins[first] += 0.5
+            wins[second] += 0.5
+        else:
+            wins[result.players[result.winner]] += 1
+    for first, second in list(games):
+        games[first, second] += 1
+        wins[first] += 0.5
+        wins[second] += 0.5
+
+    strengths = {name: 1.0 for name in names}
+    for _ in range(iterations):
+        new_strengths = {}
+        for name in names:
+            denominator = sum(
+                count / (strengths[first] + strengths[second])
+                for (first, second), count in games.items()
+                if name in (first, second))
+            new_strengths[name] = wins[name] / denominator
+        strengths = new_strengths
+    ratings = {name: 400 * math.log10(strength)
+               for name, strength in strengths.items()}
+    mean = sum(ratings.values()) / len(ratings)
+    return {name: rating - mean for name, rating in ratings.items()}
+
+
+def summarize(results):
+    """Per player: games, wins, draws, losses, score (wins plus half
+    the draws, per game), Elo estimate, moves per second of thinking
+    time, and percentiles of the time per move.
+
+    Returns:
+        dict: {player name: {statistic: value}}
+    """
+    elo = estimate_elo(results)
+    summary = {}
+    for name in elo:
+        summary[name] = {'games': 0, 'wins': 0, 'draws': 0, 'losses': 0}
+    latencies = {name: [] for name in elo}
+    for result in results:
+        for side, name in enumerate(result.players):
+            player = summary[name]
+            player['games'] += 1
+            if result.winner is None:
+                player['draws'] += 1
+            elif result.winner == side:
+                player['wins'] += 1
+            else:
+                player['losses'] += 1
+            latencies[name].extend(result.latencies[side])
+    for name, player in summary.items():
+        player['score'] = (player['wins'] + player['draws'] / 2) / player['games']
+        player['elo'] = elo[name]
+        thinking_time = sum(latencies[name])
+        player['moves'] = len(latencies[name])
+        if thinking_time:
+            player['moves_per_second'] = player['moves'] / thinking_time
+        else:
+            player['moves_per_second'] = math.inf
+        if latencies[name]:
+            for label, fraction in [('p50', 0.5), ('p90', 0.9),
+                                    ('p99', 0.99), ('max', 1.0)]:
+                player['latency_' + label] = percentile(latencies[name],
+                                                        fraction)
+    return summary
+
+
+def print_summary(summary):
+    print("{:<20} {:>6} {:>5} {:>5} {:>5} {:>6} {:>7} {:>9} {:>8} {:>8}"
+          .format("player", "games", "won", "drawn", "lost", "score",
+                  "Elo", "moves/s", "p50 ms", "p99 ms"))
+    for name, player in sorted(summary.items(),
+                               key=lambda item: -item[1]['elo']):
+        print("{name:<20} {games:>6} {wins:>5} {draws:>5} {losses:>5} "
+              "{score:>6.3f} {elo:>+7.0f} {moves_per_second:>9.1f} "
+              "{p50:>8.3f} {p99:>8.3f}"
+              .format(name=name,
+                      p50=player.get('latency_p50', 0) * 1000,
+                      p99=player.get('latency_p99', 0) * 1000,
+                      **player))
@@ -0,0 +1,108 @@
+from collections import namedtuple
+from collections.abc import MutableMapping
+
+
+# Replacement policies
+
+ALWAYS_REPLACE = 'always_replace'
+DEPTH_PREFERRED = 'depth_preferred'
+
+
+# Bounds of a stored search result
+
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+
+SearchResult = namedtuple('SearchResult',
+                          ['value', 'bound', 'depth', 'move', 'player'])
+
+
+class TranspositionTable(MutableMapping):
+    """A mapping from node keys to values with a fixed number of
+    slots. Each key can only be stored in the slot given by its hash,
+    so a new key may collide with a stored one. In that case, the
+    replacement policy decides which of the two is kept:
+
+    * ALWAYS_REPLACE: The new entry replaces the stored one.
+    * DEPTH_PREFERRED: The new entry replaces the stored one only if
+      it has at least the same depth, so that the results of deeper
+      (and thus more expensive) searches are kept.
+
+    This means that unlike with a dict, storing a value does not
+    guarantee that it can be looked up later. Use .store() to learn
+    whether it was.
+    """
+
+    def __init__(self, capacity, replacement=DEPTH_PREFERRED):
+        assert capacity > 0
+        assert replacement in (ALWAYS_REPLACE, DEPTH_PREFERRED)
+        self.capacity = capacity
+        self.replacement = replacement
+        self.statistics = None  # Counts probes by .get() if set
+        self.clear()
+
+    def clear(self):
+        self._keys = [None] * self.capacity
+        self._values = [None] * self.capacity
+        self._depths = [0] * self.capacity
+        self._size = 0
+
+    def store(self, key, value, depth=0):
+        """Store value under key, unless the replacement policy
+        prefers the entry that is already in key's slot.
+
+        Returns:
+            bool: Whether value has been stored.
+        """
+        slot = hash(key) % self.capacity
+        stored_key = self._keys[slot]
+        if stored_key is None:
+            self._size += 1
+        elif (stored_key != key and
+              self.replacement == DEPTH_PREFERRED and
+              depth < self._depths[slot]):
+            return False
+        self._keys[slot] = key
+        self._values[slot] = value
+        self._depths[slot] = depth
+        return True
+
+    def __setitem__(self, key, value):
+        self.store(key, value)
+
+    def __getitem__(self, key):
+        slot = hash(key) % self.capacity
+        if self._keys[slot] is None or self._keys[slot] != key:
+            raise KeyError(key)
+        return self._values[slot]
+
+    def __contains__(self, key):
+        slot = hash(key) % self.capacity
+        return self._keys[slot] is not None and self._keys[slot] == key
+
+    def get(self, key, default=None):
+        slot = hash(key) % self.capacity
+        if self._keys[slot] is None or self._keys[slot] != key:
+            if self.statistics is not None:
+                self.statistics.count('transposition_misses')
+            return default
+        if self.statistics is not None:
+            self.statistics.count('transposition_hits')
+        return self._values[slot]
+
+    def __delitem__(self, key):
+        slot = hash(key) % self.capacity
+        if self._keys[slot] is None or self._keys[slot] != key:
+            raise KeyError(key)
+        self._keys[slot] = None
+        self._values[slot] = None
+        self._depths[slot] = 0
+        self._size -= 1
+
+    def __iter__(self):
+        return (key for key in list(self._keys) if key is not None)
+
+    def __len__(self):
+        return self._size
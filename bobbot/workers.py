@@ -0,0 +1,14 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def process_pool(**kwargs):
+    """A ProcessPoolExecutor whose workers are forked where possible, so
+    that they inherit classes that can't be pickled, like game and AI
+    classes created with type(). kwargs are passed on to it.
+    """
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+    else:
+        context = None
+    return ProcessPoolExecutor(mp_context=context, **kwargs)
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+
+from bobbot.search_tree import BaseAI
+from bobbot.search_tree import ForwardSweepingMixin, NaivePruningMixin
+from bobbot.search_tree import AlphaBetaSearchMixin
+from bobbot.search_node import MinMaxScoringMixin
+from bobbot.search_node import ChooseRandomMoveFromBestMixin
+from bobbot.transposition_table import TranspositionTable
+from bobbot.games.tictactoe import TicTacToeAdapter
+from bobbot.tournament import PlayerConfig, run_tournament
+from bobbot.tournament import summarize, print_summary
+
+
+TicTacToe = (MinMaxScoringMixin, ChooseRandomMoveFromBestMixin,
+             TicTacToeAdapter)
+players = [PlayerConfig('sweep depth {}'.format(depth),
+                        TicTacToe,
+                        (ForwardSweepingMixin, NaivePruningMixin, BaseAI),
+                        {'search_depth': depth})
+           for depth in (1, 2, 4)]
+players.append(PlayerConfig('alpha-beta', TicTacToe,
+                            (AlphaBetaSearchMixin, BaseAI),
+                            {'transposition_table': TranspositionTable(2**16)}))
+
+
+if __name__ == '__main__':
+    print_summary(summarize(run_tournament(players, games_per_pairing=20)))
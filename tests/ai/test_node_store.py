@@ -0,0 +1,154 @@
+import tracemalloc
+
+import pytest
+
+from bobbot.search_tree import BaseAI
+from bobbot.search_tree import OneStepSearchMixin
+from bobbot.search_tree import FullExpansionMixin
+from bobbot.search_tree import ForwardSweepingMixin
+from bobbot.search_tree import NaivePruningMixin
+from bobbot.search_tree import IncrementalPruningMixin
+from bobbot.search_tree import BatchedBackpropagationMixin
+from bobbot.search_tree import ArrayNodeStoreMixin
+from bobbot.search_tree import IndexedNodeStoreMixin
+from bobbot.search_node import MinMaxScoringMixin
+from bobbot.search_node import ChooseRandomMoveFromBestMixin
+from bobbot.search_node import ZobristKeyMixin
+from bobbot.search_node import StateIndexKeyMixin
+from bobbot.games import nim
+from bobbot.games.nim import NimAdapter
+from bobbot.games.tictactoe import TicTacToeAdapter
+
+
+Nim = type('Nim',
+           (ZobristKeyMixin,
+            ChooseRandomMoveFromBestMixin,
+            MinMaxScoringMixin,
+            NimAdapter),
+           {})
+
+
+IndexedNim = type('IndexedNim',
+                  (StateIndexKeyMixin,
+                   ChooseRandomMoveFromBestMixin,
+                   MinMaxScoringMixin,
+                   NimAdapter),
+                  {})
+
+
+def solve(AI, Game=Nim):
+    tracemalloc.start()
+    ai = AI(Game())
+    ai.expand_search_tree()
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return ai, memory
+
+
+def test_full_expansion():
+    AI = type('AI', (FullExpansionMixin, OneStepSearchMixin, BaseAI), {})
+    StoreAI = type('AI',
+                   (BatchedBackpropagationMixin,
+                    ArrayNodeStoreMixin,
+                    FullExpansionMixin,
+                    OneStepSearchMixin,
+                    BaseAI),
+                   {})
+    ai, memory = solve(AI)
+    store_ai, store_memory = solve(StoreAI)
+    assert store_ai.num_states() == ai.num_states()
+    for key, node in ai.search_tree.items():
+        view = store_ai.search_tree[key]
+        assert view == store_ai.search_tree[key]
+        assert view.score == node.score
+        assert view.moves == node.moves
+        assert view.known_predecessors == {store_ai.search_tree[p._node_key()]
+                                           for p in node.known_predecessors}
+    assert store_memory < memory / 2
+
+
+def test_scores_require_batched_backpropagation():
+    # Views defer their score updates, which would otherwise go stale.
+    AI = type('AI',
+              (ArrayNodeStoreMixin,
+               FullExpansionMixin,
+               OneStepSearchMixin,
+               BaseAI),
+              {})
+    with pytest.raises(AssertionError):
+        AI(Nim())
+
+
+@pytest.mark.parametrize('Pruning', [NaivePruningMixin,
+                                     IncrementalPruningMixin])
+def test_play_with_pruning(Pruning):
+    Game = type('Game',
+                (ChooseRandomMoveFromBestMixin,
+                 MinMaxScoringMixin,
+                 TicTacToeAdapter),
+                {})
+    AI = type('AI',
+              (BatchedBackpropagationMixin,
+               ArrayNodeStoreMixin,
+               ForwardSweepingMixin,
+               Pruning,
+               BaseAI),
+              {})
+    ai = AI(Game(), search_depth=9)
+    ai.play()
+    # Perfect play leads to a draw.
+    assert ai.current_state._winner() is None
+    assert ai.num_states() == 1
+
+
+def test_indexed_full_expansion():
+    StoreAI = type('AI',
+                   (BatchedBackpropagationMixin,
+                    ArrayNodeStoreMixin,
+                    FullExpansionMixin,
+                    OneStepSearchMixin,
+                    BaseAI),
+                   {})
+    IndexedAI = type('AI',
+                     (BatchedBackpropagationMixin,
+                      IndexedNodeStoreMixin,
+                      FullExpansionMixin,
+                      OneStepSearchMixin,
+                      BaseAI),
+                     {})
+    store_ai, _ = solve(StoreAI)
+    indexed_ai, _ = solve(IndexedAI, IndexedNim)
+    assert indexed_ai.num_states() == store_ai.num_states()
+    for node in store_ai.search_tree.values():
+        view = indexed_ai.search_tree[nim.state_index(node.state)]
+        assert view.state == node.state
+        assert view.score == node.score
+        assert view.moves == {move: nim.state_index(successor.state)
+                              for move, successor
+                              in zip(node.moves, node.successors.values())}
+
+    # Neither states nor keys are stored, nor is a dict of node ids.
+    store = indexed_ai.search_tree
+    assert not store.ids
+    assert isinstance(store.node_keys, range)
+    assert len(store.expanded) == nim.NUM_STATE_INDICES
+
+
+def test_indexed_play_with_pruning():
+    Game = type('Game',
+                (StateIndexKeyMixin,
+                 ChooseRandomMoveFromBestMixin,
+                 MinMaxScoringMixin,
+                 TicTacToeAdapter),
+                {})
+    AI = type('AI',
+              (BatchedBackpropagationMixin,
+               IndexedNodeStoreMixin,
+               ForwardSweepingMixin,
+               NaivePruningMixin,
+               BaseAI),
+              {})
+    ai = AI(Game(), search_depth=9)
+    ai.play()
+    assert ai.current_state._winner() is None
+    assert ai.num_states() == 1
@@ -0,0 +1,29 @@
+from bobbot.search_tree import BaseAI
+from bobbot.search_tree import AlphaBetaSearchMixin, OpeningBookMixin
+from bobbot.transposition_table import TranspositionTable
+from bobbot.opening_book import build_opening_book
+from bobbot.opening_book import save_opening_book, load_opening_book
+from bobbot.games.mnk import MNKAdapter
+
+
+def test_opening_book(tmp_path):
+    book = build_opening_book(MNKAdapter(), 2,
+                              transposition_table=TranspositionTable(2**16))
+    # The starting state and the states after each of the first moves
+    assert len(book) == 1 + 9
+    assert book[MNKAdapter()._node_key()][1] == -0.5
+    path = str(tmp_path / 'book')
+    save_opening_book(book, path)
+    assert load_opening_book(path) == book
+
+    AI = type('AI', (OpeningBookMixin, AlphaBetaSearchMixin, BaseAI), {})
+    ai = AI(MNKAdapter(), opening_book=path)
+    move = ai.choose_move()
+    assert move == book[ai.current_state._node_key()][0]
+    assert ai.nodes_visited == 0
+    ai.make_move(move)
+    ai.make_move(ai.choose_move())
+    assert ai.nodes_visited == 0
+    # Out of the book, the search takes over.
+    ai.make_move(ai.choose_move())
+    assert ai.nodes_visited > 0
@@ -6,11 +6,18 @@
 # ChooseFirstMoveMixin
 # ChooseRandomMoveFromBestMixin
 
+import pytest
+
 from bobbot.search_tree import BaseAI, PlayerInterface
 from bobbot.search_tree import OneStepSearchMixin
 from bobbot.search_tree import FullExpansionMixin
 from bobbot.search_tree import ForwardSweepingMixin
+from bobbot.search_tree import BatchedBackpropagationMixin
+from bobbot.search_tree import BatchEvaluationMixin
+from bobbot.search_tree import ArrayNodeStoreMixin
 from bobbot.search_node import MinMaxScoringMixin
+from bobbot.search_node import DeferredBackpropagationMixin
+from bobbot.games import nim
 from bobbot.games.nim import NimAdapter
 from bobbot.games.nim import PLAYER_A
 from bobbot.games.nim import PLAYER_B
@@ -40,6 +47,21 @@ def test_unknown_scoring():
     assert ai.current_state.score[PLAYER_O] == 0
 
 
+def test_overridden_evaluation():
+    # Nim's .expand_state() evaluates by the nim sum, but successors
+    # have to be scored by the overriding .evaluate().
+    class EndStateNim(MinMaxScoringMixin, NimAdapter):
+        def evaluate(self, game_state):
+            return nim.evaluate_if_end_state(game_state)
+
+    AI = type('AI', (OneStepSearchMixin, BaseAI), {})
+    ai = AI(EndStateNim())
+    ai.expand_search_tree()
+    for successor in ai.current_state.get_successor_nodes():
+        assert successor.score == successor.evaluate(successor.state)
+        assert successor.score == {PLAYER_A: 0, PLAYER_B: 0}
+
+
 def test_draw_scoring():
     Game = type('Game', (MinMaxScoringMixin, TicTacToeAdapter), {})
     AI = type('AI', (ForwardSweepingMixin, BaseAI), {})
@@ -54,3 +76,109 @@ def test_draw_scoring():
     # At this point, minmax play yields draws.
     assert ai.current_state.score[PLAYER_X] == -0.5
     assert ai.current_state.score[PLAYER_O] == -0.5
+
+
+def test_batched_backpropagation():
+    update_counts = {}
+
+    class CountingMixin:
+        def update_score(self):
+            key = self._node_key()
+            update_counts[key] = update_counts.get(key, 0) + 1
+            return super().update_score()
+
+    Game = type('Game', (MinMaxScoringMixin, NimAdapter), {})
+    BatchedGame = type('Game',
+                       (CountingMixin,
+                        DeferredBackpropagationMixin,
+                        MinMaxScoringMixin,
+                        NimAdapter),
+                       {})
+    AI = type('AI', (OneStepSearchMixin, FullExpansionMixin, BaseAI), {})
+    BatchedAI = type('AI',
+                     (BatchedBackpropagationMixin,
+                      OneStepSearchMixin,
+                      FullExpansionMixin,
+                      BaseAI),
+                     {})
+    ai = AI(Game())
+    ai.expand_search_tree()
+    batched_ai = BatchedAI(BatchedGame())
+    batched_ai.expand_search_tree()
+    assert batched_ai.current_state.score[PLAYER_A] == 1
+    assert batched_ai.current_state.score[PLAYER_B] == -1
+    for key, node in ai.search_tree.items():
+        assert batched_ai.search_tree[key].score == node.score
+    # Each node gets updated at most once per expansion step, and with
+    # 15 items on the heaps, there are at most 15 of those.
+    assert max(update_counts.values()) <= 15
+
+
+def test_batch_evaluation():
+    Game = type('Game', (MinMaxScoringMixin, NimAdapter), {})
+    BatchedGame = type('Game',
+                       (DeferredBackpropagationMixin,
+                        MinMaxScoringMixin,
+                        NimAdapter),
+                       {})
+    AI = type('AI', (OneStepSearchMixin, FullExpansionMixin, BaseAI), {})
+    BatchedAI = type('AI',
+                     (BatchedBackpropagationMixin,
+                      BatchEvaluationMixin,
+                      OneStepSearchMixin,
+                      FullExpansionMixin,
+                      BaseAI),
+                     {})
+    ai = AI(Game())
+    ai.expand_search_tree()
+    batched_ai = BatchedAI(BatchedGame())
+    batched_ai.expand_search_tree()
+    assert not batched_ai.evaluation_queue
+    for key, node in ai.search_tree.items():
+        assert batched_ai.search_tree[key].score == node.score
+    # Stored nodes always have scores for every player, so there are no
+    # empty ones to mark the nodes to evaluate.
+    StoreAI = type('AI',
+                   (BatchedBackpropagationMixin,
+                    BatchEvaluationMixin,
+                    ArrayNodeStoreMixin,
+                    OneStepSearchMixin,
+                    BaseAI),
+                   {})
+    with pytest.raises(AssertionError):
+        StoreAI(BatchedGame())
+
+
+def test_vectorized_batch_evaluation():
+    numpy = pytest.importorskip('numpy')
+    batch_sizes = []
+
+    class LinearEvaluationMixin:
+        """Scores states by how many fields each player holds."""
+        def encode_state(self, game_state):
+            return [game_state.board[coord] == PLAYER_X
+                    for coord in sorted(game_state.board)]
+
+        def evaluate_batch(self, features):
+            batch_sizes.append(len(features))
+            x_score = features.dot(numpy.ones(9)) / 10
+            return {PLAYER_X: x_score, PLAYER_O: -x_score}
+
+    Game = type('Game',
+                (LinearEvaluationMixin,
+                 DeferredBackpropagationMixin,
+                 MinMaxScoringMixin,
+                 TicTacToeAdapter),
+                {})
+    AI = type('AI',
+              (BatchedBackpropagationMixin,
+               BatchEvaluationMixin,
+               ForwardSweepingMixin,
+               BaseAI),
+              {})
+    ai = AI(Game(), search_depth=2)
+    ai.expand_search_tree()
+    # One batch per ply, each with all of its new nodes.
+    assert batch_sizes == [9, 72]
+    after_center = ai.current_state.get_successor((1, 1))
+    assert after_center.score == {PLAYER_X: 0.1, PLAYER_O: -0.1}
@@ -1,8 +1,42 @@
+import random
+import time
+
+import pytest
+
 from bobbot.search_tree import BaseAI, PlayerInterface
 from bobbot.search_tree import OneStepSearchMixin
 from bobbot.search_tree import FullExpansionMixin
+from bobbot.search_tree import BoundedExpansionMixin
 from bobbot.search_tree import ForwardSweepingMixin
 from bobbot.search_tree import NaivePruningMixin
+from bobbot.search_tree import IncrementalPruningMixin
+from bobbot.search_tree import WeakrefPruningMixin
+from bobbot.search_tree import SymmetryMixin
+from bobbot.search_tree import MemoryBudgetMixin
+from bobbot.search_tree import LowestValueEvictionMixin
+from bobbot.search_node import CanonicalStatesMixin
+from bobbot.search_node import WeakPredecessorsMixin
+from bobbot.search_tree import ParallelSweepingMixin
+from bobbot.search_tree import PonderingMixin
+from bobbot.search_tree import MonteCarloTreeSearchMixin
+from bobbot.search_tree import ProofNumberSearchMixin
+from bobbot.search_node import ProofNumberMixin
+from bobbot.search_node import ChooseMostProvenMoveMixin
+from bobbot.search_node import MonteCarloStatisticsMixin
+from bobbot.search_node import ChooseMostVisitedMoveMixin
+from bobbot.games.mnk import MNKAdapter
+from bobbot.games.connectfour import ConnectFourAdapter
+from bobbot.search_tree import AlphaBetaSearchMixin
+from bobbot.search_tree import PrincipalVariationSearchMixin
+from bobbot.search_tree import IterativeDeepeningMixin
+from bobbot.search_tree import TranspositionTableMixin
+from bobbot.transposition_table import TranspositionTable
+from bobbot.transposition_table import ALWAYS_REPLACE, DEPTH_PREFERRED
+from bobbot.search_node import ZobristKeyMixin
+from bobbot.search_node import MinMaxScoringMixin
+from bobbot.search_node import ChooseRandomMoveFromBestMixin
+from bobbot.games import nim
+from bobbot.games import tictactoe
 from bobbot.games.nim import NimAdapter
 from bobbot.games.tictactoe import TicTacToeAdapter
 from bobbot.games.tictactoe import PLAYER_X
@@ -10,14 +44,36 @@ from bobbot.games.tictactoe import PLAYER_O
 
 
 # TODO
-# search_tree: CurrentStateExpansionMixin, BoundedExpansionMixin
+# search_tree: CurrentStateExpansionMixin
 # search_node: BackpropagationScoringMixin, MinMaxScoringMixin, choosers
 
-def test_expand_implicitly_on_move():
+def test_expand_lazily_on_move():
     ai = BaseAI(TicTacToeAdapter())
+    root = ai.current_state
     assert ai.num_states() == 1
-    ai.make_move((0, 0)) # This adds all nine possible successors
-    assert ai.num_states() == 10
+    ai.make_move((0, 0)) # This adds only the successor for the move
+    assert ai.num_states() == 2
+    assert not root.is_expanded
+    assert root.is_partially_expanded
+    assert root.get_successor((0, 0)) is ai.current_state
+
+
+def test_partial_expansion_scores():
+    Game = type('Game', (MinMaxScoringMixin, NimAdapter), {})
+    AI = type('AI', (OneStepSearchMixin, BaseAI), {})
+    ai = AI(Game())
+    root = ai.current_state
+    evaluation = dict(root.score)
+    # Taking all of the biggest heap loses, ...
+    ai.make_move((2, 7))
+    # ...but the root keeps its evaluation, as it has winning moves too.
+    assert root.score == evaluation
+    # Expanding it fully adds the other successors to the known one.
+    ai.expand_single_node(root)
+    assert root.is_expanded and not root.is_partially_expanded
+    assert len(root.moves) == 3 + 5 + 7
+    assert root.get_successor((2, 7)) is ai.current_state
+    assert root.score == {nim.PLAYER_A: 1, nim.PLAYER_B: -1}
 
 
 def test_player_interface():
@@ -66,6 +122,25 @@ def test_full_expansion_mixin():
     assert ai.num_states() == possible_states
 
 
+def assert_frontier_is_consistent(ai):
+    assert set(ai.frontier) == {node_key
+                                for node_key, node in ai.search_tree.items()
+                                if not node.is_expanded}
+
+
+def test_frontier():
+    for Pruning in [NaivePruningMixin, IncrementalPruningMixin]:
+        AI = type('AI', (OneStepSearchMixin, Pruning, BaseAI), {})
+        ai = AI(TicTacToeAdapter())
+        assert list(ai.frontier.values()) == [ai.current_state]
+        for move in [(1, 1), (0, 0), (2, 2)]:
+            ai.step_search_tree_expansion()
+            ai.step_search_tree_expansion()
+            assert_frontier_is_consistent(ai)
+            ai.make_move(move)
+            assert_frontier_is_consistent(ai)
+
+
 def test_forward_sweeping_mixin():
     AI = type('AI',
               (ForwardSweepingMixin, BaseAI),
@@ -81,6 +156,30 @@ def test_forward_sweeping_mixin():
     # assert ai.num_states() == 1 + 9 + 9*8 + FIXME
 
 
+def test_bounded_expansion_mixin_time_limit():
+    # Each node takes 10ms to expand, so a full expansion, or a single
+    # step of it, would take far longer than the time limit.
+    class SlowTicTacToe(TicTacToeAdapter):
+        def expand_state(self, game_state):
+            time.sleep(0.01)
+            return super().expand_state(game_state)
+
+    time_limit = 0.1
+    for mixins, kwargs in [
+            ((FullExpansionMixin, OneStepSearchMixin), {}),
+            ((ForwardSweepingMixin, ), {'search_depth': 9}),
+    ]:
+        AI = type('AI', (BoundedExpansionMixin, ) + mixins + (BaseAI, ), {})
+        ai = AI(SlowTicTacToe(), time_limit=time_limit, **kwargs)
+        start_time = time.monotonic()
+        ai.expand_search_tree()
+        elapsed_time = time.monotonic() - start_time
+        assert 1 + 9 < ai.num_states() < 5478
+        # The deadline is checked between nodes.
+        assert elapsed_time < time_limit + 0.1
+        assert ai.expansion_deadline is None
+
+
 def test_naive_pruning_mixin():
     AI = type('AI',
               (NaivePruningMixin, BaseAI),
@@ -94,3 +193,451 @@ def test_naive_pruning_mixin():
     assert ai.num_states() == 1
     ai.make_move((1, 2))
     assert ai.num_states() == 1
+
+
+def test_alpha_beta_search_mixin():
+    Game = type('Game',
+                (MinMaxScoringMixin, ChooseRandomMoveFromBestMixin,
+                 TicTacToeAdapter),
+                {})
+    FullAI = type('AI',
+                  (FullExpansionMixin, OneStepSearchMixin, NaivePruningMixin,
+                   BaseAI),
+                  {})
+    AlphaBetaAI = type('AI', (AlphaBetaSearchMixin, BaseAI), {})
+    full_ai = FullAI(Game())
+    alpha_beta_ai = AlphaBetaAI(Game())
+    for move in [(1, 1), (0, 0), (2, 2)]:
+        full_ai.make_move(move)
+        alpha_beta_ai.make_move(move)
+    full_ai.expand_search_tree()
+    root = full_ai.current_state
+    player = root._active_player()
+    move_scores = {move: root.get_successor(move).score[player]
+                   for move in root.moves}
+    best_score = max(move_scores.values())
+
+    tree_size = alpha_beta_ai.num_states()
+    move, value = alpha_beta_ai.alpha_beta_search()
+    assert value == best_score
+    assert move_scores[move] == best_score
+    assert alpha_beta_ai.choose_move() == move
+    # The search neither adds to the search tree, nor needs to visit
+    # every path through the game tree.
+    def count_paths(game_state):
+        return 1 + sum(count_paths(tictactoe.make_move(game_state, move))
+                       for move in tictactoe.all_legal_moves(game_state))
+    assert alpha_beta_ai.num_states() == tree_size
+    assert alpha_beta_ai.nodes_visited < count_paths(root.state) / 2
+
+
+def test_alpha_beta_search_depth():
+    AI = type('AI', (AlphaBetaSearchMixin, BaseAI), {})
+    ai = AI(NimAdapter(), search_depth=1)
+    move, value = ai.alpha_beta_search()
+    # Nim sum evaluation is perfect, so one ply suffices to find a
+    # move that leaves a nim sum of zero.
+    assert value == 1
+    board = nim.make_move(nim.starting_state(), move).board
+    assert board[0] ^ board[1] ^ board[2] == 0
+    assert ai.nodes_visited == 1 + len(nim.all_legal_moves(nim.starting_state()))
+
+
+def test_alpha_beta_transposition_table():
+    AI = type('AI', (AlphaBetaSearchMixin, BaseAI), {})
+    Game = type('Game', (ZobristKeyMixin, TicTacToeAdapter), {})
+    plain_ai = AI(Game())
+    table_ai = AI(Game(), transposition_table=TranspositionTable(2**12))
+    for move in [(1, 1), (0, 0)]:
+        plain_ai.make_move(move)
+        table_ai.make_move(move)
+    plain_move, plain_value = plain_ai.alpha_beta_search()
+    table_move, table_value = table_ai.alpha_beta_search()
+    assert table_value == plain_value
+    assert table_ai.nodes_visited < plain_ai.nodes_visited
+    # Searching the same position again is answered from the table.
+    assert table_ai.alpha_beta_search() == (table_move, table_value)
+    assert table_ai.nodes_visited == 1
+
+
+def test_principal_variation_search_mixin():
+    Game = type('Game',
+                (MinMaxScoringMixin, ChooseRandomMoveFromBestMixin,
+                 TicTacToeAdapter),
+                {})
+    FullAI = type('AI',
+                  (FullExpansionMixin, OneStepSearchMixin, BaseAI),
+                  {})
+    PVSAI = type('AI',
+                 (PrincipalVariationSearchMixin, AlphaBetaSearchMixin,
+                  BaseAI),
+                 {})
+    full_ai = FullAI(Game())
+    for move in [(1, 1), (0, 0)]:
+        full_ai.make_move(move)
+    full_ai.expand_search_tree()
+    root = full_ai.current_state
+    player = root._active_player()
+    move_scores = {move: root.get_successor(move).score[player]
+                   for move in root.moves}
+    best_score = max(move_scores.values())
+    best_moves = {move for move, score in move_scores.items()
+                  if score == best_score}
+    assert len(best_moves) > 1
+
+    def count_paths(game_state):
+        return 1 + sum(count_paths(tictactoe.make_move(game_state, move))
+                       for move in tictactoe.all_legal_moves(game_state))
+
+    minimax_nodes = count_paths(root.state)
+    chosen_moves = set()
+    for seed in range(6):
+        random.seed(seed)
+        ai = PVSAI(Game())
+        for move in [(1, 1), (0, 0)]:
+            ai.make_move(move)
+        move = ai.choose_move()
+        assert move in best_moves
+        assert ai.nodes_visited < minimax_nodes
+        chosen_moves.add(move)
+    # Equally good moves are chosen randomly...
+    assert len(chosen_moves) > 1
+    # ...but the search itself keeps the game's move order.
+    move, value = ai.alpha_beta_search()
+    assert value == best_score
+    assert move == min(best_moves,
+                       key=tictactoe.all_legal_moves(root.state).index)
+
+    # The next search starts with an aspiration window around the value
+    # of this one, which it is within.
+    aspiration_re_searches = ai.aspiration_re_searches
+    assert ai.alpha_beta_search()[1] == best_score
+    assert ai.aspiration_re_searches == aspiration_re_searches
+    # A search that falls outside of it is repeated.
+    ai.aspiration_values[player] = 1
+    assert ai.alpha_beta_search()[1] == best_score
+    assert ai.aspiration_re_searches == aspiration_re_searches + 1
+
+
+def test_principal_variation_search_mixin_connectfour():
+    # With the center columns first, the first move tends to be the best
+    # one, so null-window searches of the others visit fewer nodes than
+    # searching them with the full window.
+    AlphaBetaAI = type('AI', (AlphaBetaSearchMixin, BaseAI), {})
+    PVSAI = type('AI',
+                 (PrincipalVariationSearchMixin, AlphaBetaSearchMixin,
+                  BaseAI),
+                 {})
+    results = []
+    for AI in [AlphaBetaAI, PVSAI]:
+        ai = AI(ConnectFourAdapter(), search_depth=7)
+        results.append((ai.alpha_beta_search(), ai.nodes_visited))
+    (alpha_beta_result, alpha_beta_nodes), (pvs_result, pvs_nodes) = results
+    assert pvs_result == alpha_beta_result
+    assert pvs_nodes <= alpha_beta_nodes
+    # Checking the other moves for being as good as the best one costs
+    # extra nodes, which are counted as well. Only moves whose bounds
+    # allow for that are checked.
+    ai.choose_move()
+    assert ai.nodes_visited > pvs_nodes
+    best_move, value = pvs_result
+    ai.root_move_values = {move: value - 1 for move in ai.root_move_values}
+    nodes_visited = ai.nodes_visited
+    assert ai.choose_from_best(best_move, value, 7) == best_move
+    assert ai.nodes_visited == nodes_visited
+
+
+def test_transposition_table_mixin():
+    Game = type('Game', (ZobristKeyMixin, MinMaxScoringMixin, NimAdapter), {})
+    AI = type('AI',
+              (TranspositionTableMixin,
+               FullExpansionMixin,
+               OneStepSearchMixin,
+               BaseAI),
+              {})
+    for table_size in [2**16, 64]:
+        ai = AI(Game(), table_size=table_size)
+        ai.expand_search_tree()
+        assert 0 < ai.num_states() <= table_size
+        assert all(isinstance(key, int) for key in ai.search_tree)
+        # Displaced nodes still take part in scoring.
+        assert ai.current_state.score[nim.PLAYER_A] == 1
+
+
+def test_transposition_table_mixin_solves_tictactoe():
+    Game = type('Game',
+                (ZobristKeyMixin, MinMaxScoringMixin, TicTacToeAdapter),
+                {})
+    AI = type('AI',
+              (TranspositionTableMixin,
+               FullExpansionMixin,
+               OneStepSearchMixin,
+               BaseAI),
+              {})
+    for replacement in [DEPTH_PREFERRED, ALWAYS_REPLACE]:
+        ai = AI(Game(), table_size=512, replacement=replacement)
+        ai.expand_search_tree()
+        assert ai.num_states() <= 512
+        # No leaf has been lost, so TicTacToe is still a draw.
+        assert ai.current_state.score == {PLAYER_X: -0.5, PLAYER_O: -0.5}
+        seen = set()
+        unexplored = [ai.current_state]
+        while unexplored:
+            node = unexplored.pop()
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            assert node.is_expanded or node._is_finished()
+            unexplored.extend(node.get_successor_nodes())
+        assert not ai.frontier
+
+
+def test_parallel_sweeping_mixin():
+    Game = type('Game', (MinMaxScoringMixin, TicTacToeAdapter), {})
+    AI = type('AI', (ForwardSweepingMixin, BaseAI), {})
+    ParallelAI = type('AI',
+                      (ParallelSweepingMixin, ForwardSweepingMixin, BaseAI),
+                      {})
+    ai = AI(Game(), search_depth=4)
+    ai.expand_search_tree()
+    parallel_ai = ParallelAI(Game(), search_depth=4, workers=2, chunk_size=16)
+    try:
+        parallel_ai.expand_search_tree()
+    finally:
+        parallel_ai.shutdown()
+    assert parallel_ai.num_states() == ai.num_states()
+    for key, node in ai.search_tree.items():
+        parallel_node = parallel_ai.search_tree[key]
+        assert parallel_node.is_expanded == node.is_expanded
+        assert parallel_node.score == node.score
+
+
+def test_pondering_mixin():
+    AI = type('AI', (PonderingMixin, NaivePruningMixin, BaseAI), {})
+    ai = AI(TicTacToeAdapter(), ponder_node_limit=200)
+    ai.make_move((1, 1))
+    # Wait for pondering to hit the node limit.
+    ai.ponder_thread.join()
+    assert ai.num_states() >= 200
+    ai.make_move((0, 0))
+    ai.stop_pondering()
+    assert ai.ponder_thread is None
+    # The subtree of the move that was made has been kept, and the rest
+    # has been pruned.
+    assert ai.current_state.is_expanded
+    assert ai.num_states() > 1
+    assert all(node_key[0] == 'O' for node_key in ai.search_tree)
+
+
+def test_monte_carlo_tree_search_mixin():
+    Game = type('Game',
+                (MonteCarloStatisticsMixin,
+                 ChooseMostVisitedMoveMixin,
+                 MNKAdapter),
+                {})
+    AI = type('AI',
+              (MonteCarloTreeSearchMixin, NaivePruningMixin, BaseAI),
+              {})
+    ai = AI(Game(), playout_limit=500)
+    for move in [(0, 0), (0, 1), (1, 0), (1, 1)]:
+        ai.make_move(move)
+    # X can win immediately.
+    assert ai.choose_move() == (2, 0)
+    assert ai.playouts == 500
+    assert ai.current_state.visits == 500
+    ai.make_move((2, 2))
+    # So can O, instead of blocking X.
+    assert ai.choose_move() == (2, 1)
+
+    # A node limit alone might never end the search.
+    BoundedAI = type('AI',
+                     (BoundedExpansionMixin, MonteCarloTreeSearchMixin,
+                      BaseAI),
+                     {})
+    with pytest.raises(AssertionError):
+        BoundedAI(Game(), playout_limit=0, node_limit=10000)
+
+
+def test_proof_number_search_mixin():
+    Game = type('Game',
+                (ProofNumberMixin, ChooseMostProvenMoveMixin, NimAdapter),
+                {})
+    AI = type('AI', (ProofNumberSearchMixin, BaseAI), {})
+    ai = AI(Game())
+    assert ai.prove() is True
+    move = ai.choose_move()
+    ai.make_move(move)
+    board = ai.current_state.state.board
+    assert board[0] ^ board[1] ^ board[2] == 0
+    # The other player can't win now.
+    assert ai.prove() is False
+
+    Game = type('Game',
+                (ProofNumberMixin, ChooseMostProvenMoveMixin, MNKAdapter),
+                {})
+    ai = AI(Game())
+    # TicTacToe is a draw, which takes fewer than all of its 5478
+    # states to find out.
+    assert ai.prove() is False
+    assert ai.num_states() < 5478
+    ai.make_move((0, 0))
+    ai.make_move((0, 1))
+    assert ai.prove() is True
+
+
+def test_iterative_deepening_mixin():
+    AI = type('AI',
+              (IterativeDeepeningMixin, AlphaBetaSearchMixin, BaseAI),
+              {})
+    ai = AI(MNKAdapter(), move_time=60)
+    # TicTacToe gets solved long before the time is up.
+    move, value = ai.iterative_deepening_search()
+    assert value == -0.5
+    assert ai.completed_depth == 9
+    assert len(ai.principal_variation) == 9
+    assert ai.principal_variation[0] == move
+
+    # The deadline is checked within searches, so it is kept tightly,
+    # also by principal variation search's checks for equally good
+    # moves.
+    PVSAI = type('AI',
+                 (IterativeDeepeningMixin, PrincipalVariationSearchMixin,
+                  AlphaBetaSearchMixin, BaseAI),
+                 {})
+    Game = type('Game', (MNKAdapter,), {'width': 5, 'height': 5, 'k': 4})
+    for AI in [AI, PVSAI]:
+        ai = AI(Game(), move_time=0.2)
+        start_time = time.monotonic()
+        move = ai.choose_move()
+        assert time.monotonic() - start_time < 0.4
+        assert move in ai.current_state._all_legal_moves()
+        assert 1 <= ai.completed_depth < 25
+
+
+def test_incremental_and_weakref_pruning():
+    moves = [(1, 1), (0, 0), (2, 2), (0, 2)]
+
+    def play(ai_mixins, game_mixins=()):
+        Game = type('Game', game_mixins + (MinMaxScoringMixin, MNKAdapter),
+                    {})
+        AI = type('AI', ai_mixins + (OneStepSearchMixin, BaseAI), {})
+        ai = AI(Game())
+        trees = []
+        for move in moves:
+            ai.expand_search_tree()
+            ai.expand_search_tree()
+            ai.make_move(move)
+            trees.append(set(ai.search_tree.keys()))
+        return ai, trees
+
+    _, naive_trees = play((NaivePruningMixin, ))
+    ai, incremental_trees = play((IncrementalPruningMixin, ))
+    assert incremental_trees == naive_trees
+    # No links to pruned predecessors are left.
+    for node in ai.search_tree.values():
+        for predecessor in node.known_predecessors:
+            assert predecessor._node_key() in ai.search_tree
+    _, weakref_trees = play((WeakrefPruningMixin, ), (WeakPredecessorsMixin, ))
+    assert weakref_trees == naive_trees
+
+
+def test_symmetry_mixin():
+    Game = type('Game',
+                (CanonicalStatesMixin, MinMaxScoringMixin,
+                 ChooseRandomMoveFromBestMixin, TicTacToeAdapter),
+                {})
+    AI = type('AI',
+              (SymmetryMixin, FullExpansionMixin, OneStepSearchMixin,
+               BaseAI),
+              {})
+    ai = AI(Game())
+    ai.expand_search_tree()
+    # Of the 5478 legal positions, 765 are distinct under rotation and
+    # reflection.
+    assert ai.num_states() == 765
+
+    # Moves are those of the actual game, even when they were
+    # translated to another orientation of the board.
+    game_state = tictactoe.starting_state()
+    for move in [(2, 0), (1, 1), (0, 1)]:
+        ai.make_move(move)
+        game_state = tictactoe.make_move(game_state, move)
+    while not tictactoe.is_finished(game_state):
+        move = ai.choose_move()
+        assert tictactoe.is_legal_move(game_state, move)
+        ai.make_move(move)
+        game_state = tictactoe.make_move(game_state, move)
+        assert (ai.current_state._node_key() ==
+                tictactoe.node_key(tictactoe.canonical_form(game_state)[0]))
+    # X can't win from there anymore, and O could only by mistake.
+    assert tictactoe.winner(game_state) is None
+
+    # A node that is merged with an expanded one gets its transforms.
+    node = Game().expand()[0]
+    expanded_node = Game().expand()[0]
+    expanded_node.expand()
+    node.merge(expanded_node)
+    assert node.move_transforms == expanded_node.move_transforms
+    for move in node.moves:
+        assert node.get_successor_transform(move) is not None
+
+
+def test_symmetry_mixin_nim():
+    Game = type('Game',
+                (CanonicalStatesMixin, MinMaxScoringMixin,
+                 ChooseRandomMoveFromBestMixin, NimAdapter),
+                {})
+    AI = type('AI',
+              (SymmetryMixin, FullExpansionMixin, OneStepSearchMixin,
+               BaseAI),
+              {})
+    ai = AI(Game())
+    ai.expand_search_tree()
+    assert ai.num_states() < (4 * 6 * 8) * 2 - (1 + 7)
+    game_state = nim.starting_state()
+    while not nim.is_finished(game_state):
+        move = ai.choose_move()
+        ai.make_move(move)
+        game_state = nim.make_move(game_state, move)
+        assert ai.current_state.state.board == tuple(sorted(game_state.board))
+    # The starting position is won for the first player.
+    assert nim.winner(game_state) == nim.PLAYER_A
+
+
+def test_memory_budget_mixin():
+    Game = type('Game',
+                (MinMaxScoringMixin, ChooseRandomMoveFromBestMixin,
+                 TicTacToeAdapter),
+                {})
+    # Pruning mixins may come before or after this one, so that they
+    # prune after or before it enforces the budget after a move.
+    pruning = (NaivePruningMixin, )
+    budgets = [((), pruning, {'node_budget': 150}),
+               ((LowestValueEvictionMixin, ), pruning, {'node_budget': 150}),
+               ((), pruning, {'byte_budget': 200000}),
+               (pruning, (), {'node_budget': 100}),
+               ((IncrementalPruningMixin, ), (), {'byte_budget': 100000})]
+    for mixins, later_mixins, budget in budgets:
+        AI = type('AI',
+                  mixins + (MemoryBudgetMixin, ForwardSweepingMixin) +
+                  later_mixins + (BaseAI, ),
+                  {})
+        ai = AI(Game(), search_depth=3, **budget)
+        game_state = tictactoe.starting_state()
+        while not tictactoe.is_finished(game_state):
+            move = ai.choose_move()
+            assert tictactoe.is_legal_move(game_state, move)
+            assert not ai.is_over_budget()
+            # Nodes pruned by other mixins have been forgotten.
+            assert set(ai.node_usage) == set(ai.search_tree)
+            ai.make_move(move)
+            game_state = tictactoe.make_move(game_state, move)
+            # Evicted nodes have been unlinked everywhere.
+            for node in ai.search_tree.values():
+                assert set(node.moves.values()) == set(node.successors)
+                for node_key, successor in node.successors.items():
+                    assert ai.search_tree[node_key] is successor
+            assert ai.tree_bytes == sum(ai.node_usage.values())
+            assert_frontier_is_consistent(ai)
+        # Unbounded, the first sweep alone adds 1 + 9 + 72 + 252 nodes.
+        assert ai.evictions > 0
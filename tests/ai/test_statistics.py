@@ -0,0 +1,150 @@
+import io
+import json
+import threading
+import time
+
+from bobbot.statistics import SearchStatistics, JSONLinesSink, percentile
+from bobbot.search_tree import BaseAI
+from bobbot.search_tree import StatisticsMixin
+from bobbot.search_tree import ForwardSweepingMixin
+from bobbot.search_tree import NaivePruningMixin
+from bobbot.search_tree import PonderingMixin
+from bobbot.search_tree import AlphaBetaSearchMixin
+from bobbot.search_node import ScoreStatisticsMixin
+from bobbot.search_node import MinMaxScoringMixin
+from bobbot.search_node import ChooseRandomMoveFromBestMixin
+from bobbot.transposition_table import TranspositionTable
+from bobbot.games.tictactoe import TicTacToeAdapter
+
+
+def test_phases_are_exclusive():
+    statistics = SearchStatistics()
+    with statistics.phase('outer'):
+        time.sleep(0.02)
+        with statistics.phase('inner'):
+            time.sleep(0.05)
+    assert 0.02 <= statistics.timings['outer'] < 0.05
+    assert statistics.timings['inner'] >= 0.05
+
+
+def test_phases_are_per_thread():
+    statistics = SearchStatistics()
+
+    def other_thread():
+        with statistics.phase('other'):
+            time.sleep(0.05)
+
+    with statistics.phase('main'):
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join()
+    # The main thread's phase ran on during the other thread's one.
+    assert statistics.timings['main'] >= 0.05
+    assert statistics.timings['other'] >= 0.05
+
+
+def test_snapshots_and_sinks():
+    output = io.StringIO()
+    statistics = SearchStatistics(sinks=[JSONLinesSink(output)])
+    statistics.count('expansions', 3)
+    statistics.maximum('search_tree_size', 10)
+    statistics.end_move()
+    statistics.count('expansions')
+    statistics.maximum('search_tree_size', 5)
+    assert statistics.move_snapshot()['counters'] == {'expansions': 1}
+    snapshot = statistics.snapshot()
+    assert snapshot['move'] == 1
+    assert snapshot['counters'] == {'expansions': 4}
+    assert snapshot['maxima'] == {'search_tree_size': 10}
+    statistics.end_move()
+    moves = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [move['move'] for move in moves] == [1, 2]
+    assert moves[1]['counters'] == {'expansions': 1}
+
+
+def test_percentile():
+    samples = [3, 1, 4, 1, 5, 9, 2, 6, 5, 3]
+    assert percentile(samples, 0) == 1
+    assert percentile(samples, 0.5) == 3
+    assert percentile(samples, 0.9) == 6
+    assert percentile(samples, 1) == 9
+    assert percentile([7], 0.99) == 7
+
+
+def test_statistics_mixin():
+    Game = type('Game',
+                (ScoreStatisticsMixin, MinMaxScoringMixin,
+                 ChooseRandomMoveFromBestMixin, TicTacToeAdapter),
+                {})
+    AI = type('AI',
+              (StatisticsMixin, ForwardSweepingMixin, NaivePruningMixin,
+               BaseAI),
+              {})
+    moves = []
+    ai = AI(Game(), search_depth=3, statistics=SearchStatistics([moves.append]))
+    ai.make_move(ai.choose_move())
+    ai.make_move(ai.choose_move())
+    assert len(moves) == 2
+    first_move = moves[0]
+    counters = first_move['counters']
+    # The starting state and three plies of successors; of those of
+    # the third ply, X's two moves can be made in either order.
+    assert counters['nodes_added'] == 1 + 9 + 9 * 8 + 9 * 8 * 7 // 2
+    assert counters['merges'] == 9 * 8 * 7 // 2
+    assert counters['expansions'] == 1 + 9 + 9 * 8
+    assert counters['expansion_steps'] == 3
+    # What's left are the chosen successor, its 8 successors, and the
+    # 7 * 8 states after X's second move.
+    assert counters['pruned_nodes'] == counters['nodes_added'] - (1 + 8 + 56)
+    assert counters['score_updates'] >= counters['backpropagation_cascades']
+    assert first_move['maxima']['search_tree_size'] == counters['nodes_added']
+    assert set(first_move['timings']) == {'choose', 'expand', 'insert',
+                                          'score', 'prune'}
+    total = ai.statistics.snapshot()
+    assert total['counters']['expansions'] == (
+        counters['expansions'] + moves[1]['counters']['expansions'])
+
+
+def test_statistics_with_pondering(monkeypatch):
+    # Exceptions in the pondering thread would otherwise go unnoticed.
+    errors = []
+    monkeypatch.setattr(threading, 'excepthook', errors.append)
+    Game = type('Game',
+                (ScoreStatisticsMixin, MinMaxScoringMixin,
+                 ChooseRandomMoveFromBestMixin, TicTacToeAdapter),
+                {})
+    AI = type('AI',
+              (StatisticsMixin, PonderingMixin, ForwardSweepingMixin,
+               BaseAI),
+              {})
+    moves = []
+    ai = AI(Game(), search_depth=2,
+            statistics=SearchStatistics([moves.append]))
+    for _ in range(4):
+        ai.make_move(ai.choose_move())
+        time.sleep(0.05)
+    ai.stop_pondering()
+    assert errors == []
+    assert len(moves) == 4
+    for move in moves:
+        assert {'choose', 'prune'} <= set(move['timings'])
+        assert all(seconds >= 0 for seconds in move['timings'].values())
+    # Pondering has expanded nodes beyond the search depth.
+    expansions = ai.statistics.snapshot()['counters']['expansions']
+    assert expansions > 1 + 9
+    assert expansions <= sum(node.is_expanded
+                             for node in ai.search_tree.values())
+    # The main thread's phases have all ended.
+    with ai.statistics.phase('outer'):
+        pass
+    assert ai.statistics.timings['outer'] >= 0
+
+
+def test_transposition_table_statistics():
+    Game = type('Game', (TicTacToeAdapter, ), {})
+    AI = type('AI', (StatisticsMixin, AlphaBetaSearchMixin, BaseAI), {})
+    ai = AI(Game(), transposition_table=TranspositionTable(2**16))
+    ai.choose_move()
+    counters = ai.statistics.move_snapshot()['counters']
+    assert counters['transposition_hits'] > 0
+    assert counters['transposition_misses'] > 0
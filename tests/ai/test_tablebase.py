@@ -0,0 +1,100 @@
+import pytest
+
+from bobbot.search_tree import BaseAI, PlayerInterface
+from bobbot.search_tree import NoExpansionMixin
+from bobbot.search_node import ChooseMoveFromTablebaseMixin
+from bobbot.tablebase import Tablebase, solve_retrograde, write_tablebase
+from bobbot.tablebase import DRAW, MAX_KEY
+from bobbot.games import nim
+from bobbot.games import tictactoe
+from bobbot.games.nim import NimAdapter
+from bobbot.games.tictactoe import TicTacToeAdapter
+
+
+def test_nim(tmp_path):
+    path = str(tmp_path / 'nim.tb')
+    # See test_full_expansion_mixin()
+    assert solve_retrograde(NimAdapter(), path) == (4 * 6 * 8) * 2 - (1 + 7)
+    with Tablebase(path) as tablebase:
+        for board in [(3, 5, 7), (1, 2, 3), (0, 0, 1), (0, 3, 3)]:
+            game_state = nim.GameState(board=board,
+                                       active_player=nim.PLAYER_A,
+                                       winner=None)
+            winner, distance = tablebase.lookup(nim.node_hash(game_state))
+            if board[0] ^ board[1] ^ board[2]:
+                assert winner == nim.PLAYER_A
+            else:
+                assert winner == nim.PLAYER_B
+        assert tablebase.lookup(nim.node_hash(nim.starting_state()))[1] > 0
+
+
+def test_play_tictactoe(tmp_path):
+    path = str(tmp_path / 'tictactoe.tb')
+    assert solve_retrograde(TicTacToeAdapter(), path) == 5478
+    with Tablebase(path) as tablebase:
+        start_hash = tictactoe.node_hash(tictactoe.starting_state())
+        assert tablebase.lookup(start_hash) == (DRAW, 9)
+        Game = type('Game',
+                    (ChooseMoveFromTablebaseMixin, TicTacToeAdapter),
+                    {'tablebase': tablebase})
+        AI = type('AI',
+                  (PlayerInterface, NoExpansionMixin, BaseAI),
+                  {})
+        ai = AI(Game())
+        ai.make_move((0, 0))
+        ai.make_move((0, 1))
+        # X can force a win now, and O can only postpone it.
+        winner, distance = tablebase.lookup(ai.current_state._node_hash())
+        assert winner == tictactoe.PLAYER_X
+        num_nodes = len(ai.search_tree)
+        while not ai.is_finished():
+            ai.make_move(ai.choose_move())
+            # Moves are chosen by lookups alone, without expansion.
+            num_nodes += 1
+            assert len(ai.search_tree) == num_nodes
+            distance -= 1
+            assert tablebase.lookup(ai.current_state._node_hash()) == (
+                tictactoe.PLAYER_X, distance)
+        assert ai.winner() == tictactoe.PLAYER_X
+
+
+def test_hash_collisions(tmp_path):
+    path = str(tmp_path / 'nim.tb')
+
+    # Heaps are interchangeable, so permuted boards have the same
+    # results, and can share a record.
+    class SortedHashNim(NimAdapter):
+        def node_hash(self, game_state):
+            board = tuple(sorted(game_state.board))
+            return nim.node_hash(game_state._replace(board=board))
+
+    num_states = solve_retrograde(SortedHashNim(), path)
+    assert num_states == solve_retrograde(NimAdapter(), str(tmp_path / 'x'))
+    with Tablebase(path) as tablebase:
+        assert len(tablebase) < num_states
+        for board in [(3, 5, 7), (1, 2, 3), (0, 0, 1), (0, 3, 3)]:
+            game_state = nim.GameState(board=board,
+                                       active_player=nim.PLAYER_A,
+                                       winner=None)
+            winner, _ = tablebase.lookup(nim.node_hash(game_state))
+            assert (winner == nim.PLAYER_A) == bool(
+                board[0] ^ board[1] ^ board[2])
+
+    # States with different results can't.
+    class ConstantHashNim(NimAdapter):
+        def node_hash(self, game_state):
+            return 0
+
+    with pytest.raises(ValueError):
+        solve_retrograde(ConstantHashNim(), path)
+
+
+def test_key_width(tmp_path):
+    path = str(tmp_path / 'keys.tb')
+    write_tablebase(path, [(MAX_KEY, DRAW, 0), (0, DRAW, 1)])
+    with Tablebase(path) as tablebase:
+        assert tablebase.lookup(MAX_KEY) == (DRAW, 0)
+    with pytest.raises(ValueError):
+        write_tablebase(path, [(MAX_KEY + 1, DRAW, 0)])
+    with pytest.raises(ValueError):
+        write_tablebase(path, [(-1, DRAW, 0)])
@@ -0,0 +1,52 @@
+from bobbot.tournament import PlayerConfig, GameResult
+from bobbot.tournament import play_game, run_tournament
+from bobbot.tournament import estimate_elo, summarize
+from bobbot.search_tree import BaseAI
+from bobbot.search_tree import CurrentStateExpansionMixin
+from bobbot.search_tree import AlphaBetaSearchMixin
+from bobbot.search_node import ChooseFirstMoveMixin
+from bobbot.transposition_table import TranspositionTable
+from bobbot.games.tictactoe import TicTacToeAdapter
+
+
+STRONG = PlayerConfig(name='alpha-beta',
+                      game=(TicTacToeAdapter, ),
+                      ai=(AlphaBetaSearchMixin, BaseAI),
+                      kwargs={'transposition_table': TranspositionTable(2**16)})
+WEAK = PlayerConfig(name='first move',
+                    game=(ChooseFirstMoveMixin, TicTacToeAdapter),
+                    ai=(CurrentStateExpansionMixin, BaseAI),
+                    kwargs={})
+
+
+def test_play_game():
+    result = play_game([WEAK, STRONG])
+    assert result.players == ['first move', 'alpha-beta']
+    assert result.winner == 1
+    assert len(result.latencies[0]) + len(result.latencies[1]) == result.moves
+    result = play_game([WEAK, STRONG], max_moves=2)
+    assert result.moves == 2
+    assert result.winner is None
+
+
+def test_estimate_elo():
+    results = ([GameResult(['a', 'b'], 0, 5, [[], []])] * 3 +
+               [GameResult(['b', 'a'], None, 9, [[], []])])
+    elo = estimate_elo(results)
+    assert elo['a'] > 0 > elo['b']
+    assert abs(elo['a'] + elo['b']) < 1e-9
+
+
+def test_run_tournament():
+    results = run_tournament([STRONG, WEAK], games_per_pairing=4, workers=2)
+    assert len(results) == 4
+    # Players take turns at moving first.
+    assert [result.players[0] for result in results] == [
+        'alpha-beta', 'first move', 'alpha-beta', 'first move']
+    summary = summarize(results)
+    assert summary['alpha-beta']['losses'] == 0
+    assert summary['alpha-beta']['wins'] == summary['first move']['losses']
+    assert summary['alpha-beta']['elo'] > summary['first move']['elo']
+    assert summary['first move']['moves_per_second'] > 0
+    assert (summary['alpha-beta']['latency_p50'] <=
+            summary['alpha-beta']['latency_max'])
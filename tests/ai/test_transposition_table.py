@@ -0,0 +1,42 @@
+import pytest
+
+from bobbot.transposition_table import TranspositionTable
+from bobbot.transposition_table import ALWAYS_REPLACE, DEPTH_PREFERRED
+
+
+def test_mapping():
+    table = TranspositionTable(8)
+    table[3] = 'three'
+    table[4] = 'four'
+    assert len(table) == 2
+    assert 3 in table
+    assert table[3] == 'three'
+    assert table.get(5) is None
+    with pytest.raises(KeyError):
+        table[5]
+    del table[3]
+    assert 3 not in table
+    assert set(table.items()) == {(4, 'four')}
+
+
+def test_always_replace():
+    table = TranspositionTable(8, replacement=ALWAYS_REPLACE)
+    assert table.store(1, 'deep', depth=5)
+    # 9 uses the same slot as 1.
+    assert table.store(9, 'shallow', depth=1)
+    assert 1 not in table
+    assert table[9] == 'shallow'
+    assert len(table) == 1
+
+
+def test_depth_preferred():
+    table = TranspositionTable(8, replacement=DEPTH_PREFERRED)
+    assert table.store(1, 'deep', depth=5)
+    assert not table.store(9, 'shallow', depth=1)
+    assert table[1] == 'deep'
+    assert 9 not in table
+    # The same key is always updated, and deeper entries win.
+    assert table.store(1, 'shallower', depth=1)
+    assert table.store(9, 'deeper', depth=2)
+    assert table[9] == 'deeper'
+    assert len(table) == 1
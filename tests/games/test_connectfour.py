@@ -0,0 +1,106 @@
+import random
+
+import pytest
+
+from bobbot.search_tree import BaseAI, AlphaBetaSearchMixin
+from bobbot.transposition_table import TranspositionTable
+from bobbot.games import connectfour
+
+
+def play(moves, width=7, height=6):
+    state = connectfour.starting_state(width, height)
+    for move in moves:
+        state = connectfour.make_move(state, move)
+    return state
+
+
+def test_starting_state():
+    state_0 = connectfour.starting_state()
+    assert not connectfour.is_finished(state_0)
+    assert state_0.active_player == connectfour.PLAYER_X
+    assert connectfour.all_legal_moves(state_0) == [3, 2, 4, 1, 5, 0, 6]
+
+
+def test_stones_stack_up():
+    state = play([0, 0, 0])
+    assert connectfour.field(state, (0, 0)) == connectfour.PLAYER_X
+    assert connectfour.field(state, (0, 1)) == connectfour.PLAYER_O
+    assert connectfour.field(state, (0, 2)) == connectfour.PLAYER_X
+    assert connectfour.field(state, (0, 3)) is None
+    assert state.active_player == connectfour.PLAYER_O
+    state = play([0, 0, 0, 0, 0, 0])
+    assert not connectfour.is_legal_move(state, 0)
+    assert 0 not in connectfour.all_legal_moves(state)
+    with pytest.raises(ValueError):
+        connectfour.make_move(state, 0)
+
+
+@pytest.mark.parametrize('moves', [
+    [0, 6, 1, 6, 2, 6, 3],                    # Horizontal
+    [0, 1, 0, 1, 0, 1, 0],                    # Vertical
+    [0, 1, 1, 2, 2, 3, 2, 3, 3, 6, 3],        # Rising diagonal
+    [6, 5, 5, 4, 4, 3, 4, 3, 3, 0, 3],        # Falling diagonal
+])
+def test_four_in_a_row(moves):
+    state = play(moves[:-1])
+    assert not connectfour.is_finished(state)
+    state = connectfour.make_move(state, moves[-1])
+    assert connectfour.is_finished(state)
+    assert connectfour.winner(state) == connectfour.PLAYER_X
+    assert connectfour.all_legal_moves(state) == []
+
+
+def test_lines_do_not_wrap_around():
+    # X's stones at the top of column 0 and the bottom of column 1
+    # would be consecutive bits, if it weren't for the empty bit at the
+    # top of each column.
+    state = play([1, 0, 1, 0, 0, 0, 0, 2, 0], width=4, height=6)
+    for coord in [(0, 4), (0, 5), (1, 0), (1, 1)]:
+        assert connectfour.field(state, coord) == connectfour.PLAYER_X
+    assert not connectfour.is_finished(state)
+
+
+def test_full_board_is_a_draw():
+    # Columns filled in pairs with alternating stones never line up.
+    state = play([0, 1, 0, 1, 1, 0, 1, 0], width=2, height=4)
+    assert connectfour.is_finished(state)
+    assert connectfour.winner(state) is None
+    assert connectfour.evaluate(state) == {connectfour.PLAYER_X: -0.5,
+                                           connectfour.PLAYER_O: -0.5}
+
+
+def test_keys_and_expansion():
+    rng = random.Random(0)
+    for _ in range(100):
+        state = connectfour.starting_state(5, 4)
+        key = connectfour.node_key(state)
+        while not connectfour.is_finished(state):
+            expansion = connectfour.expand_state(state)
+            moves = connectfour.all_legal_moves(state)
+            assert [move for move, *_ in expansion] == moves
+            for move, successor, successor_key, is_terminal, evaluation \
+                    in expansion:
+                assert successor == connectfour.make_move(state, move)
+                assert successor_key == connectfour.node_key(successor)
+                assert is_terminal == connectfour.is_finished(successor)
+                assert evaluation == connectfour.evaluate(successor)
+            move = rng.choice(moves)
+            key = connectfour.update_node_key(state, move, key)
+            state = connectfour.make_move(state, move)
+            assert key == connectfour.node_key(state)
+        assert connectfour.expand_state(state) == []
+
+
+def test_adapter():
+    AI = type('AI', (AlphaBetaSearchMixin, BaseAI), {})
+    # Connect Four on a 4x4 board is a draw.
+    Game = type('Game', (connectfour.ConnectFourAdapter, ),
+                {'width': 4, 'height': 4})
+    ai = AI(Game(), transposition_table=TranspositionTable(2**16))
+    _, value = ai.alpha_beta_search()
+    assert value == -0.5
+    # On the standard board, O has to block X's three in a row.
+    ai = AI(connectfour.ConnectFourAdapter(), search_depth=2)
+    for move in [0, 0, 1, 1, 2]:
+        ai.make_move(move)
+    assert ai.choose_move() == 3
@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+from bobbot.search_tree import BaseAI, AlphaBetaSearchMixin
+from bobbot.games import mnk
+from bobbot.games import tictactoe
+
+
+def test_starting_state():
+    state_0 = mnk.starting_state()
+    assert not mnk.is_finished(state_0)
+    assert state_0.active_player == mnk.PLAYER_X
+    all_initial_moves = set([(x, y) for x in range(3) for y in range(3)])
+    assert set(mnk.all_legal_moves(state_0)) == all_initial_moves
+
+
+def test_cannot_choose_field_twice():
+    state_0 = mnk.starting_state()
+    state_1 = mnk.make_move(state_0, (0,0))
+    assert state_1.active_player == mnk.PLAYER_O
+    with pytest.raises(ValueError):
+        mnk.make_move(state_1, (0,0))
+
+
+def test_same_rules_as_tictactoe():
+    rng = random.Random(0)
+    for _ in range(200):
+        state = mnk.starting_state()
+        ttt_state = tictactoe.starting_state()
+        while not tictactoe.is_finished(ttt_state):
+            assert not mnk.is_finished(state)
+            moves = mnk.all_legal_moves(state)
+            assert set(moves) == set(tictactoe.all_legal_moves(ttt_state))
+            move = rng.choice(moves)
+            key = mnk.update_node_key(state, move, mnk.node_key(state))
+            state = mnk.make_move(state, move)
+            ttt_state = tictactoe.make_move(ttt_state, move)
+            assert key == mnk.node_key(state)
+            assert state.active_player == ttt_state.active_player
+        assert mnk.is_finished(state)
+        assert mnk.all_legal_moves(state) == []
+        assert mnk.winner(state) == tictactoe.winner(ttt_state)
+        assert mnk.evaluate(state) == tictactoe.evaluate(ttt_state)
+
+
+def test_larger_board():
+    state = mnk.starting_state(5, 5, 4)
+    assert len(mnk.all_legal_moves(state)) == 25
+    # X plays the diagonal from (1, 0) to (4, 3), O plays elsewhere.
+    for x_move, o_move in [((1, 0), (0, 0)),
+                           ((2, 1), (0, 1)),
+                           ((3, 2), (0, 2))]:
+        state = mnk.make_move(state, x_move)
+        state = mnk.make_move(state, o_move)
+    assert not mnk.is_finished(state)
+    state = mnk.make_move(state, (4, 3))
+    assert mnk.is_finished(state)
+    assert mnk.winner(state) == mnk.PLAYER_X
+
+
+def test_adapter():
+    AI = type('AI', (AlphaBetaSearchMixin, BaseAI), {})
+    ai = AI(mnk.MNKAdapter())
+    # TicTacToe is a draw.
+    _, value = ai.alpha_beta_search()
+    assert value == -0.5
+    Game = type('Game', (mnk.MNKAdapter,), {'width': 4, 'height': 4, 'k': 4})
+    ai = AI(Game(), search_depth=2)
+    assert len(ai.current_state._all_legal_moves()) == 16
+    ai.make_move(ai.choose_move())
+    assert ai.current_state._active_player() == mnk.PLAYER_O
@@ -0,0 +1,40 @@
+from bobbot.games import nim
+
+
+def test_expand_state():
+    game_states = [nim.starting_state(),
+                   nim.GameState(board=(0, 2, 0), active_player=nim.PLAYER_B,
+                                 winner=None),
+                   nim.GameState(board=(0, 0, 0), active_player=None,
+                                 winner=nim.PLAYER_A)]
+    for game_state in game_states:
+        expansion = nim.expand_state(game_state)
+        moves = [move for move, _, _, _, _ in expansion]
+        assert moves == nim.all_legal_moves(game_state)
+        for move, successor, key, is_terminal, evaluation in expansion:
+            expected = nim.make_move(game_state, move)
+            assert successor == expected
+            assert key == nim.node_key(expected)
+            assert is_terminal == nim.is_finished(expected)
+            assert evaluation == nim.evaluate_by_nim_sum(expected)
+
+
+def test_state_index():
+    reachable = {}
+    unexplored = [nim.starting_state()]
+    while unexplored:
+        state = unexplored.pop()
+        key = nim.node_key(state)
+        if key in reachable:
+            continue
+        reachable[key] = state
+        unexplored.extend(nim.make_move(state, move)
+                          for move in nim.all_legal_moves(state))
+    assert len(reachable) == 376
+    indices = set()
+    for state in reachable.values():
+        index = nim.state_index(state)
+        assert 0 <= index < nim.NUM_STATE_INDICES
+        assert nim.state_from_index(index) == state
+        indices.add(index)
+    assert len(indices) == len(reachable)
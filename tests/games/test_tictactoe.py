@@ -51,3 +51,57 @@ def test_draw():
     assert tictactoe.is_finished(state_9)
     assert tictactoe.all_legal_moves(state_9) == []
     assert tictactoe.winner(state_9) is None
+
+
+def test_node_hash():
+    state = tictactoe.starting_state()
+    state_hash = tictactoe.node_hash(state)
+    seen_hashes = {state_hash}
+    for move in [(1,1), (2,0), (2,2), (0,0)]:
+        state_hash = tictactoe.update_node_hash(state, move, state_hash)
+        state = tictactoe.make_move(state, move)
+        assert state_hash == tictactoe.node_hash(state)
+        seen_hashes.add(state_hash)
+    assert len(seen_hashes) == 5
+    # Transpositions have the same hash.
+    transposed = tictactoe.starting_state()
+    for move in [(2,2), (0,0), (1,1), (2,0)]:
+        transposed = tictactoe.make_move(transposed, move)
+    assert tictactoe.node_hash(transposed) == state_hash
+
+
+def test_expand_state():
+    game_states = [tictactoe.starting_state()]
+    for move in [(1, 1), (0, 0), (2, 2), (0, 2), (0, 1), (2, 1), (1, 0)]:
+        game_states.append(tictactoe.make_move(game_states[-1], move))
+    for game_state in game_states:
+        expansion = tictactoe.expand_state(game_state)
+        moves = [move for move, _, _, _, _ in expansion]
+        assert moves == tictactoe.all_legal_moves(game_state)
+        for move, successor, key, is_terminal, evaluation in expansion:
+            expected = tictactoe.make_move(game_state, move)
+            assert successor == expected
+            assert key == tictactoe.node_key(expected)
+            assert is_terminal == tictactoe.is_finished(expected)
+            assert evaluation == tictactoe.evaluate(expected)
+
+
+def test_state_index():
+    reachable = {}
+    unexplored = [tictactoe.starting_state()]
+    while unexplored:
+        state = unexplored.pop()
+        key = tictactoe.node_key(state)
+        if key in reachable:
+            continue
+        reachable[key] = state
+        unexplored.extend(tictactoe.make_move(state, move)
+                          for move in tictactoe.all_legal_moves(state))
+    assert len(reachable) == 5478
+    indices = set()
+    for state in reachable.values():
+        index = tictactoe.state_index(state)
+        assert 0 <= index < tictactoe.NUM_STATE_INDICES
+        assert tictactoe.state_from_index(index) == state
+        indices.add(index)
+    assert len(indices) == len(reachable)